@@ -0,0 +1,182 @@
+"""
+Compares fixed parallel downloads with the adaptive concurrency.
+
+A local HTTP server throttles every connection to `PER_CONNECTION` bytes
+per second and all of them together to `TOTAL`, like a slow server on a
+fast link. Past `TOTAL / PER_CONNECTION` connections the server gets
+slower in total, like one that is overloaded, so more downloads don't
+always help. The fixed runs show where the optimum is, the adaptive run
+should end up near it on its own.
+
+    python benchmarks/adaptive.py [jobs] [fixed parallel downloads ...]
+"""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+
+sys.path.insert(0, str(config.YT_DLP_PATH))
+
+import model  # noqa: E402
+from enums import Quality, Type  # noqa: E402
+from scheduler import ConcurrencyTuner  # noqa: E402
+from yt_dlp.extractor.common import InfoExtractor  # type: ignore # noqa: E402
+
+PAYLOAD = os.urandom(384 * 1024)
+PER_CONNECTION = 128 * 1024
+TOTAL = 1024 * 1024
+# Share of `TOTAL` lost for every connection past the optimum
+OVERLOAD = 0.06
+CHUNK = 8 * 1024
+
+
+class StandInIE(InfoExtractor):
+    _VALID_URL = r"http://127\.0\.0\.1:(?P<port>\d+)/clip/(?P<id>\d+)"
+
+    def _real_extract(self, url):
+        port, video_id = self._match_valid_url(url).group("port", "id")
+        return {
+            "id": video_id,
+            "title": f"clip {video_id}",
+            "formats": [{
+                "format_id": "0",
+                "url": f"http://127.0.0.1:{port}/media/{video_id}.mp4",
+                "ext": "mp4",
+            }],
+        }
+
+
+def install_standin():
+    original = model.YoutubeDLPool.get
+
+    def get(self, options):
+        ydl = original(self, options)
+        if "StandIn" not in ydl._ies:
+            ydl.add_info_extractor(StandInIE())
+            # Must be asked before the generic extractor claims the URL
+            ydl._ies = {"StandIn": ydl._ies.pop("StandIn"), **ydl._ies}
+        return ydl
+
+    model.YoutubeDLPool.get = get
+
+
+class Link:
+    """The server's total bandwidth, shared by all connections."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.free_at = time.monotonic()
+
+    def rate(self) -> float:
+        optimum = TOTAL // PER_CONNECTION
+        extra = max(0, self.connections - optimum)
+        return TOTAL * max(0.2, 1 - OVERLOAD * extra)
+
+    def send(self, amount: int):
+        with self.lock:
+            now = time.monotonic()
+            self.free_at = max(self.free_at, now) + amount / self.rate()
+            wait = self.free_at - now
+        time.sleep(wait)
+
+
+LINK = Link()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if not self.path.startswith("/media/"):
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        with LINK.lock:
+            LINK.connections += 1
+        try:
+            for offset in range(0, len(PAYLOAD), CHUNK):
+                started = time.monotonic()
+                LINK.send(CHUNK)
+                self.wfile.write(PAYLOAD[offset:offset + CHUNK])
+                # At most PER_CONNECTION, whatever the link allows
+                time.sleep(max(
+                    0.0, CHUNK / PER_CONNECTION - time.monotonic() + started
+                ))
+        except OSError:
+            pass
+        finally:
+            with LINK.lock:
+                LINK.connections -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def run(
+    urls: list[str], max_parallel: int, tuner=None
+) -> tuple[float, list[int]]:
+    with tempfile.TemporaryDirectory() as path:
+        manager = model.DownloadManager(
+            urls,
+            Type.Video,
+            Quality.Best,
+            path,
+            lambda url, err=None: print(f"Failed: {url} ({err})"),
+            max_parallel=max_parallel,
+            tuner=tuner,
+        )
+        start = time.perf_counter()
+        manager.start_all()
+        limits = []
+        while not manager.is_completed():
+            time.sleep(0.1)
+            if tuner and (not limits or limits[-1] != tuner.limit):
+                limits.append(tuner.limit)
+        return time.perf_counter() - start, limits
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    fixed = [int(arg) for arg in sys.argv[2:]] or [2, 8, 24]
+    install_standin()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    urls = [f"http://127.0.0.1:{port}/clip/{idx}" for idx in range(jobs)]
+    size = jobs * len(PAYLOAD)
+
+    print(
+        f"{jobs} jobs, {PER_CONNECTION // 1024} KB/s per connection, "
+        f"{TOTAL // 1024} KB/s in total"
+    )
+    for max_parallel in fixed:
+        wall, _ = run(urls, max_parallel)
+        print(
+            f"fixed {max_parallel:3}  {wall:7.2f}s "
+            f"{size / wall / 1024:7.0f} KB/s"
+        )
+    tuner = ConcurrencyTuner(2, 32)
+    wall, limits = run(urls, tuner.maximum, tuner)
+    print(
+        f"adaptive   {wall:7.2f}s {size / wall / 1024:7.0f} KB/s, "
+        f"limits {' '.join(map(str, limits))}"
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Wall time and CPU seconds per track of the Music conversion, before and
+after the single-pass audio pipeline.
+
+Before, every download was re-encoded to MP3 with FFmpeg's defaults.
+Now the stream is copied if it already fits the configured codec and
+only re-encoded otherwise. Test tracks are generated with the bundled
+FFmpeg in the typical formats sites serve (Opus in WebM, AAC in M4A).
+CPU seconds are those of the FFmpeg child processes, which are only
+reported on Unix-like systems.
+
+    python benchmarks/audio_pipeline.py [tracks] [seconds]
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+
+sys.path.insert(0, str(config.YT_DLP_PATH))
+
+from model import Downloader  # noqa: E402
+
+# name: (extension, FFmpeg encoder, acodec as reported by yt-dlp)
+SOURCES = {
+    "opus/webm": (".webm", "libopus", "opus"),
+    "aac/m4a": (".m4a", "aac", "mp4a.40.2"),
+}
+
+
+def make_source(directory: Path, name: str, seconds: int) -> Path:
+    ext, encoder, _ = SOURCES[name]
+    path = directory / f"source{ext}"
+    subprocess.run(
+        [
+            str(config.FFMPEG_PATH), "-y", "-f", "lavfi",
+            "-i", f"sine=frequency=440:duration={seconds}",
+            "-c:a", encoder, "-b:a", "128k", str(path),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return path
+
+
+def measure(convert, source: Path, tracks: int) -> tuple[float, float]:
+    wall = cpu = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        for idx in range(tracks):
+            track = Path(tmp) / f"track{idx}{source.suffix}"
+            shutil.copyfile(source, track)
+            before = os.times()
+            start = time.perf_counter()
+            convert(track)
+            wall += time.perf_counter() - start
+            after = os.times()
+            cpu += (
+                after.children_user - before.children_user
+                + after.children_system - before.children_system
+            )
+    return wall / tracks, cpu / tracks
+
+
+def main():
+    tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 180
+    print(f"{tracks} tracks of {seconds}s, per track:")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (_, _, acodec) in SOURCES.items():
+            source = make_source(Path(tmp), name, seconds)
+            wall, cpu = measure(
+                lambda track: Downloader.convert(track, ".mp3"),
+                source,
+                tracks,
+            )
+            print(f"{name:10} before -> mp3   {wall:6.2f}s {cpu:6.2f}s CPU")
+            for codec in ("mp3", "aac", "opus"):
+                wall, cpu = measure(
+                    lambda track: Downloader.convert_audio(
+                        track, codec, "192k", acodec
+                    ),
+                    source,
+                    tracks,
+                )
+                print(
+                    f"{name:10} after  -> {codec:5} "
+                    f"{wall:6.2f}s {cpu:6.2f}s CPU"
+                )
+
+
+if __name__ == "__main__":
+    main()
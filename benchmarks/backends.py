@@ -0,0 +1,124 @@
+"""
+Compares the thread and the process download backend.
+
+A local HTTP server serves small media files and a stand-in extractor
+burns CPU for every clip, like yt-dlp does when interpreting player JS or
+parsing manifests. While a batch runs, the main thread ticks every 10ms
+like the Qt event loop would; the reported lag is how late those ticks
+were, i.e. how much the GUI would stutter.
+
+    python benchmarks/backends.py [jobs] [workers]
+"""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+
+sys.path.insert(0, str(config.YT_DLP_PATH))
+
+import model  # noqa: E402
+from enums import Quality, Type  # noqa: E402
+from yt_dlp.extractor.common import InfoExtractor  # type: ignore # noqa: E402
+
+PAYLOAD = os.urandom(256 * 1024)
+# Iterations of busy work per extraction
+CPU_WORK = 300_000
+
+
+class StandInIE(InfoExtractor):
+    _VALID_URL = r"http://127\.0\.0\.1:(?P<port>\d+)/clip/(?P<id>\d+)"
+
+    def _real_extract(self, url):
+        port, video_id = self._match_valid_url(url).group("port", "id")
+        acc = 0
+        for i in range(CPU_WORK):
+            acc = (acc * 31 + i) % 1_000_003
+        return {
+            "id": video_id,
+            "title": f"clip {video_id} {acc}",
+            "formats": [{
+                "format_id": "0",
+                "url": f"http://127.0.0.1:{port}/media/{video_id}.mp4",
+                "ext": "mp4",
+            }],
+        }
+
+
+def install_standin():
+    original = model.YoutubeDLPool.get
+
+    def get(self, options):
+        ydl = original(self, options)
+        if "StandIn" not in ydl._ies:
+            ydl.add_info_extractor(StandInIE())
+            # Must be asked before the generic extractor claims the URL
+            ydl._ies = {"StandIn": ydl._ies.pop("StandIn"), **ydl._ies}
+        return ydl
+
+    model.YoutubeDLPool.get = get
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(backend: str, urls: list[str], workers: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as path:
+        manager = model.DownloadManager(
+            urls,
+            Type.Video,
+            Quality.Best,
+            path,
+            lambda url, err=None: print(f"Failed: {url} ({err})"),
+            max_parallel=workers,
+            backend=backend,
+            process_initializer=install_standin,
+        )
+        start = time.perf_counter()
+        manager.start_all()
+        max_lag = 0.0
+        while not manager.is_completed():
+            tick = time.perf_counter()
+            time.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - tick - 0.01)
+        return time.perf_counter() - start, max_lag
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    install_standin()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    urls = [f"http://127.0.0.1:{port}/clip/{idx}" for idx in range(jobs)]
+
+    print(f"{jobs} jobs, {workers} workers, {os.cpu_count()} cores")
+    for backend in ("thread", "process"):
+        wall, lag = run(backend, urls, workers)
+        print(
+            f"{backend:8} {wall:8.2f}s wall "
+            f"{lag * 1000:8.1f}ms max GUI tick lag"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
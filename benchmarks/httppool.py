@@ -0,0 +1,191 @@
+"""
+Compares new connections per request with the shared connection pool.
+
+A local HTTPS server (plain HTTP without the `openssl` command) answers
+small requests like update checks, connectivity probes and extractor API
+calls do. Every request takes `rtt` seconds and every new connection two
+more, for the TCP and the TLS handshake. The requests are sent one by one
+and from several threads at once, once with urllib, which connects for
+every request, through a `ConnectionPool` that keeps no connections,
+which still resumes the TLS sessions, and through a keep-alive pool.
+Finally a few YoutubeDL instances, one per job, fetch pages over plain
+HTTP and must share their connections through the process-wide pool.
+
+    python benchmarks/httppool.py [requests] [rtt]
+"""
+
+import concurrent.futures
+import functools
+import http.server
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Callable, Optional
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+
+sys.path.insert(0, str(config.YT_DLP_PATH))
+
+import httppool  # noqa: E402
+import model  # noqa: E402
+
+THREADS = 8
+JOBS = 4
+RTT = [0.01]
+CONNECTIONS = [0]
+CONNECTIONS_LOCK = threading.Lock()
+BODY = b"{}" * 512
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    context: Optional[ssl.SSLContext] = None
+
+    def setup(self):
+        with CONNECTIONS_LOCK:
+            CONNECTIONS[0] += 1
+        # Like real servers, headers and body are written separately
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        time.sleep(RTT[0])
+        if self.context:
+            time.sleep(RTT[0])
+            self.request = self.context.wrap_socket(
+                self.request, server_side=True
+            )
+        super().setup()
+
+    def do_GET(self):
+        time.sleep(RTT[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def certificate(directory: str) -> Optional[tuple[str, str]]:
+    """Create a self-signed certificate for 127.0.0.1, if possible."""
+    if not shutil.which("openssl"):
+        return None
+    cert, key = f"{directory}/cert.pem", f"{directory}/key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", key, "-out", cert, "-days", "1",
+            "-subj", "/CN=127.0.0.1",
+            "-addext", "subjectAltName=IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def run(
+    fetch: Callable[[str], bytes], url: str, count: int, threads: int
+) -> tuple[float, int]:
+    """Return the seconds `count` requests took and connections opened."""
+    CONNECTIONS[0] = 0
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        for body in executor.map(fetch, [url] * count):
+            assert body == BODY
+    return time.perf_counter() - start, CONNECTIONS[0]
+
+
+def pooled(pool: httppool.ConnectionPool, url: str) -> bytes:
+    with pool.urlopen(url) as response:
+        return response.read()
+
+
+def ytdlp_jobs(url: str, count: int):
+    """Fetch `count` pages in each of `JOBS` YoutubeDL instances."""
+    CONNECTIONS[0] = 0
+    before = httppool.POOL.stats()
+    wall = 0.0
+    for _ in range(JOBS):
+        pool = model.YoutubeDLPool()
+        ydl = pool.get({"logger": model.LOGGER, "quiet": True})
+        # Creating the instance isn't what's measured
+        start = time.perf_counter()
+        try:
+            for _ in range(count):
+                with ydl.urlopen(url) as response:
+                    assert response.read() == BODY
+        finally:
+            wall += time.perf_counter() - start
+            pool.close()
+    after = httppool.POOL.stats()
+    hits = after["hits"] - before["hits"]
+    misses = after["misses"] - before["misses"]
+    print(
+        f"yt-dlp, {JOBS} jobs {wall:7.2f}s "
+        f"{CONNECTIONS[0]:4} connections, {hits} hits, {misses} misses"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    RTT[0] = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    directory = tempfile.TemporaryDirectory()
+    files = certificate(directory.name)
+    scheme = "http"
+    client_context = None
+    if files:
+        scheme = "https"
+        Handler.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        Handler.context.load_cert_chain(*files)
+        client_context = ssl.create_default_context(cafile=files[0])
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"{scheme}://127.0.0.1:{server.server_address[1]}/api"
+
+    def fresh(url: str) -> bytes:
+        with urllib.request.urlopen(url, context=client_context) as response:
+            return response.read()
+
+    print(f"{count} requests over {scheme}, {RTT[0] * 1000:.0f} ms RTT")
+    for threads in (1, THREADS):
+        baseline = None
+        for name, idle_timeout in (
+            ("urllib", None), ("resume", 0.0), ("pool", 60.0)
+        ):
+            fetch = fresh
+            if idle_timeout is not None:
+                pool = httppool.ConnectionPool(
+                    idle_timeout=idle_timeout, context=client_context
+                )
+                fetch = functools.partial(pooled, pool)
+            wall, connections = run(fetch, url, count, threads)
+            baseline = baseline or wall
+            print(
+                f"{name:6} {threads} threads {wall:7.2f}s "
+                f"{connections:4} connections {baseline / wall:5.1f}x"
+            )
+            if idle_timeout is not None:
+                print(f"       {pool.describe()}")
+                pool.close()
+
+    # Plain HTTP, yt-dlp's pool verifies against the system certificates
+    Handler.context = None
+    ytdlp_jobs(url.replace("https://", "http://"), count // JOBS)
+    server.shutdown()
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measures the language string lookups done by `Window.apply_lang`.
+
+The keys are taken from the source of `apply_lang` and looked up through
+the old uncached `LangDict` (every missing key re-parses the fallback
+TOML) and the cached, pre-merged one. A catalog with half of its strings
+missing shows the cost of fallbacks. Cold loads compare parsing TOML with
+reading the precompiled catalog.
+
+    python benchmarks/lang_lookups.py [rounds]
+"""
+
+import ast
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import lang  # noqa: E402
+
+
+class LegacyLangDict(lang.LangDict):
+    """The uncached lookups of the original implementation."""
+
+    def get_from_default(self, key):
+        return self.__class__.from_langcode(lang.FALLBACK_LANGUAGE)[key]
+
+    @classmethod
+    def from_toml(cls, toml_str):
+        dict_ = lang._loads_toml(toml_str)
+        obj = cls(lang._loads_toml(toml_str)["strings"])
+        for key, value in dict_["meta"].items():
+            setattr(obj, key, value)
+        return obj
+
+    @classmethod
+    def from_langcode(cls, langcode):
+        return cls.from_file(cls.langs_path / f"{langcode}.toml")
+
+
+def apply_lang_keys() -> list[str]:
+    tree = ast.parse((PACKAGE_DIR / "__main__.py").read_text("utf-8"))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "apply_lang":
+            return [
+                sub.slice.value
+                for sub in ast.walk(node)
+                if isinstance(sub, ast.Subscript)
+                and isinstance(sub.slice, ast.Constant)
+                and ast.unparse(sub.value) == "self.lang"
+            ]
+    raise RuntimeError("apply_lang not found")
+
+
+def make_langs_dir(directory: Path) -> None:
+    for file in (PACKAGE_DIR / "langs").glob("*.toml"):
+        shutil.copy(file, directory)
+    # A translation that lacks every other string
+    catalog = lang._loads_toml(
+        (directory / "de_DE.toml").read_text("utf-8")
+    )
+    lines = ["[meta]", 'langcode = "xx_XX"', 'name = "Partial"', "",
+             "[strings]"]
+    for idx, (key, value) in enumerate(catalog["strings"].items()):
+        if idx % 2:
+            lines.append(f"{key} = {json.dumps(value)}")
+    (directory / "xx_XX.toml").write_text("\n".join(lines), "utf-8")
+
+
+def bench(cls, langcode: str, keys: list[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        lang_dict = cls.from_langcode(langcode)
+        for key in keys:
+            lang_dict[key]
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    keys = apply_lang_keys()
+    print(f"{len(keys)} lookups per apply_lang, {rounds} rounds")
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        make_langs_dir(directory)
+        lang.LangDict.set_languages_path(directory)
+        for langcode in ("en_US", "de_DE", "xx_XX"):
+            legacy = bench(LegacyLangDict, langcode, keys, rounds)
+            lang.LangDict.clear_cache()
+            cached = bench(lang.LangDict, langcode, keys, rounds)
+            print(
+                f"{langcode}: legacy {legacy * 1e6:9.1f} us   "
+                f"cached {cached * 1e6:7.2f} us   "
+                f"({legacy / cached:,.0f}x)"
+            )
+
+        for compiled in directory.glob("*.json"):
+            compiled.unlink()
+        start = time.perf_counter()
+        lang.load_catalog(directory, "en_US")
+        toml_load = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(rounds):
+            lang.load_catalog(directory, "en_US")
+        json_load = (time.perf_counter() - start) / rounds
+        print(
+            f"cold load: toml {toml_load * 1e3:.2f} ms   "
+            f"precompiled {json_load * 1e3:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
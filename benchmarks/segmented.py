@@ -0,0 +1,172 @@
+"""
+Compares single connection and segmented downloads of one large file.
+
+A local HTTP server serves a random file with range support and throttles
+every connection to `PER_CONNECTION` bytes per second, like CDNs do. The
+file is downloaded with 1 connection and with the given amounts of
+segments and compared with the original. Finally a segmented download is
+interrupted halfway and run again, which must only fetch what's missing.
+
+    python benchmarks/segmented.py [size in MB] [segments ...]
+"""
+
+import http.server
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+
+sys.path.insert(0, str(config.YT_DLP_PATH))
+
+import model  # noqa: E402
+from yt_dlp.extractor.common import InfoExtractor  # type: ignore # noqa: E402
+
+PER_CONNECTION = 4 * 1024 * 1024
+CHUNK = 64 * 1024
+PAYLOAD = b""
+SERVED = [0]
+SERVED_LOCK = threading.Lock()
+
+
+class StandInIE(InfoExtractor):
+    _VALID_URL = r"http://127\.0\.0\.1:(?P<port>\d+)/clip/(?P<id>\d+)"
+
+    def _real_extract(self, url):
+        port, video_id = self._match_valid_url(url).group("port", "id")
+        return {
+            "id": video_id,
+            "title": f"clip {video_id}",
+            "formats": [{
+                "format_id": "0",
+                "url": f"http://127.0.0.1:{port}/media/{video_id}.mp4",
+                "ext": "mp4",
+            }],
+        }
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        match = re.fullmatch(
+            r"bytes=(\d+)-(\d*)", self.headers.get("Range", "")
+        )
+        start, end = 0, len(PAYLOAD) - 1
+        if match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(end, int(match.group(2)))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        try:
+            for offset in range(start, end + 1, CHUNK):
+                block = PAYLOAD[offset:min(offset + CHUNK, end + 1)]
+                self.wfile.write(block)
+                with SERVED_LOCK:
+                    SERVED[0] += len(block)
+                time.sleep(len(block) / PER_CONNECTION)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class Interrupted(Exception):
+    pass
+
+
+def download(url: str, path: str, segments: int, hook=None) -> float:
+    pool = model.YoutubeDLPool()
+    options = {
+        "format": "best",
+        "quiet": True,
+        "noprogress": True,
+        "http_segments": segments,
+        "http_segment_min_size": 0,
+    }
+    ydl = pool.get({
+        "logger": model.LOGGER,
+        "outtmpl": f"{path}/%(title)s.%(ext)s",
+        "continuedl": True,
+        **options,
+    })
+    if "StandIn" not in ydl._ies:
+        ydl.add_info_extractor(StandInIE())
+        # Must be asked before the generic extractor claims the URL
+        ydl._ies = {"StandIn": ydl._ies.pop("StandIn"), **ydl._ies}
+    pool.progress_hooks = [hook] if hook else []
+    start = time.perf_counter()
+    try:
+        ydl.download([url])
+    finally:
+        pool.close()
+    return time.perf_counter() - start
+
+
+def main():
+    global PAYLOAD
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    counts = [int(arg) for arg in sys.argv[2:]] or [2, 4, 8]
+    PAYLOAD = os.urandom(size * 1024 * 1024)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/clip/0"
+
+    print(
+        f"{size} MB, {PER_CONNECTION // 1024 // 1024} MB/s per connection"
+    )
+    baseline = None
+    for segments in [1, *counts]:
+        with tempfile.TemporaryDirectory() as path:
+            wall = download(url, path, segments)
+            data = (Path(path) / "clip 0.mp4").read_bytes()
+            assert data == PAYLOAD, f"corrupt file with {segments} segments"
+        baseline = baseline or wall
+        print(
+            f"{segments:3} segments {wall:7.2f}s "
+            f"{len(PAYLOAD) / wall / 1024 / 1024:7.1f} MB/s "
+            f"{baseline / wall:5.1f}x"
+        )
+
+    def interrupt(d: dict):
+        if d.get("downloaded_bytes", 0) > len(PAYLOAD) // 2:
+            raise Interrupted
+
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            download(url, path, 4, interrupt)
+        except Interrupted:
+            pass
+        assert list(Path(path).glob("*.part.segments")), "no resume state"
+        SERVED[0] = 0
+        download(url, path, 4)
+        data = (Path(path) / "clip 0.mp4").read_bytes()
+        assert data == PAYLOAD, "corrupt file after resuming"
+        assert not list(Path(path).glob("*.segments"))
+        print(
+            f"resumed after an interruption, fetched "
+            f"{SERVED[0] / len(PAYLOAD):.0%} of the file again"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
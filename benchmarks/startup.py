@@ -0,0 +1,117 @@
+"""
+Measures the cold start of the app and of the yt-dlp import.
+
+Imports yt-dlp in fresh interpreters, once through zipimport from the
+installed zip (the old behaviour) and once from the extracted and
+byte-compiled copy, and times the one-off extraction. Then starts the app
+with `MDD_STARTUP_BENCHMARK` set, which makes it report when the window is
+shown and when yt-dlp is ready, and quit. Runs offscreen unless
+`QT_QPA_PLATFORM` is set. The mode is taken from the `lazy_ytdlp_import`
+setting.
+
+    python benchmarks/startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+import ytdlp  # noqa: E402
+
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import yt_dlp
+print(time.perf_counter() - start)
+"""
+
+
+def import_time(path: Path) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET, str(path)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def app_milestones() -> dict[str, float]:
+    env = {
+        **os.environ,
+        "MDD_STARTUP_BENCHMARK": "1",
+        "QT_QPA_PLATFORM": os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+    }
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(PACKAGE_DIR / "__main__.py")],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=env,
+    )
+    milestones = {}
+    for line in process.stdout:
+        milestones[line.strip()] = time.perf_counter() - start
+        if line.strip() == "ready":
+            break
+    process.wait(timeout=30)
+    return milestones
+
+
+def report(name: str, times: list[float]):
+    print(
+        f"{name:<28} median {statistics.median(times) * 1e3:8.1f} ms   "
+        f"min {min(times) * 1e3:8.1f} ms"
+    )
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    config.init_config()
+    ytdlp.ensure_installed()
+    print(f"yt-dlp {ytdlp.installed_version()}, {runs} runs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extract_dir = config.YT_DLP_EXTRACT_DIR
+        config.YT_DLP_EXTRACT_DIR = Path(tmp)
+        start = time.perf_counter()
+        extracted = ytdlp.extract()
+        extract_time = time.perf_counter() - start
+        config.YT_DLP_EXTRACT_DIR = extract_dir
+        name = "one-off extract + compile"
+        print(f"{name:<28} {extract_time * 1e3:8.1f} ms")
+        report(
+            "import from zip",
+            [import_time(config.YT_DLP_PATH) for _ in range(runs)],
+        )
+        report(
+            "import from extracted",
+            [import_time(extracted) for _ in range(runs)],
+        )
+
+    try:
+        import PyQt6.QtWidgets  # noqa: F401
+    except ImportError:
+        print("PyQt6 is not installed, skipping the app start")
+        return
+    # The first start extracts, leave that out
+    app_milestones()
+    runs_milestones = [app_milestones() for _ in range(runs)]
+    mode = "lazy" if config.CONFIG.get_bool("lazy_ytdlp_import") else "eager"
+    print(f"app start ({mode} yt-dlp import)")
+    report("  time to window", [m["window"] for m in runs_milestones])
+    report("  time to ready", [m["ready"] for m in runs_milestones])
+
+
+if __name__ == "__main__":
+    main()
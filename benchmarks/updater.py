@@ -0,0 +1,167 @@
+"""
+Exercises the yt-dlp update service against a local HTTP stand-in of the
+GitHub releases.
+
+The stand-in answers slowly, like a bad connection. Reports how long the
+calling (GUI) thread is blocked by the old synchronous check compared to
+submitting it to the service, and that a cached check skips the network.
+It also checks that the installed zip stays intact while an update
+downloads, that a corrupted download is rejected, and that a hot reload
+imports the new version. Works on a temporary app directory, the real one
+is not touched.
+
+    python benchmarks/updater.py [delay]
+"""
+
+import hashlib
+import http.server
+import io
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+
+TMP = tempfile.TemporaryDirectory()
+config.CONFIG_DIR = Path(TMP.name)
+config.YT_DLP_PATH = config.CONFIG_DIR / "yt-dlp"
+config.YT_DLP_EXTRACT_DIR = config.CONFIG_DIR / "yt-dlp-extracted"
+config.CONFIG = config.Config(
+    config.CONFIG_DIR / ".config", config._default_config
+)
+
+import updater  # noqa: E402
+import ytdlp  # noqa: E402
+
+OLD, NEW = "2000.01.01", "2000.02.02"
+
+
+def make_zip(version: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("yt_dlp/__init__.py", "")
+        zf.writestr("yt_dlp/version.py", f"__version__ = '{version}'\n")
+        zf.writestr("__main__.py", "import yt_dlp\n")
+    return buffer.getvalue()
+
+
+class StandIn(http.server.BaseHTTPRequestHandler):
+    delay = 0.5
+    requests = 0
+    # Served as yt-dlp instead of the real file if set
+    corrupt = False
+    binary = make_zip(NEW)
+    # Set once a download started, released to let it finish
+    downloading = threading.Event()
+    release = threading.Event()
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests += 1
+        time.sleep(self.delay)
+        if self.path == "/releases/latest":
+            self.send_response(302)
+            self.send_header("Location", f"/releases/tag/{NEW}")
+            self.end_headers()
+        elif self.path.startswith("/releases/tag/"):
+            self.respond(b"release page")
+        elif self.path == f"/releases/download/{NEW}/SHA2-256SUMS":
+            checksum = hashlib.sha256(self.binary).hexdigest()
+            self.respond(f"{checksum}  yt-dlp\n".encode())
+        elif self.path == f"/releases/download/{NEW}/yt-dlp":
+            body = self.binary
+            if self.corrupt:
+                body = body[:-10] + bytes(10)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            cls.downloading.set()
+            cls.release.wait(10)
+            self.wfile.write(body[len(body) // 2:])
+        else:
+            self.send_error(404)
+
+    def respond(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    StandIn.delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/releases"
+
+    config.CONFIG_DIR.mkdir(exist_ok=True)
+    config.YT_DLP_PATH.write_bytes(make_zip(OLD))
+    ytdlp.load()
+    import yt_dlp.version  # type: ignore
+
+    service = updater.UpdateService(url)
+
+    start = time.perf_counter()
+    service.latest_version(force=True)
+    blocking = time.perf_counter() - start
+    start = time.perf_counter()
+    future = service.submit(service.update_available, True)
+    submitting = time.perf_counter() - start
+    future.result()
+    print(f"GUI thread blocked, synchronous check {blocking * 1e3:8.1f} ms")
+    print(f"GUI thread blocked, background check  {submitting * 1e3:8.1f} ms")
+
+    before = StandIn.requests
+    start = time.perf_counter()
+    available = service.update_available()
+    cached = time.perf_counter() - start
+    assert StandIn.requests == before, "cached check hit the network"
+    print(f"cached check (no request)              {cached * 1e3:8.1f} ms")
+    assert available == NEW
+
+    StandIn.corrupt = True
+    StandIn.release.set()
+    try:
+        service.update(NEW)
+    except updater.UpdateError as e:
+        print(f"corrupt download rejected: {e}")
+    else:
+        raise AssertionError("corrupt download was installed")
+    assert ytdlp.installed_version() == OLD
+    StandIn.corrupt = False
+
+    StandIn.release.clear()
+    StandIn.downloading.clear()
+    future = service.submit(service.update, NEW)
+    StandIn.downloading.wait(10)
+    assert ytdlp.installed_version() == OLD, "zip replaced before verified"
+    print("installed zip intact while the update downloads")
+    StandIn.release.set()
+    future.result()
+    assert ytdlp.installed_version() == NEW
+
+    assert yt_dlp.version.__version__ == OLD
+    start = time.perf_counter()
+    ytdlp.reload()
+    reload_time = time.perf_counter() - start
+    import yt_dlp.version  # type: ignore # noqa: F811
+
+    assert yt_dlp.version.__version__ == NEW
+    print(f"hot reload {OLD} -> {NEW}      {reload_time * 1e3:8.1f} ms")
+    service.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
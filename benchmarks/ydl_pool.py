@@ -0,0 +1,98 @@
+"""
+Measures the per-URL overhead saved by reusing YoutubeDL instances.
+
+Runs a number of short jobs against a local stand-in extractor, once with
+a fresh YoutubeDL per URL (the old behaviour) and once through a
+`YoutubeDLPool`. Nothing is fetched from the network.
+
+    python benchmarks/ydl_pool.py [jobs]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+
+sys.path.insert(0, str(config.YT_DLP_PATH))
+
+from model import LOGGER, YoutubeDLPool  # noqa: E402
+from yt_dlp import YoutubeDL  # type: ignore # noqa: E402
+from yt_dlp.extractor.common import InfoExtractor  # type: ignore # noqa: E402
+
+
+class StandInIE(InfoExtractor):
+    _VALID_URL = r"standin:(?P<id>\d+)"
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        return {
+            "id": video_id,
+            "title": f"Clip {video_id}",
+            "formats": [
+                {
+                    "format_id": "360p",
+                    "url": f"http://127.0.0.1/{video_id}/360.mp4",
+                    "ext": "mp4",
+                    "height": 360,
+                },
+                {
+                    "format_id": "720p",
+                    "url": f"http://127.0.0.1/{video_id}/720.mp4",
+                    "ext": "mp4",
+                    "height": 720,
+                },
+            ],
+        }
+
+
+OPTIONS = {
+    "logger": LOGGER,
+    "quiet": True,
+    "skip_download": True,
+    "format": "best[height<=720][ext=mp4]",
+    "outtmpl": "%(title)s.%(ext)s",
+}
+
+
+def run_job(ydl: YoutubeDL, idx: int):
+    if "StandIn" not in ydl._ies:
+        ydl.add_info_extractor(StandInIE())
+    ydl.extract_info(f"standin:{idx}", ie_key="StandIn")
+
+
+def fresh(jobs: int) -> float:
+    start = time.perf_counter()
+    for idx in range(jobs):
+        with YoutubeDL(OPTIONS) as ydl:
+            run_job(ydl, idx)
+    return time.perf_counter() - start
+
+
+def pooled(jobs: int) -> float:
+    start = time.perf_counter()
+    pool = YoutubeDLPool()
+    try:
+        for idx in range(jobs):
+            run_job(pool.get(OPTIONS), idx)
+    finally:
+        pool.close()
+    return time.perf_counter() - start
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    fresh_time = fresh(jobs)
+    pooled_time = pooled(jobs)
+    saved = (fresh_time - pooled_time) / jobs * 1000
+    print(f"Jobs:           {jobs}")
+    print(f"Fresh instance: {fresh_time:.3f}s")
+    print(f"Pooled:         {pooled_time:.3f}s")
+    print(f"Saved per URL:  {saved:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 Remove-Item __main__.dist -r -fo
 
 ./compile_ui.ps1
+python media_downloader_deluxe/lang.py media_downloader_deluxe/langs
 
 nuitka `
     -o "Media Downloader Deluxe.exe" `
@@ -1,46 +1,38 @@
-import importlib
-import shutil
-import sys
-from pathlib import Path
-
-import config
-
-try:
-    # Put this inside try so it's not counted as above imports (cornflakes)
-    config.init_config()
-    sys.path.insert(0, str(config.YT_DLP_PATH))
-    import yt_dlp  # type: ignore
-    import yt_dlp.version  # type: ignore
-except ImportError:
-    shutil.copyfile(
-        Path(__file__).parent / "lib" / "yt-dlp",
-        config.YT_DLP_PATH,
-    )
-    importlib.invalidate_caches()
-    import yt_dlp  # type: ignore
-    import yt_dlp.version  # type: ignore
-
+import concurrent.futures
 import functools
+import os
 import sys
 import traceback
 import webbrowser
+from pathlib import Path
 from subprocess import getoutput
-from typing import Optional
+from typing import Callable, Optional, Union
 
+import config
 import enums
+import ingest
 import lang
+import updater
 import utils
-from model import LOGGER, DownloadManager, is_writable
+import ytdlp
+from archive import DownloadArchive
+from cache import InfoCache
+from client import DaemonBatch, DaemonClient, DaemonError
+from connectivity import ConnectivityMonitor
+from journal import JobJournal
+from model import LOGGER, DownloadManager, configure_logger, is_writable
+from progress import format_bytes, format_duration
 from PyQt6.QtCore import QLibraryInfo, Qt, QTimer, QTranslator
 from PyQt6.QtGui import QCloseEvent, QFont, QIcon
-from PyQt6.QtWidgets import QApplication, QDialog, QFileDialog, QMainWindow
-from ui.about_ui import Ui_Dialog as Ui_About
-from ui.licenses_ui import Ui_Dialog as Ui_Licenses
-from ui.settings_ui import Ui_Dialog as Ui_Settings
+from PyQt6.QtWidgets import QApplication, QFileDialog, QMainWindow
+from scheduler import ConcurrencyTuner, HostLimiter, RetryPolicy
+from sync import SyncIndex
 from ui.window_ui import Ui_MainWindow
-from version import __version__
 
 APPICON = None
+YTDLP = ytdlp.Loader()
+# URLs of an opened file shown in the text edit, the rest isn't rendered
+PREVIEW_LINES = 1000
 
 
 class Window(QMainWindow, Ui_MainWindow):
@@ -51,6 +43,20 @@ class Window(QMainWindow, Ui_MainWindow):
         # XXX self.te_history = []
         # XXX self.undo_history = []
         self.path = config.get_config_value("default_dir")
+        self.info_cache = InfoCache.from_config()
+        self.archive = DownloadArchive(config.ARCHIVE_PATH)
+        self.journal = JobJournal(config.JOURNAL_PATH)
+        self.sync_index = SyncIndex(config.SYNC_INDEX_PATH)
+        self.updater = updater.UpdateService()
+        self.connectivity = ConnectivityMonitor.from_config()
+        self.connectivity.start()
+        # (future, callback) pairs, see `when_done`
+        self.futures: list[tuple[concurrent.futures.Future, Callable]] = []
+        self.futures_timer = QTimer(self)
+        self.futures_timer.timeout.connect(self.poll_futures)
+        self.reload_pending = False
+        # The URLs of an opened file, until the text gets edited
+        self.opened: Optional[ingest.IngestResult] = None
         self.setWindowIcon(APPICON)
         self.setWindowState(Qt.WindowState.WindowActive)
         self.setupUi(self)
@@ -102,37 +108,89 @@ class Window(QMainWindow, Ui_MainWindow):
             }
         """
         self.apply_dark()
+        config.CONFIG.subscribe(lambda *_: self.apply_dark(), "dark")
         self.apply_lang()
 
-        def _ask_update_ytdlp():
-            try:
-                if not utils.is_ytdlp_latest_version():
-                    self.ask_update_ytdlp()
-            except ConnectionError:
-                pass
-
-        QTimer.singleShot(100, _ask_update_ytdlp)
+        # Downloads can start once yt-dlp finished loading in the background
+        self.ytdlp_timer = QTimer(self)
+        self.ytdlp_timer.timeout.connect(self.check_ytdlp_ready)
+        self.ytdlp_timer.start(50)
 
     def cleanup_dl(self):
         self.manager = None
         self.progress_bar.setValue(0)
         self.progress_display.setText("(0/0)")
         self.downloading = False
-        self.start_btn.setEnabled(True)
+        self.start_btn.setEnabled(YTDLP.ready.is_set() and not YTDLP.error)
         self.actionCancel.setDisabled(True)
 
-        # Tricky: This is not a True/False field but holds an url instead of
-        # True and is None instead of False
-        self.should_show_dl_error: Optional[str] = None
+        # URLs that failed every attempt
+        self.failed_urls: list[str] = []
+        # Tricky: This is not a True/False field but holds the failed urls
+        # instead of True and is None instead of False
+        self.should_show_dl_error: Optional[list[str]] = None
         # Same here but with amount of total videos
         self.should_show_success: Optional[int] = None
         # These are normal
         self.should_stop_timer = False
         self.should_cleanup = False
+        if self.reload_pending:
+            # The batch got cancelled before it could reload
+            self._reload_ytdlp()
+
+    def check_ytdlp_ready(self):
+        if not YTDLP.ready.is_set():
+            return
+        self.ytdlp_timer.stop()
+        if YTDLP.error:
+            LOGGER.error(f"Failed to load yt-dlp: {YTDLP.error!r}")
+            utils.show_error(
+                self,
+                self.lang["ytdlp_load_error_title"],
+                self.lang["ytdlp_load_error_desc"].format(
+                    error=YTDLP.error
+                ),
+            )
+            return
+        LOGGER.info(f"Loaded yt-dlp in {YTDLP.duration:.2f}s")
+        if not self.downloading:
+            self.start_btn.setEnabled(True)
+        self.when_done(
+            self.updater.submit(self.updater.update_available),
+            self.update_checked,
+        )
+        self.resume_unfinished()
+
+    def when_done(
+        self,
+        future: concurrent.futures.Future,
+        callback: Callable[[concurrent.futures.Future], None],
+    ):
+        """Call `callback` on the GUI thread once `future` is done."""
+        self.futures.append((future, callback))
+        if not self.futures_timer.isActive():
+            self.futures_timer.start(100)
+
+    def poll_futures(self):
+        for item in list(self.futures):
+            future, callback = item
+            if future.done():
+                self.futures.remove(item)
+                callback(future)
+        if not self.futures:
+            self.futures_timer.stop()
+
+    def update_checked(self, future: concurrent.futures.Future):
+        try:
+            new_version = future.result()
+        except ConnectionError as e:
+            LOGGER.warning(f"yt-dlp update check failed: {e}")
+            return
+        if new_version:
+            self.ask_update_ytdlp(new_version)
 
-    def ask_update_ytdlp(self):
-        old_version = yt_dlp.version.__version__
-        new_version = utils.fetch_latest_ytdlp_version()
+    def ask_update_ytdlp(self, new_version: str):
+        old_version = ytdlp.installed_version()
         if utils.ask_yes_no_question(
             self,
             self.lang["question_update_ytdlp_title"],
@@ -141,22 +199,57 @@ class Window(QMainWindow, Ui_MainWindow):
                 latest=new_version,
             )
         ):
-            utils.update_ytdlp()
-            utils.reload_zip_module(
-                config.YT_DLP_PATH, "yt_dlp"
-            )
-            yt_dlp.version = utils.reload_zip_module(
-                config.YT_DLP_PATH / "yt_dlp", "version"
+            self.when_done(
+                self.updater.submit(self.updater.update, new_version),
+                functools.partial(self.update_installed, old_version),
             )
-            utils.show_info(
+
+    def update_installed(
+        self, old_version: str, future: concurrent.futures.Future
+    ):
+        try:
+            new_version = future.result()
+        except (ConnectionError, updater.UpdateError) as e:
+            LOGGER.error(f"yt-dlp update failed: {e}")
+            utils.show_error(
                 self,
-                self.lang["update_updating_title"],
-                self.lang["update_updating_desc"].format(
-                    old=old_version,
-                    new=new_version,
-                ),
+                self.lang["settings_update_noconn_title"],
+                self.lang["settings_update_noconn_desc"],
             )
-            utils.restart_process()
+            return
+        self.reload_ytdlp()
+        utils.show_info(
+            self,
+            self.lang["update_updating_title"],
+            self.lang["update_updating_desc"].format(
+                old=old_version,
+                new=new_version,
+            ),
+        )
+
+    def reload_ytdlp(self):
+        """
+        Switch to the installed yt-dlp without restarting the app.
+
+        A running batch reloads between two jobs and goes on with the new
+        version, so nothing in its queue is lost.
+        """
+        if self.manager and self.downloading:
+            self.reload_pending = True
+            self.manager.request_reload(self._reload_ytdlp)
+        else:
+            self._reload_ytdlp()
+
+    def _reload_ytdlp(self):
+        # Might run on a download worker, between two jobs
+        self.reload_pending = False
+        self.info_cache.flush()
+        ytdlp.reload()
+        # Entries of the old version must not be used or written anymore
+        self.info_cache = InfoCache.from_config()
+        if isinstance(self.manager, DownloadManager):
+            self.manager.info_cache = self.info_cache
+        LOGGER.info(f"Reloaded yt-dlp {ytdlp.installed_version()}")
 
     def get_lang_dict(self) -> lang.LangDict:
         return lang.LangDict.from_langcode(config.get_config_value("locale"))
@@ -183,6 +276,16 @@ class Window(QMainWindow, Ui_MainWindow):
         self.actionCancel.triggered.connect(self.cancel)
         self.actionExit.triggered.connect(self.close)
         self.actionOpen_Settings.triggered.connect(self.open_settings)
+        self.actionSync_mode.setChecked(config.CONFIG.get_bool("sync_mode"))
+        self.actionSync_mode.toggled.connect(self.sync_mode)
+        self.actionUse_daemon.setChecked(config.CONFIG.get_bool("use_daemon"))
+        self.actionUse_daemon.toggled.connect(self.use_daemon)
+        self.actionAdaptive_concurrency.setChecked(
+            config.CONFIG.get_bool("adaptive_concurrency")
+        )
+        self.actionAdaptive_concurrency.toggled.connect(
+            self.adaptive_concurrency
+        )
         self.actionDark_mode.toggled.connect(self.dark_mode)
         self.actionAbout.triggered.connect(self.about)
         self.actionOpen_source_licenses.triggered.connect(self.licenses)
@@ -200,34 +303,41 @@ class Window(QMainWindow, Ui_MainWindow):
         self.type_box.currentTextChanged.connect(self.type_changed)
         self.start_btn.clicked.connect(self.start)
 
-    def verify_input(self):
-        if not self.text_edit.toPlainText().strip():
+    def verify_input(self) -> Optional[list[str]]:
+        """Return the canonical URLs of the input, None if it's invalid."""
+        if self.opened is not None:
+            # Validated while opening, the text edit only has a preview
+            result = self.opened._replace(errors=[])
+        else:
+            text = self.text_edit.toPlainText()
+            result = ingest.ingest_lines(text.splitlines())
+        if not result.urls and not result.errors:
             utils.show_error(
                 self,
                 self.lang["no_input_title"],
                 self.lang["no_input_desc"],
             )
-            return False
-        text = self.text_edit.toPlainText()
-        formatted = ""
-        for line in text.splitlines():
-            formatted += line.strip() + "\n" if line.strip() else ""
-        self.text_edit.setPlainText(formatted)
-        for idx, line in enumerate(
-            self.text_edit.toPlainText().splitlines(),
-            start=1,
-        ):
-            line = line.strip()
-            if not utils.is_valid_url(line):
-                utils.show_error(
-                    self,
-                    self.lang["malformed_url_title"],
-                    self.lang["malformed_url_desc"].format(
-                        idx=idx, url=line
-                    ),
-                )
-                return False
-        return True
+            return None
+        if result.errors:
+            self.show_malformed_urls(result.errors)
+            return None
+        if result.duplicates:
+            LOGGER.info(f"Skipped {result.duplicates} duplicate URLs")
+        if self.opened is None:
+            formatted = "\n".join(result.urls)
+            if formatted != text:
+                self.text_edit.setPlainText(formatted)
+        return result.urls
+
+    def show_malformed_urls(self, errors: list[tuple[int, str]]):
+        desc = self.lang["malformed_urls_desc"].format(
+            amount=len(errors), lines=ingest.format_errors(errors)
+        )
+        if len(errors) > 10:
+            desc += "\n" + self.lang["malformed_urls_more"].format(
+                amount=len(errors) - 10
+            )
+        utils.show_error(self, self.lang["malformed_url_title"], desc)
 
     def cancel(self):
         if not self.downloading:
@@ -245,7 +355,8 @@ class Window(QMainWindow, Ui_MainWindow):
         QTimer.singleShot(1000, self.cleanup_dl)
 
     def start(self):
-        if not self.verify_input():
+        urls = self.verify_input()
+        if urls is None:
             return
 
         if self.downloading:
@@ -260,7 +371,8 @@ class Window(QMainWindow, Ui_MainWindow):
             )
             return
 
-        if not utils.has_internet_connection():
+        # Cached by the monitor, None while the first probe is running
+        if self.connectivity.online is False:
             utils.show_error(
                 self,
                 self.lang["no_connection_title"],
@@ -268,64 +380,144 @@ class Window(QMainWindow, Ui_MainWindow):
             )
             return
 
-        self.downloading = True
-        self.start_btn.setDisabled(True)
-        self.actionCancel.setEnabled(True)
-
-        urls = list(map(str.strip, self.text_edit.toPlainText().splitlines()))
         parallel = self.checkBox.isChecked()
         type = enums.Type(self.type_box.currentIndex())
         if type == enums.Type.Music:
             quality = enums.MusicQuality(self.quality_box.currentIndex())
         else:
             quality = enums.Quality(self.quality_box.currentIndex())
-        max_parallel = config.get_config_value("max_parallel_downloads")  # noqa
+        tuner = None
+        if parallel:
+            max_parallel = config.CONFIG.get_int("max_parallel_downloads")
+            if config.CONFIG.get_bool("adaptive_concurrency"):
+                tuner = ConcurrencyTuner.from_config()
+        else:
+            max_parallel = 1
+
+        if config.CONFIG.get_bool("use_daemon"):
+            client = DaemonClient.from_info_file()
+            if client:
+                self.run_manager(DaemonBatch(
+                    client,
+                    urls,
+                    type,
+                    quality,
+                    path,
+                    self.dl_error_callback,
+                    sync=config.CONFIG.get_bool("sync_mode"),
+                ))
+                return
+            LOGGER.warning("No daemon is running, downloading locally")
 
-        def err_callback(url, err=None):
-            self.manager.killall()
-            self.should_show_dl_error = url
+        self.run_manager(DownloadManager(
+            urls,
+            type,
+            quality,
+            path,
+            self.dl_error_callback,
+            max_parallel=max_parallel,
+            tuner=tuner,
+            journal=self.journal,
+            **self.manager_options(),
+        ))
+
+    def manager_options(self) -> dict:
+        """Options shared by new and resumed `DownloadManager`s."""
+        return {
+            "info_cache": self.info_cache,
+            "archive": self.archive,
+            "sync": (
+                self.sync_index if config.CONFIG.get_bool("sync_mode")
+                else None
+            ),
+            "connectivity": self.connectivity,
+            "hosts": HostLimiter.from_config(),
+            "retry": RetryPolicy.from_config(),
+            "backend": config.get_config_value("download_backend"),
+            "expand_playlists": config.get_config_value("expand_playlists"),
+            "connections": config.CONFIG.get_int("connections_per_download"),
+            "audio_codec": config.get_config_value("audio_codec"),
+            "audio_bitrate": config.get_config_value("audio_bitrate"),
+        }
 
-        def thread_done_callback(url, success):
+    def resume_unfinished(self):
+        if self.downloading:
+            return
+        batches = self.journal.unfinished_batches()
+        if not batches:
+            return
+        if not utils.ask_yes_no_question(
+            self,
+            self.lang["resume_title"],
+            self.lang["resume_desc"].format(
+                amount=sum(len(batch.jobs) for batch in batches),
+            ),
+        ):
+            for batch in batches:
+                self.journal.remove_batch(batch.id)
+            return
+        # Only one batch runs at a time, the others are offered next launch
+        batch = batches[0]
+        if not is_writable(batch.path):
+            utils.show_error(
+                self,
+                self.lang["not_writable_title"],
+                self.lang["not_writable_desc"],
+            )
+            return
+        self.run_manager(DownloadManager.resume(
+            batch,
+            self.dl_error_callback,
+            self.journal,
+            **self.manager_options(),
+        ))
+
+    def dl_error_callback(self, url, err=None):
+        # The other jobs go on, failures are reported at the end
+        self.failed_urls.append(url)
+
+    def run_manager(self, manager: Union[DownloadManager, DaemonBatch]):
+        self.downloading = True
+        self.start_btn.setDisabled(True)
+        self.actionCancel.setEnabled(True)
+
+        def job_done_callback(url, success):
             if not self.downloading:
                 # Got cancelled
                 return
 
-            if not parallel:
-                try:
-                    self.manager.start_next()
-                except RuntimeError:
-                    pass
             if self.manager.is_completed():
+                # Expanded playlists only stand for their entries
+                total = sum(not job.expanded for job in self.manager.jobs)
                 self.progress_bar.setValue(100)
-                self.progress_display.setText(
-                    f"({len(self.manager.threads)}/"
-                    f"{len(self.manager.threads)})"
-                )
+                self.progress_display.setText(f"({total}/{total})")
                 self.should_stop_timer = True
                 if success:
-                    self.should_show_success = len(urls)
+                    self.should_show_success = total
+                elif self.failed_urls:
+                    self.should_show_dl_error = list(self.failed_urls)
                 self.should_cleanup = True
 
-        self.manager = DownloadManager(
-            urls,
-            type,
-            quality,
-            path,
-            err_callback,
-            parallel=True,  # Extra data
-        )
-        self.manager.register_thread_done_callback(thread_done_callback)
-
-        if parallel:
-            self.manager.start_all()
-        else:
-            self.manager.start_next()
+        self.manager = manager
+        self.manager.register_job_done_callback(job_done_callback)
 
         self.progress_updater = QTimer()
         self.progress_updater.timeout.connect(self.update_progress)
         self.progress_updater.setInterval(500)
         self.progress_updater.start()
 
+        try:
+            self.manager.start_all()
+        except (ConnectionError, DaemonError) as e:
+            LOGGER.error(f"Failed to submit to the daemon: {e}")
+            self.progress_updater.stop()
+            self.cleanup_dl()
+            utils.show_error(
+                self,
+                self.lang["daemon_error_title"],
+                self.lang["daemon_error_desc"].format(error=e),
+            )
+
     def update_progress(self):
         if self.should_show_dl_error:
             self.show_download_error(self.should_show_dl_error)
@@ -337,21 +529,26 @@ class Window(QMainWindow, Ui_MainWindow):
             self.cleanup_dl()
             return
 
-        threads = self.manager.threads
-        if self.manager.data.get("parallel"):
-            percents = []
-            for thread in threads:
-                percents.append(thread.percent)
-            avg = round(sum(percents) / len(threads))
-            self.progress_bar.setValue(avg)
-        else:
-            self.progress_bar.setValue(self.manager.current_thread.percent)
-        total = len(threads)
+        progress = self.manager.progress
+        total = 0
         finished = 0
-        for thread in threads:
-            if thread.done:
+        for job in self.manager.jobs:
+            if job.expanded:
+                continue
+            total += 1
+            if job.done:
                 finished += 1
-        self.progress_display.setText(f"({finished}/{total})")
+        self.progress_bar.setValue(round(progress.percent()))
+        text = f"({finished}/{total})"
+        speed = progress.bytes_per_second()
+        if speed:
+            text += f" {format_bytes(speed)}/s"
+            eta = progress.eta()
+            if eta is not None:
+                text += f", {format_duration(eta)}"
+        if self.manager.paused:
+            text += f" {self.lang['waiting_for_connection']}"
+        self.progress_display.setText(text)
 
     def show_success(self, amount: int):
         utils.show_info(
@@ -362,14 +559,17 @@ class Window(QMainWindow, Ui_MainWindow):
             )
         )
 
-    def show_download_error(self, url: str):
-        utils.show_error(
-            self,
-            self.lang["download_error_title"],
-            self.lang["download_error_desc"].format(
-                url=url,
-            ),
-        )
+    def show_download_error(self, urls: list[str]):
+        if len(urls) == 1:
+            desc = self.lang["download_error_desc"].format(url=urls[0])
+        else:
+            shown = urls[:10]
+            if len(urls) > len(shown):
+                shown.append("...")
+            desc = self.lang["download_errors_desc"].format(
+                amount=len(urls), urls="\n".join(shown)
+            )
+        utils.show_error(self, self.lang["download_error_title"], desc)
 
     def type_changed(self):
         self.quality_box.setCurrentIndex(1)  # Good should be default
@@ -409,6 +609,11 @@ class Window(QMainWindow, Ui_MainWindow):
         self.actionExit.setText(self.lang["exit"])
         self.menuSettings.setTitle(self.lang["settings"])
         self.actionOpen_Settings.setText(self.lang["open_settings"])
+        self.actionSync_mode.setText(self.lang["sync_mode"])
+        self.actionUse_daemon.setText(self.lang["use_daemon"])
+        self.actionAdaptive_concurrency.setText(
+            self.lang["adaptive_concurrency"]
+        )
         self.menuView.setTitle(self.lang["view"])
         self.actionDark_mode.setText(self.lang["dark_mode"])
         self.menuLanguage.setTitle(self.lang["language"])
@@ -467,6 +672,8 @@ class Window(QMainWindow, Ui_MainWindow):
         # XXX self.te_history.insert(0, prev)
         # XXX self.te_history = self.te_history[:50]
         self.actionUndo.setDisabled(False)
+        # The text is what gets downloaded again
+        self.opened = None
 
     def open(self):
         file_dialog = QFileDialog(self)
@@ -476,8 +683,8 @@ class Window(QMainWindow, Ui_MainWindow):
         if file_dialog.exec():
             file = file_dialog.selectedFiles()[0]
             try:
-                with open(file, "r", encoding="utf-8") as fp:
-                    content = fp.read()
+                # Streamed, huge lists never exist as a single string
+                result = ingest.ingest_file(file)
             except Exception as e:
                 return utils.show_error(
                     self,
@@ -486,8 +693,21 @@ class Window(QMainWindow, Ui_MainWindow):
                         file=file, error=e.__class__.__name__
                     ),
                 )
-            content = content.strip()
-            self.text_edit.setPlainText(content)
+            if result.errors:
+                self.show_malformed_urls(result.errors)
+            self.text_edit.setPlainText(
+                "\n".join(result.urls[:PREVIEW_LINES])
+            )
+            # After setting the text, which clears it
+            self.opened = result
+            if len(result.urls) > PREVIEW_LINES:
+                utils.show_info(
+                    self,
+                    self.lang["list_preview_title"],
+                    self.lang["list_preview_desc"].format(
+                        shown=PREVIEW_LINES, amount=len(result.urls)
+                    ),
+                )
 
     def clear_list(self):
         self.text_edit.setPlainText("")
@@ -543,8 +763,13 @@ class Window(QMainWindow, Ui_MainWindow):
                 pass
             else:
                 event.ignore()
+                return
+        self.updater.shutdown()
+        self.connectivity.stop()
 
     def open_settings(self):
+        from dialogs import SettingsDialog
+
         dialog = SettingsDialog(self)
         if dialog.exec():
             max_parallel_downloads = dialog.spinBox.value()
@@ -552,28 +777,61 @@ class Window(QMainWindow, Ui_MainWindow):
             config.set_config_value(
                 "max_parallel_downloads", max_parallel_downloads
             )
+            config.set_config_value(
+                "download_backend", dialog.BACKENDS[
+                    dialog.backend_box.currentIndex()
+                ]
+            )
+            config.set_config_value(
+                "audio_codec", dialog.AUDIO_CODECS[
+                    dialog.audio_codec_box.currentIndex()
+                ]
+            )
+            config.set_config_value(
+                "audio_bitrate", dialog.audio_bitrate_box.currentText()
+            )
+            config.set_config_value(
+                "connections_per_download", dialog.connections_box.value()
+            )
             config.set_config_value(
                 "default_dir", default_output_path
             )
             self.path = default_output_path
             self.output_path_display.setText(self.path)
 
+    def sync_mode(self):
+        config.set_config_value("sync_mode", self.actionSync_mode.isChecked())
+
+    def use_daemon(self):
+        config.set_config_value(
+            "use_daemon", self.actionUse_daemon.isChecked()
+        )
+
+    def adaptive_concurrency(self):
+        config.set_config_value(
+            "adaptive_concurrency",
+            self.actionAdaptive_concurrency.isChecked(),
+        )
+
     def dark_mode(self):
         dark = self.actionDark_mode.isChecked()
         config.set_config_value("dark", dark)
-        self.apply_dark()
 
     def apply_dark(self):
-        dark = config.get_config_value("dark")
+        dark = config.CONFIG.get_bool("dark")
         self.setStyleSheet(
             self.dark_stylesheet if dark else self.light_stylesheet
         )
 
     def about(self):
+        from dialogs import AboutDialog
+
         dialog = AboutDialog(self)
         dialog.exec()
 
     def licenses(self):
+        from dialogs import LicensesDialog
+
         dialog = LicensesDialog(self)
         dialog.exec()
 
@@ -588,127 +846,16 @@ class Window(QMainWindow, Ui_MainWindow):
             )
 
 
-class LicensesDialog(QDialog, Ui_Licenses):
-    def __init__(self, parent):
-        super().__init__(parent)
-        self.setWindowIcon(APPICON)
-        self.setupUi(self)
-        self.setFixedSize(self.size())
-
-    def setupUi(self, *args, **kwargs):
-        super().setupUi(*args, **kwargs)
-        self.setWindowTitle(self.parent().lang["window_licenses"])
-        self.header.setText(self.parent().lang["licenses_header"])
-
-
-class AboutDialog(QDialog, Ui_About):
-    def __init__(self, parent):
-        super().__init__(parent)
-        self.setWindowIcon(APPICON)
-        self.setupUi(self)
-        self.setFixedSize(self.size())
-
-    def setupUi(self, *args, **kwargs):
-        super().setupUi(*args, **kwargs)
-        self.setWindowTitle(self.parent().lang["window_about"])
-        self.label.setText(self.parent().lang["about_author"])
-        self.version.setText(self.parent().lang["about_version"].format(
-            version=__version__,
-        ))
-
-
-class SettingsDialog(QDialog, Ui_Settings):
-    def __init__(self, parent):
-        super().__init__(parent)
-        self.setWindowIcon(APPICON)
-        self.setupUi(self)
-        self.setMinimumSize(self.minimumSize())
-        self.output_path_change_btn.clicked.connect(self.change_output_path)
-        self.update_ytdlp.clicked.connect(self.update_ytdlp_action)
-
-    def setupUi(self, *args, **kwargs):
-        super().setupUi(*args, **kwargs)
-        self.setWindowTitle(self.parent().lang["window_settings"])
-        self.spinBox.setValue(
-            config.get_config_value("max_parallel_downloads")
-        )
-        self.output_path_display.setText(
-            config.get_config_value("default_dir")
-        )
-        self.yt_dlp_version.setText(yt_dlp.version.__version__)
-        self.label.setText(self.parent().lang["settings_header"])
-        self.label_2.setText(
-            self.parent().lang["settings_max_parallel_downloads"]
-        )
-        self.output_path_label.setText(
-            self.parent().lang["settings_default_output_path"]
-        )
-        self.output_path_change_btn.setText(
-            self.parent().lang["settings_change"]
-        )
-        self.label_3.setText(self.parent().lang["settings_ytdlp_version"])
-        self.update_ytdlp.setText(self.parent().lang["settings_update"])
-
-    def update_ytdlp_action(self):
-        self.update_ytdlp.setDisabled(True)
-        old_version = yt_dlp.version.__version__
-        try:
-            if utils.is_ytdlp_latest_version():
-                utils.show_info(
-                    self,
-                    self.parent().lang["settings_update_uptodate_title"],
-                    self.parent().lang[
-                        "settings_update_uptodate_desc"
-                    ].format(version=old_version),
-                )
-            else:
-                self.update_ytdlp.setDisabled(True)
-                self.update_ytdlp.setText(
-                    self.parent().lang["settings_updating"]
-                )
-                utils.update_ytdlp()
-                utils.reload_zip_module(config.YT_DLP_PATH, "yt_dlp")
-                yt_dlp.version = utils.reload_zip_module(
-                    config.YT_DLP_PATH / "yt_dlp", "version"
-                )
-                new_version = yt_dlp.version.__version__
-                self.update_ytdlp.setEnabled(True)
-                self.update_ytdlp.setText(
-                    self.parent().lang["settings_update"]
-                )
-                utils.show_info(
-                    self,
-                    self.parent().lang["settings_update_updating_title"],
-                    self.parent().lang["settings_update_updating_desc"].format(
-                        old=old_version,
-                        new=new_version,
-                    ),
-                )
-        except ConnectionError:
-            utils.show_error(
-                self,
-                self.parent().lang["settings_update_noconn_title"],
-                self.parent().lang["settings_update_noconn_desc"],
-            )
-        self.update_ytdlp.setDisabled(False)
-
-    def change_output_path(self):
-        file_dialog = QFileDialog(self)
-        file_dialog.setFileMode(QFileDialog.FileMode.Directory)
-        file_dialog.setDirectory(config.get_config_value("default_dir"))
-        if file_dialog.exec():
-            dir = file_dialog.selectedFiles()[0]
-            config.set_config_value("default_dir", dir)
-            self.output_path_display.setText(dir)
-
-
 def exchook(*exc_info):
     text = "".join(traceback.format_exception(*exc_info))
     LOGGER.error(text)
 
 
 if __name__ == "__main__":
+    config.init_config()
+    ytdlp.ensure_installed()
     sys.excepthook = exchook
+    configure_logger(subscribe=True)
     lang.LangDict.set_languages_path(Path(__file__).parent / "langs")
     app = QApplication(sys.argv)
 
@@ -724,7 +871,20 @@ if __name__ == "__main__":
         )
     )
     app.installTranslator(translator)
+    YTDLP.start(background=config.CONFIG.get_bool("lazy_ytdlp_import"))
     win = Window()
     win.show()
+    if os.environ.get("MDD_STARTUP_BENCHMARK"):
+        # Milestones for benchmarks/startup.py, quits once ready
+        QTimer.singleShot(0, lambda: print("window", flush=True))
+        ready_timer = QTimer()
+
+        def _report_ready():
+            if YTDLP.ready.is_set():
+                print("ready", flush=True)
+                app.quit()
+
+        ready_timer.timeout.connect(_report_ready)
+        ready_timer.start(5)
     code = app.exec()
     sys.exit(code)
@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from cache import normalize_url
+from enums import Quality, Type
+
+
+class DownloadArchive:
+    """
+    SQLite index of completed downloads.
+
+    Every row records the extractor and media id, the URL it was requested
+    with, the type and quality, and the output file with its size. A
+    download only counts as archived while its file still exists with the
+    recorded size inside the requested output directory.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS downloads (
+                    extractor TEXT NOT NULL,
+                    media_id TEXT NOT NULL,
+                    type INTEGER NOT NULL,
+                    quality INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    completed REAL NOT NULL,
+                    PRIMARY KEY (extractor, media_id, type, quality)
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS downloads_url "
+                "ON downloads (url, type, quality)"
+            )
+
+    @staticmethod
+    def _existing(
+        rows: list[tuple[str, int]], directory: Union[str, Path]
+    ) -> Optional[Path]:
+        directory = Path(directory).resolve()
+        for path, size in rows:
+            file = Path(path)
+            if file.parent.resolve() != directory:
+                continue
+            try:
+                if file.stat().st_size == size:
+                    return file
+            except OSError:
+                continue
+        return None
+
+    def find_url(
+        self,
+        url: str,
+        type_: Type,
+        quality: Quality,
+        directory: Union[str, Path],
+    ) -> Optional[Path]:
+        """Return the downloaded file of an URL if it's still complete."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, size FROM downloads "
+                "WHERE url = ? AND type = ? AND quality = ?",
+                (normalize_url(url), int(type_), int(quality)),
+            ).fetchall()
+        return self._existing(rows, directory)
+
+    def find(
+        self,
+        extractor: str,
+        media_id: str,
+        type_: Type,
+        quality: Quality,
+        directory: Union[str, Path],
+    ) -> Optional[Path]:
+        """Return the downloaded file of a media if it's still complete."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, size FROM downloads WHERE extractor = ? "
+                "AND media_id = ? AND type = ? AND quality = ?",
+                (extractor, media_id, int(type_), int(quality)),
+            ).fetchall()
+        return self._existing(rows, directory)
+
+    def add(
+        self,
+        extractor: str,
+        media_id: str,
+        url: str,
+        type_: Type,
+        quality: Quality,
+        path: Union[str, Path],
+    ):
+        path = Path(path).resolve()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO downloads VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    extractor,
+                    media_id,
+                    int(type_),
+                    int(quality),
+                    normalize_url(url),
+                    str(path),
+                    path.stat().st_size,
+                    time.time(),
+                ),
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,273 @@
+import atexit
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import config
+import ytdlp
+
+if platform.system() == "Windows":
+    import msvcrt
+else:
+    import fcntl
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize an URL so that equivalent spellings share a cache entry.
+
+    Scheme and host are lowercased, the fragment is dropped, query
+    parameters are sorted and a trailing slash is removed.
+    """
+    parts = urllib.parse.urlsplit(url.strip())
+    query = urllib.parse.urlencode(
+        sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    )
+    path = parts.path.rstrip("/")
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(), parts.netloc.lower(), path, query, ""
+    ))
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `path` across processes."""
+    with open(path, "a+b") as fp:
+        if platform.system() == "Windows":
+            fp.seek(0)
+            # Retries for 10 seconds, then raises OSError
+            msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if platform.system() == "Windows":
+                fp.seek(0)
+                msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+class InfoCache:
+    """
+    On-disk cache of unprocessed yt-dlp info dicts, keyed by normalized URL.
+
+    Every entry is a JSON file in `directory`. An index keeps the time every
+    entry was stored, in least recently used order, along with the yt-dlp
+    version that extracted them. Entries expire after `ttl` seconds, the
+    least recently used ones are evicted above `max_entries` and the whole
+    cache is dropped when the yt-dlp version changes. Instances of the old
+    version that are still around stop writing the index then.
+
+    Several processes may use the same directory, like the workers of the
+    process backend. Files are written under unique temporary names and
+    renamed, and the index is written `delay` seconds after the last
+    change, merged with the entries other processes added in the meantime
+    while holding a lock file.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        ttl: float,
+        max_entries: int,
+        version: str,
+        delay: float = 1.0,
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = version
+        self.delay = delay
+        self.index_path = self.directory / "index.json"
+        # Held by the process merging its changes into the index
+        self.lock_path = self.directory / "index.lock"
+        self.lock = threading.Lock()
+        # key -> time stored, least recently used first
+        self.index: OrderedDict[str, float] = OrderedDict()
+        # Removed since the last save, so merging doesn't bring them back
+        self.removed: set[str] = set()
+        self.timer: Optional[threading.Timer] = None
+        # Whether the index in memory differs from the file
+        self.dirty = False
+        self._load_index()
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_config(cls) -> "InfoCache":
+        return cls(
+            config.INFO_CACHE_DIR,
+            config.get_config_value("info_cache_ttl"),
+            config.get_config_value("info_cache_max_entries"),
+            ytdlp.installed_version(),
+        )
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(normalize_url(url).encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _write(self, path: Path, data):
+        """Write JSON atomically, other processes may write at once."""
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=self.directory,
+            prefix=f".{path.stem}.",
+            suffix=".tmp",
+            delete=False,
+        ) as fp:
+            try:
+                json.dump(data, fp)
+            except BaseException:
+                fp.close()
+                os.unlink(fp.name)
+                raise
+        os.replace(fp.name, path)
+
+    def _read_index(self) -> Optional[dict]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            return {}
+
+    def _load_index(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = self._read_index()
+        if not index or index.get("version") != self.version:
+            with file_lock(self.lock_path):
+                # Another process might have been first
+                index = self._read_index()
+                if index == {}:
+                    # Damaged, but the entries are still good
+                    self._rebuild_index()
+                    return
+                if not index or index.get("version") != self.version:
+                    self._clear()
+                    return
+        self.index = OrderedDict(index["entries"])
+
+    def _rebuild_index(self):
+        """Index the entry files by their modification time, locked."""
+        entries = []
+        for file in self.directory.glob("*.json"):
+            if file == self.index_path:
+                continue
+            with contextlib.suppress(OSError):
+                entries.append((file.stem, file.stat().st_mtime))
+        self.index = OrderedDict(sorted(entries, key=lambda item: item[1]))
+        self._merge_index()
+
+    def _save_index(self):
+        with file_lock(self.lock_path):
+            self._merge_index()
+
+    def _merge_index(self, take_over: bool = False):
+        """
+        Write the index, with the lock file held. An index of another
+        yt-dlp version is only replaced if `take_over` is True.
+        """
+        index = self._read_index()
+        if index and index.get("version") != self.version and not take_over:
+            # A newer yt-dlp cleared the cache since this one loaded it
+            self.index.clear()
+            self.removed.clear()
+            self.dirty = False
+            return
+        if index and index.get("version") == self.version:
+            # Added by other processes since this one loaded the index
+            for key, stored in reversed(index["entries"]):
+                if key not in self.index and key not in self.removed:
+                    self.index[key] = stored
+                    self.index.move_to_end(key, last=False)
+            while len(self.index) > self.max_entries:
+                self._remove(next(iter(self.index)))
+        self._write(
+            self.index_path,
+            {"version": self.version, "entries": list(self.index.items())},
+        )
+        self.removed.clear()
+        self.dirty = False
+
+    def _changed(self):
+        """Save the index `delay` seconds after the last change."""
+        self.dirty = True
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """Write pending changes of the index now."""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if self.dirty:
+                self._save_index()
+
+    def _remove(self, key: str):
+        self.index.pop(key, None)
+        self.removed.add(key)
+        self._entry_path(key).unlink(missing_ok=True)
+
+    def get(self, url: str) -> Optional[dict]:
+        key = self._key(url)
+        with self.lock:
+            stored = self.index.get(key)
+            if stored is None:
+                return None
+            if time.time() - stored > self.ttl:
+                self._remove(key)
+                self._changed()
+                return None
+            try:
+                with open(self._entry_path(key), "r", encoding="utf-8") as fp:
+                    info = json.load(fp)
+            except (OSError, ValueError):
+                self._remove(key)
+                self._changed()
+                return None
+            self.index.move_to_end(key)
+            # The order of use is kept too
+            self._changed()
+            return info
+
+    def put(self, url: str, info: dict):
+        key = self._key(url)
+        with self.lock:
+            self._write(self._entry_path(key), info)
+            self.index[key] = time.time()
+            self.index.move_to_end(key)
+            self.removed.discard(key)
+            while len(self.index) > self.max_entries:
+                self._remove(next(iter(self.index)))
+            self._changed()
+
+    def clear(self):
+        with self.lock, file_lock(self.lock_path):
+            self._clear()
+
+    def _clear(self):
+        """Remove every entry, with the lock file held."""
+        self.index.clear()
+        self.removed.clear()
+        for file in self.directory.glob("*.json"):
+            file.unlink(missing_ok=True)
+        self._merge_index(take_over=True)
@@ -0,0 +1,280 @@
+"""
+Headless entry point, downloads URLs without the GUI.
+
+URLs are read line by line from a file or stdin and queued as soon as
+they arrive. Progress and results are written to stdout as JSON lines,
+one event per line, log messages go to stderr. Qt is never imported, so
+this starts fast and runs on servers and from cron.
+
+    python cli.py [options] [FILE]
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, TextIO
+
+import config
+import ingest
+import ytdlp
+from archive import DownloadArchive
+from cache import InfoCache
+from connectivity import ConnectivityMonitor
+from enums import Quality, Type
+from httppool import POOL
+from model import LOGGER, DownloadManager, configure_logger, is_writable
+from scheduler import ConcurrencyTuner, HostLimiter, RetryPolicy
+from sync import SyncIndex
+
+TYPES = {
+    "video": Type.Video,
+    "music": Type.Music,
+    "video-only": Type.VideoOnly,
+}
+QUALITIES = {
+    "best": Quality.Best,
+    "good": Quality.Good,
+    "normal": Quality.Normal,
+    "bad": Quality.Bad,
+    "verybad": Quality.VeryBad,
+    "worst": Quality.Worst,
+}
+# Qualities that exist for music, see `enums.MusicQuality`
+MUSIC_QUALITIES = ("best", "normal", "worst")
+
+
+class EventWriter:
+    """Writes events as JSON lines, from any thread."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({"event": event, "time": time.time(), **fields})
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Download media without the GUI, reporting JSON lines."
+    )
+    parser.add_argument(
+        "file",
+        nargs="?",
+        default="-",
+        help="file with one URL per line, stdin if omitted or -",
+    )
+    parser.add_argument(
+        "-t", "--type", choices=TYPES, default="video", dest="type_"
+    )
+    parser.add_argument(
+        "-q",
+        "--quality",
+        choices=QUALITIES,
+        help="good by default, normal for music",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="parallel downloads, max_parallel_downloads by default",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action=argparse.BooleanOptionalAction,
+        help=(
+            "adapt the parallel downloads to the throughput, "
+            "adaptive_concurrency by default"
+        ),
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        help=(
+            "connections of a single download, "
+            "connections_per_download by default"
+        ),
+    )
+    parser.add_argument(
+        "-o", "--output", help="output directory, default_dir by default"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("thread", "process"),
+        help="download_backend by default",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="only download playlist entries that weren't synced before",
+    )
+    parser.add_argument(
+        "--no-archive",
+        action="store_true",
+        help="download again what's in the download archive",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=1.0,
+        help="seconds between progress events, 0 to disable",
+    )
+    args = parser.parse_args(argv)
+    if args.quality is None:
+        args.quality = "normal" if args.type_ == "music" else "good"
+    if args.type_ == "music" and args.quality not in MUSIC_QUALITIES:
+        parser.error(
+            f"music quality must be one of {', '.join(MUSIC_QUALITIES)}"
+        )
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+def report_progress(
+    manager: DownloadManager,
+    events: EventWriter,
+    interval: float,
+    stopped: threading.Event,
+):
+    while not stopped.wait(interval):
+        jobs = [job for job in manager.jobs if not job.expanded]
+        events.emit(
+            "progress",
+            percent=round(manager.progress.percent(), 2),
+            finished=sum(job.done for job in jobs),
+            total=len(jobs),
+            speed=manager.progress.bytes_per_second(),
+            eta=manager.progress.eta(),
+            paused=manager.paused,
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    config.init_config()
+    configure_logger()
+    events = EventWriter(sys.stdout)
+
+    path = Path(args.output or config.get_config_value("default_dir"))
+    if not is_writable(path):
+        events.emit("fatal", message=f"{path} is not a writable directory")
+        return 1
+    try:
+        ytdlp.load()
+    except Exception as e:
+        LOGGER.error(f"Failed to load yt-dlp: {e!r}")
+        events.emit("fatal", message=f"Failed to load yt-dlp: {e}")
+        return 1
+    try:
+        source = (
+            sys.stdin if args.file == "-"
+            else open(args.file, "r", encoding="utf-8")
+        )
+    except OSError as e:
+        events.emit("fatal", message=f"Cannot read {args.file}: {e}")
+        return 1
+
+    errors: dict[str, str] = {}
+
+    def error_callback(url: str, err: Optional[Exception] = None):
+        errors[url] = str(err) if err else "Download failed"
+        events.emit("error", url=url, message=errors[url])
+
+    connectivity = ConnectivityMonitor.from_config()
+    connectivity.start()
+    adaptive = args.adaptive
+    if adaptive is None:
+        adaptive = config.CONFIG.get_bool("adaptive_concurrency")
+    manager = DownloadManager(
+        [],
+        TYPES[args.type_],
+        QUALITIES[args.quality],
+        path,
+        error_callback,
+        max_parallel=(
+            args.jobs or config.CONFIG.get_int("max_parallel_downloads")
+        ),
+        info_cache=InfoCache.from_config(),
+        archive=None if args.no_archive else DownloadArchive(
+            config.ARCHIVE_PATH
+        ),
+        sync=SyncIndex(config.SYNC_INDEX_PATH) if args.sync else None,
+        backend=args.backend or config.get_config_value("download_backend"),
+        connectivity=connectivity,
+        hosts=HostLimiter.from_config(),
+        retry=RetryPolicy.from_config(),
+        tuner=ConcurrencyTuner.from_config() if adaptive else None,
+        expand_playlists=config.get_config_value("expand_playlists"),
+        connections=(
+            args.connections
+            or config.CONFIG.get_int("connections_per_download")
+        ),
+        audio_codec=config.get_config_value("audio_codec"),
+        audio_bitrate=config.get_config_value("audio_bitrate"),
+    )
+
+    def job_done_callback(url: str, success: Optional[bool]):
+        job = manager.find_job(url)
+        fields = {"url": url, "status": job.status if job else "unknown"}
+        if url in errors:
+            fields["message"] = errors[url]
+        events.emit("job", **fields)
+
+    manager.register_job_done_callback(job_done_callback)
+    start = time.monotonic()
+    manager.start_all(keep_open=True)
+    stopped = threading.Event()
+    if args.progress_interval > 0:
+        threading.Thread(
+            target=report_progress,
+            args=(manager, events, args.progress_interval, stopped),
+            daemon=True,
+        ).start()
+
+    try:
+        with source:
+            for line_number, line, url in ingest.iter_lines(source):
+                if url is None:
+                    events.emit("invalid", line=line_number, text=line)
+                elif manager.add_jobs([url]):
+                    events.emit("queued", url=url)
+                else:
+                    events.emit("duplicate", url=url)
+        manager.close()
+        while not manager.is_completed():
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        manager.killall()
+        events.emit("cancelled")
+        return 130
+    except (OSError, UnicodeDecodeError) as e:
+        # Like a file that isn't text
+        manager.killall()
+        events.emit("fatal", message=f"Cannot read {args.file}: {e}")
+        return 1
+    finally:
+        stopped.set()
+        connectivity.stop()
+
+    jobs = [job for job in manager.jobs if not job.expanded]
+    events.emit(
+        "finished",
+        total=len(jobs),
+        failed=sum(job.errored for job in jobs),
+        skipped=sum(job.skipped for job in jobs),
+        seconds=round(time.monotonic() - start, 3),
+        dead_letters=[letter._asdict() for letter in manager.dead_letters],
+        connections=POOL.stats(),
+    )
+    return 0 if manager.was_successful() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
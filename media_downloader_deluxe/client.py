@@ -0,0 +1,255 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+import config
+from cli import QUALITIES, TYPES
+from enums import Quality, Type
+from model import LOGGER, Job
+
+
+class DaemonError(Exception):
+    """The daemon rejected a request."""
+
+
+class DaemonClient:
+    """Talks to a running daemon, see daemon.py for the API."""
+
+    def __init__(self, url: str, token: str, timeout: float = 5):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def from_info_file(
+        cls, path: Path = config.DAEMON_INFO_PATH
+    ) -> Optional["DaemonClient"]:
+        """Return a client of the running daemon, None if there's none."""
+        try:
+            with open(path, "r", encoding="utf-8") as fp:
+                info = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        client = cls(f"http://127.0.0.1:{info['port']}", info["token"])
+        try:
+            client.health()
+        except (ConnectionError, DaemonError):
+            return None
+        return client
+
+    def _request(
+        self, method: str, path: str, body: Optional[Any] = None
+    ) -> Any:
+        request = urllib.request.Request(
+            self.url + path,
+            method=method,
+            data=None if body is None else json.dumps(body).encode("utf-8"),
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            },
+        )
+        try:
+            with urllib.request.urlopen(
+                request, timeout=self.timeout
+            ) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise DaemonError(message)
+        except (urllib.error.URLError, OSError):
+            raise ConnectionError(f"Daemon at {self.url} is not reachable")
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def submit(
+        self,
+        urls: list[str],
+        type_: str = "video",
+        quality: Optional[str] = None,
+        path: Optional[Union[str, Path]] = None,
+        sync: bool = False,
+    ) -> dict:
+        return self._request("POST", "/jobs", {
+            "urls": urls,
+            "type": type_,
+            "quality": quality,
+            "path": None if path is None else str(path),
+            "sync": sync,
+        })
+
+    def list(self) -> list[dict]:
+        return self._request("GET", "/jobs")
+
+    def status(self, batch_id: int) -> dict:
+        return self._request("GET", f"/jobs/{batch_id}")
+
+    def cancel(self, batch_id: int) -> dict:
+        return self._request("DELETE", f"/jobs/{batch_id}")
+
+    def events(self, batch_id: Optional[int] = None) -> Iterator[dict]:
+        """Yield the events of all or one batch as they happen."""
+        query = "" if batch_id is None else f"?batch={batch_id}"
+        request = urllib.request.Request(
+            f"{self.url}/events{query}",
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        with urllib.request.urlopen(request) as response:
+            for line in response:
+                if line.startswith(b"data: "):
+                    yield json.loads(line[len(b"data: "):])
+
+
+class RemoteBatchProgress:
+    """The parts of a `ProgressStore` the GUI reads, from a status."""
+
+    def __init__(self):
+        self.values = {"percent": 0.0, "speed": 0.0, "eta": None}
+
+    def percent(self) -> float:
+        return self.values["percent"]
+
+    def bytes_per_second(self) -> float:
+        return self.values["speed"]
+
+    def eta(self) -> Optional[float]:
+        return self.values["eta"]
+
+
+class DaemonBatch:
+    """
+    A batch running in the daemon, in place of a local `DownloadManager`.
+
+    Offers the parts of the manager the GUI uses, so it works as a thin
+    client. The batch's status is polled every `interval` seconds and the
+    callbacks are called for every job that finished since.
+    """
+
+    FINISHED = ("done", "failed", "skipped", "expanded")
+
+    def __init__(
+        self,
+        client: DaemonClient,
+        urls: list[str],
+        type_: Type,
+        quality: Quality,
+        path: Union[str, Path],
+        error_callback: Callable[[str, Optional[Exception]], None],
+        sync: bool = False,
+        interval: float = 0.5,
+    ):
+        self.client = client
+        self.urls = urls
+        self.type = type_
+        self.quality = quality
+        self.path = path
+        self.error_callback = error_callback
+        self.sync = sync
+        self.interval = interval
+        self.batch_id: Optional[int] = None
+        self.jobs: list[Job] = [
+            Job(url, slot) for slot, url in enumerate(urls)
+        ]
+        self.progress = RemoteBatchProgress()
+        self.paused = False
+        self.state = "running"
+        self.job_done_callback: Optional[
+            Callable[[str, Optional[bool]], None]
+        ] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def register_job_done_callback(
+        self, callback: Optional[Callable[[str, Optional[bool]], None]]
+    ):
+        self.job_done_callback = callback
+
+    def start_all(self):
+        names = {value: key for key, value in TYPES.items()}
+        qualities = {value: key for key, value in QUALITIES.items()}
+        batch = self.client.submit(
+            self.urls,
+            names[self.type],
+            qualities[self.quality.to_standard()],
+            self.path,
+            self.sync,
+        )
+        self.batch_id = batch["id"]
+        self._update(batch)
+        self.thread = threading.Thread(target=self._poll, daemon=True)
+        self.thread.start()
+
+    def _poll(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self._update(self.client.status(self.batch_id))
+            except (ConnectionError, DaemonError) as e:
+                LOGGER.error(f"Lost batch {self.batch_id} of daemon: {e}")
+                self._fail_remaining()
+                return
+            if self.state != "running":
+                return
+
+    def _update(self, batch: dict):
+        self.progress.values = {
+            key: batch[key] for key in ("percent", "speed", "eta")
+        }
+        self.paused = batch["paused"]
+        finished = []
+        for slot, status in enumerate(batch["jobs"]):
+            if slot == len(self.jobs):
+                # Entries of an expanded playlist
+                self.jobs.append(Job(status["url"], slot))
+            job = self.jobs[slot]
+            if job.done or status["status"] not in self.FINISHED:
+                job.started = status["status"] != "queued"
+                continue
+            job.expanded = status["status"] == "expanded"
+            job.errored = status["status"] == "failed"
+            job.skipped = status["status"] == "skipped"
+            if job.errored:
+                self.error_callback(
+                    job.url, DaemonError(status.get("message", ""))
+                )
+            job.done = True
+            finished.append(job)
+        self.state = batch["state"]
+        if self.job_done_callback:
+            for job in finished:
+                self.job_done_callback(job.url, self.was_successful())
+
+    def _fail_remaining(self):
+        for job in self.jobs:
+            if not job.done:
+                job.errored = True
+                job.done = True
+                self.error_callback(job.url, None)
+                if self.job_done_callback:
+                    self.job_done_callback(job.url, False)
+
+    def is_completed(self) -> bool:
+        return all(job.done for job in self.jobs)
+
+    def was_successful(self) -> bool:
+        return all(job.done and not job.errored for job in self.jobs)
+
+    def request_reload(self, reload: Callable[[], None]):
+        # The daemon has a yt-dlp of its own
+        reload()
+
+    def killall(self):
+        self.stopped.set()
+        for job in self.jobs:
+            job.killed = True
+        if self.batch_id is not None:
+            try:
+                self.client.cancel(self.batch_id)
+            except (ConnectionError, DaemonError) as e:
+                LOGGER.error(f"Failed to cancel batch {self.batch_id}: {e}")
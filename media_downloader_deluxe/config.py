@@ -1,17 +1,57 @@
+import atexit
+import contextlib
 import json
 import locale
+import os
+import threading
 from pathlib import Path
 import platform
-from PyQt6.QtCore import QStandardPaths
+from typing import Any, Callable, Optional
 
-CONFIG_DIR = Path(
-    QStandardPaths.writableLocation(
-        QStandardPaths.StandardLocation.AppDataLocation
+
+# Resolved like Qt's QStandardPaths, without importing Qt, so the
+# headless entry point starts fast and runs where Qt isn't available
+def _app_data_location() -> Path:
+    if platform.system() == "Windows":
+        return Path(os.environ.get("APPDATA", Path.home() / "AppData/Roaming"))
+    if platform.system() == "Darwin":
+        return Path.home() / "Library" / "Application Support"
+    return Path(
+        os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
     )
-) / "Media Downloader Deluxe"
+
+
+def _movies_location() -> Path:
+    if platform.system() == "Darwin":
+        return Path.home() / "Movies"
+    if platform.system() != "Windows":
+        config_home = Path(
+            os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+        )
+        with contextlib.suppress(OSError):
+            with open(config_home / "user-dirs.dirs", encoding="utf-8") as fp:
+                for line in fp:
+                    key, _, value = line.strip().partition("=")
+                    if key == "XDG_VIDEOS_DIR":
+                        value = value.strip('"').replace(
+                            "$HOME", str(Path.home())
+                        )
+                        return Path(value)
+    return Path.home() / "Videos"
+
+
+CONFIG_DIR = _app_data_location() / "Media Downloader Deluxe"
 CONFIG_PATH = CONFIG_DIR / ".config"
 LOGGER_PATH = CONFIG_DIR / "latest.log"
 YT_DLP_PATH = CONFIG_DIR / "yt-dlp"
+# Extracted copies of the yt-dlp zip, one directory per version
+YT_DLP_EXTRACT_DIR = CONFIG_DIR / "yt-dlp-extracted"
+INFO_CACHE_DIR = CONFIG_DIR / "info_cache"
+ARCHIVE_PATH = CONFIG_DIR / "archive.sqlite3"
+JOURNAL_PATH = CONFIG_DIR / "journal.sqlite3"
+SYNC_INDEX_PATH = CONFIG_DIR / "sync.sqlite3"
+# Port and token of a running daemon, see daemon.py
+DAEMON_INFO_PATH = CONFIG_DIR / "daemon.json"
 
 SUPPORTED_LOCALES = ["de_DE", "en_US"]
 DEFAULT_LOCALE = "en_US"
@@ -27,47 +67,230 @@ def config_exists():
 
 
 def create_app_dir():
-    if not CONFIG_DIR.exists():
-        CONFIG_DIR.mkdir()
+    # Fresh accounts, like the ones of servers, may lack its parents
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def init_config():
-    create_app_dir()
+def _default_config() -> dict:
+    return {
+        "locale": (
+            SYSTEM_LOCALE
+            if SYSTEM_LOCALE in SUPPORTED_LOCALES
+            else DEFAULT_LOCALE
+        ),
+        "dark": False,
+        "default_dir": _movies_location().as_posix(),
+        "max_parallel_downloads": 10,
+        # Limits of every site, see scheduler.HostLimit, 0 for no limit
+        "host_max_parallel": 4,
+        "host_rate": 1.0,
+        "host_burst": 4,
+        # Site -> limits that differ from the ones above
+        "host_limits": {
+            "youtube.com": {"max_parallel": 3, "rate": 0.5},
+            "instagram.com": {"max_parallel": 1, "rate": 0.2, "burst": 1},
+            "tiktok.com": {"max_parallel": 2, "rate": 0.5},
+        },
+        # Failures of a site in a row that pause its jobs for a cooldown
+        "breaker_threshold": 5,
+        "breaker_cooldown": 120.0,
+        # Attempts of a failed job, see scheduler.RetryPolicy
+        "max_attempts": 3,
+        "retry_base_delay": 5.0,
+        "retry_max_delay": 300.0,
+        # Retries of single requests inside yt-dlp
+        "request_retries": 10,
+        # Seconds downloads wait for a lost network to come back at most
+        "max_offline_wait": 300.0,
+        # Adapt the parallel downloads to the measured throughput, between
+        # these bounds, see scheduler.ConcurrencyTuner
+        "adaptive_concurrency": False,
+        "adaptive_min_parallel": 2,
+        "adaptive_max_parallel": 32,
+        "adaptive_interval": 3.0,
+        # Connections of a single download, see segmented.py
+        "connections_per_download": 4,
+        # "thread" or "process"
+        "download_backend": "thread",
+        # Download playlist and channel entries as jobs of their own
+        "expand_playlists": True,
+        # Only download playlist entries that weren't synced before
+        "sync_mode": False,
+        "daemon_port": 8787,
+        # Submit downloads to a running daemon instead of running them
+        "use_daemon": False,
+        "conntest_url": "https://8.8.8.8",
+        # Probed together with conntest_url, any answer means online
+        "conntest_urls": ["https://1.1.1.1", "https://9.9.9.9"],
+        # Show the window first and import yt-dlp in the background
+        "lazy_ytdlp_import": True,
+        # Seconds the latest yt-dlp version found online is trusted
+        "ytdlp_update_check_ttl": 6 * 60 * 60,
+        "ytdlp_latest_version": None,
+        "ytdlp_latest_checked": 0.0,
+        # One of model.AUDIO_CODECS, only re-encoded if the source differs
+        "audio_codec": "mp3",
+        "audio_bitrate": "192k",
+        # One of model.Logger.LEVELS
+        "log_level": "DEBUG",
+        "log_json": False,
+        "log_max_bytes": 5 * 1024 * 1024,
+        "log_backups": 3,
+        # Seconds, format URLs of most sites expire after a few hours
+        "info_cache_ttl": 1800,
+        "info_cache_max_entries": 2000,
+    }
+
+
+class Config:
+    """
+    The config file, loaded once and kept in memory.
+
+    Values missing in the file fall back to `defaults`, which also define
+    the type of every key for the typed getters. Changes apply in memory
+    right away and are written `delay` seconds after the last one, through
+    a temporary file that replaces the config atomically. Subscribers get
+    called with the key and the new value of every change.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        defaults: Callable[[], dict],
+        delay: float = 0.5,
+    ):
+        self.path = path
+        self.defaults = defaults
+        self.delay = delay
+        self.lock = threading.RLock()
+        self.values: Optional[dict] = None
+        self.default_values: dict = {}
+        self.timer: Optional[threading.Timer] = None
+        # Whether memory differs from the file
+        self.dirty = False
+        # key (None for every key) -> callbacks
+        self.subscribers: dict[Optional[str], list[Callable]] = {}
+
+    def load(self):
+        with self.lock:
+            self.default_values = self.defaults()
+            try:
+                with open(self.path, "r", encoding="utf-8") as fp:
+                    values = json.load(fp)
+            except FileNotFoundError:
+                values = {}
+            # Configs of older versions lack newer keys
+            missing = [key for key in self.default_values if key not in values]
+            self.values = {
+                **{key: self.default_values[key] for key in missing},
+                **values,
+            }
+            if missing:
+                self.dirty = True
+                self.save()
 
-    if not config_exists():
-        with open(CONFIG_PATH, "w", encoding="utf-8") as fp:
-            json.dump(
-                {
-                    "locale": (
-                        SYSTEM_LOCALE
-                        if SYSTEM_LOCALE in SUPPORTED_LOCALES
-                        else DEFAULT_LOCALE
-                    ),
-                    "dark": False,
-                    "default_dir": QStandardPaths.writableLocation(
-                        QStandardPaths.StandardLocation.MoviesLocation
-                    ),
-                    "max_parallel_downloads": 10,
-                    "conntest_url": "https://8.8.8.8"
-                }, fp
-            )
+    def _loaded(self) -> dict:
+        if self.values is None:
+            self.load()
+        return self.values
 
+    def get(self, key: str):
+        with self.lock:
+            return self._loaded()[key]
 
-def _get_config() -> dict:
-    with open(CONFIG_PATH, "r", encoding="utf-8") as fp:
-        return json.load(fp)
+    def _get_typed(self, key: str, type_: type):
+        value = self.get(key)
+        if isinstance(value, type_) and not (
+            type_ is int and isinstance(value, bool)
+        ):
+            return value
+        default = self.default_values.get(key)
+        try:
+            return type_(value)
+        except (TypeError, ValueError):
+            if default is None:
+                raise
+            return default
 
+    def get_str(self, key: str) -> str:
+        return self._get_typed(key, str)
 
-def _overwrite_config(config: dict):
-    with open(CONFIG_PATH, "w", encoding="utf-8") as fp:
-        json.dump(config, fp)
+    def get_int(self, key: str) -> int:
+        return self._get_typed(key, int)
+
+    def get_float(self, key: str) -> float:
+        return self._get_typed(key, float)
+
+    def get_bool(self, key: str) -> bool:
+        value = self.get(key)
+        if isinstance(value, str):
+            return value.lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
+    def set(self, key: str, value: Any):
+        with self.lock:
+            values = self._loaded()
+            if key in values and values[key] == value:
+                return
+            values[key] = value
+            self.dirty = True
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.save)
+            self.timer.daemon = True
+            self.timer.start()
+            callbacks = [
+                *self.subscribers.get(key, []),
+                *self.subscribers.get(None, []),
+            ]
+        for callback in callbacks:
+            callback(key, value)
+
+    def subscribe(
+        self, callback: Callable[[str, Any], None], key: Optional[str] = None
+    ):
+        """Call `callback` on changes of `key`, or of any key if None."""
+        with self.lock:
+            self.subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(
+        self, callback: Callable[[str, Any], None], key: Optional[str] = None
+    ):
+        with self.lock:
+            with contextlib.suppress(KeyError, ValueError):
+                self.subscribers[key].remove(callback)
+
+    def save(self):
+        """Write pending changes now."""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Other instances might save at the same time
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as fp:
+                json.dump(self.values, fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+            tmp.replace(self.path)
+            self.dirty = False
+
+
+CONFIG = Config(CONFIG_PATH, _default_config)
+atexit.register(CONFIG.save)
+
+
+def init_config():
+    create_app_dir()
+    CONFIG.load()
 
 
 def get_config_value(key: str):
-    return _get_config()[key]
+    return CONFIG.get(key)
 
 
-def set_config_value(key: str, value: str):
-    config = _get_config()
-    config[key] = value
-    _overwrite_config(config)
+def set_config_value(key: str, value: Any):
+    CONFIG.set(key, value)
@@ -0,0 +1,123 @@
+import concurrent.futures
+import threading
+import time
+from typing import Callable, Optional
+
+import config
+from httppool import POOL
+
+
+class ConnectivityMonitor:
+    """
+    Keeps track of whether the internet is reachable, in the background.
+
+    All endpoints are probed concurrently and a single one answering is
+    enough, so one blocked or slow host doesn't count as being offline.
+    The result is cached for `max_age` seconds and refreshed every
+    `interval` seconds by a monitor thread. Subscribers are called with
+    the new state whenever it changes, from the probing thread.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        interval: float = 5,
+        max_age: float = 2,
+        timeout: float = 2,
+    ):
+        self.urls = urls
+        self.interval = interval
+        self.max_age = max_age
+        self.timeout = timeout
+        # None until the first probe finished
+        self.online: Optional[bool] = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+        self.probe_lock = threading.Lock()
+        self.subscribers: list[Callable[[bool], None]] = []
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, len(urls)), thread_name_prefix="conntest"
+        )
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    @classmethod
+    def from_config(cls) -> "ConnectivityMonitor":
+        urls = [config.get_config_value("conntest_url")]
+        for url in config.get_config_value("conntest_urls"):
+            if url not in urls:
+                urls.append(url)
+        return cls(urls)
+
+    def _probe_one(self, url: str) -> bool:
+        try:
+            # Any answer, even an error or a redirect, means the host is
+            # reachable. Kept alive, so later probes skip the handshakes.
+            with POOL.request("HEAD", url, timeout=self.timeout):
+                pass
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def probe(self) -> bool:
+        """Probe all endpoints now and return whether any answered."""
+        with self.probe_lock:
+            futures = [
+                self.executor.submit(self._probe_one, url)
+                for url in self.urls
+            ]
+            online = False
+            for future in concurrent.futures.as_completed(futures):
+                if future.result():
+                    online = True
+                    break
+            for future in futures:
+                future.cancel()
+            self._publish(online)
+            return online
+
+    def _publish(self, online: bool):
+        with self.lock:
+            changed = online != self.online
+            self.online = online
+            self.checked = time.monotonic()
+            subscribers = list(self.subscribers)
+        if changed:
+            for callback in subscribers:
+                callback(online)
+
+    def check(self, max_age: Optional[float] = None) -> bool:
+        """Return the cached state if recent enough, probe otherwise."""
+        max_age = self.max_age if max_age is None else max_age
+        with self.lock:
+            fresh = time.monotonic() - self.checked <= max_age
+            online = self.online
+        if fresh and online is not None:
+            return online
+        return self.probe()
+
+    def subscribe(self, callback: Callable[[bool], None]):
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[bool], None]):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def start(self):
+        if self.thread:
+            return
+        self.thread = threading.Thread(
+            target=self._run, name="connectivity", daemon=True
+        )
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.check(self.interval / 2)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
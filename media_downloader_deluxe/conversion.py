@@ -0,0 +1,28 @@
+import concurrent.futures
+import os
+from typing import Callable, Optional
+
+
+class ConversionPipeline:
+    """
+    Runs conversions of finished downloads on a pool of their own.
+
+    FFmpeg is CPU bound while downloads are I/O bound, so download workers
+    hand their files over and go on with the next URL instead of waiting
+    for the transcode. The pool is sized to the CPU cores by default.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="convert",
+        )
+
+    def submit(
+        self, func: Callable, *args, **kwargs
+    ) -> concurrent.futures.Future:
+        return self.executor.submit(func, *args, **kwargs)
+
+    def shutdown(self, cancel: bool = False):
+        self.executor.shutdown(wait=False, cancel_futures=cancel)
@@ -0,0 +1,500 @@
+"""
+Local download daemon, one engine shared by every client on the machine.
+
+All batches run with one shared limit of parallel downloads, shared
+limits of every host, one info cache and one archive. Clients talk JSON
+over HTTP on localhost:
+
+    GET    /health          daemon and yt-dlp version, HTTP connection
+                            pool stats
+    POST   /jobs            submit {"urls", "type", "quality", "path",
+                            "sync"}, all but "urls" optional
+    GET    /jobs            all batches, without their jobs
+    GET    /jobs/<id>       a batch with the state of every job
+    DELETE /jobs/<id>       cancel a batch
+    GET    /events[?batch=<id>]
+                            server-sent events of all or one batch
+
+Every request needs the token from the daemon's info file, see
+`client.DaemonClient`, as `Authorization: Bearer <token>`.
+
+    python daemon.py [--port PORT]
+"""
+
+import argparse
+import http.server
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Any, Optional
+
+import config
+import ingest
+import ytdlp
+from archive import DownloadArchive
+from cache import InfoCache
+from cli import MUSIC_QUALITIES, QUALITIES, TYPES
+from connectivity import ConnectivityMonitor
+from httppool import POOL
+from model import LOGGER, DownloadManager, configure_logger, is_writable
+from scheduler import HostLimiter, RetryPolicy
+from sync import SyncIndex
+from version import __version__
+
+
+class EventHub:
+    """Fans events out to every subscriber, like SSE connections."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: list[queue.SimpleQueue] = []
+
+    def subscribe(self) -> queue.SimpleQueue:
+        events: queue.SimpleQueue = queue.SimpleQueue()
+        with self.lock:
+            self.subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.SimpleQueue):
+        with self.lock:
+            if events in self.subscribers:
+                self.subscribers.remove(events)
+
+    def publish(self, event: str, **fields):
+        message = {"event": event, "time": time.time(), **fields}
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            events.put(message)
+
+
+class Batch:
+    """A submitted batch and its `DownloadManager`."""
+
+    def __init__(self, id_: int, manager: DownloadManager, options: dict):
+        self.id = id_
+        self.manager = manager
+        self.options = options
+        self.created = time.time()
+        self.cancelled = False
+        # url: error message
+        self.errors: dict[str, str] = {}
+
+    @property
+    def state(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        if self.manager.is_completed():
+            return "completed"
+        return "running"
+
+    def to_dict(self, jobs: bool = True) -> dict[str, Any]:
+        manager = self.manager
+        counted = [job for job in manager.jobs if not job.expanded]
+        result = {
+            "id": self.id,
+            "state": self.state,
+            "created": self.created,
+            **self.options,
+            "percent": round(manager.progress.percent(), 2),
+            "speed": manager.progress.bytes_per_second(),
+            "eta": manager.progress.eta(),
+            "paused": manager.paused,
+            "finished": sum(job.done for job in counted),
+            "total": len(counted),
+        }
+        if jobs:
+            result["jobs"] = [
+                {
+                    "url": job.url,
+                    "status": job.status,
+                    "attempts": job.attempts,
+                    **(
+                        {"message": self.errors[job.url]}
+                        if job.url in self.errors else {}
+                    ),
+                }
+                for job in manager.jobs
+            ]
+        return result
+
+
+class DownloadService:
+    """
+    The download engine of the daemon.
+
+    Batches get a `DownloadManager` each, but they share one semaphore of
+    `max_parallel` slots and one `HostLimiter`, so neither the total
+    amount of downloads nor the load on a host grows with the amount of
+    clients. Finished batches are kept for status
+    requests until there are more than `keep_finished` of them.
+    """
+
+    def __init__(
+        self,
+        max_parallel: int,
+        info_cache: Optional[InfoCache] = None,
+        archive: Optional[DownloadArchive] = None,
+        sync: Optional[SyncIndex] = None,
+        connectivity: Optional[ConnectivityMonitor] = None,
+        hosts: Optional[HostLimiter] = None,
+        keep_finished: int = 100,
+        progress_interval: float = 1.0,
+        **manager_options,
+    ):
+        self.max_parallel = max(1, max_parallel)
+        self.slots = threading.Semaphore(self.max_parallel)
+        self.info_cache = info_cache
+        self.archive = archive
+        self.sync = sync
+        self.connectivity = connectivity
+        self.hosts = hosts or HostLimiter()
+        self.keep_finished = keep_finished
+        self.progress_interval = progress_interval
+        self.manager_options = manager_options
+        self.events = EventHub()
+        self.lock = threading.Lock()
+        self.batches: dict[int, Batch] = {}
+        self.next_id = 1
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._report_progress, name="progress", daemon=True
+        )
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls) -> "DownloadService":
+        connectivity = ConnectivityMonitor.from_config()
+        connectivity.start()
+        return cls(
+            config.CONFIG.get_int("max_parallel_downloads"),
+            info_cache=InfoCache.from_config(),
+            archive=DownloadArchive(config.ARCHIVE_PATH),
+            sync=SyncIndex(config.SYNC_INDEX_PATH),
+            connectivity=connectivity,
+            hosts=HostLimiter.from_config(),
+            retry=RetryPolicy.from_config(),
+            expand_playlists=config.get_config_value("expand_playlists"),
+            connections=config.CONFIG.get_int("connections_per_download"),
+            audio_codec=config.get_config_value("audio_codec"),
+            audio_bitrate=config.get_config_value("audio_bitrate"),
+        )
+
+    def submit(
+        self,
+        urls: list[str],
+        type_: str = "video",
+        quality: Optional[str] = None,
+        path: Optional[str] = None,
+        sync: bool = False,
+    ) -> Batch:
+        """Validate and start a batch, raising ValueError if invalid."""
+        if type_ not in TYPES:
+            raise ValueError(f"Invalid type: {type_}")
+        if quality is None:
+            quality = "normal" if type_ == "music" else "good"
+        if quality not in QUALITIES or (
+            type_ == "music" and quality not in MUSIC_QUALITIES
+        ):
+            raise ValueError(f"Invalid quality for {type_}: {quality}")
+        if not isinstance(urls, list) or not all(
+            isinstance(url, str) for url in urls
+        ):
+            raise ValueError("urls must be a list of strings")
+        result = ingest.ingest_lines(urls)
+        if result.errors:
+            raise ValueError(
+                "Invalid URLs:\n" + ingest.format_errors(result.errors)
+            )
+        if not result.urls:
+            raise ValueError("No URLs given")
+        path = path or config.get_config_value("default_dir")
+        if not is_writable(path):
+            raise ValueError(f"{path} is not a writable directory")
+
+        with self.lock:
+            batch_id = self.next_id
+            self.next_id += 1
+        options = {
+            "type": type_, "quality": quality, "path": str(path), "sync": sync
+        }
+        manager = DownloadManager(
+            result.urls,
+            TYPES[type_],
+            QUALITIES[quality],
+            path,
+            lambda url, err=None: self._error(batch_id, url, err),
+            max_parallel=self.max_parallel,
+            info_cache=self.info_cache,
+            archive=self.archive,
+            sync=self.sync if sync else None,
+            connectivity=self.connectivity,
+            slots=self.slots,
+            hosts=self.hosts,
+            # The slots only limit worker threads
+            backend="thread",
+            **self.manager_options,
+        )
+        batch = Batch(batch_id, manager, options)
+        manager.register_job_done_callback(
+            lambda url, _: self._job_done(batch, url)
+        )
+        with self.lock:
+            self.batches[batch_id] = batch
+            self._prune()
+        self.events.publish("submitted", batch=batch_id, urls=result.urls)
+        manager.start_all()
+        return batch
+
+    def _prune(self):
+        finished = [
+            batch_id
+            for batch_id, batch in self.batches.items()
+            if batch.state != "running"
+        ]
+        for batch_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.batches[batch_id]
+
+    def _error(self, batch_id: int, url: str, err: Optional[Exception]):
+        message = str(err) if err else "Download failed"
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch:
+            batch.errors[url] = message
+        self.events.publish("error", batch=batch_id, url=url, message=message)
+
+    def _job_done(self, batch: Batch, url: str):
+        job = batch.manager.find_job(url)
+        self.events.publish(
+            "job",
+            batch=batch.id,
+            url=url,
+            status=job.status if job else "unknown",
+        )
+        if batch.manager.is_completed():
+            self.events.publish(
+                "finished",
+                batch=batch.id,
+                successful=batch.manager.was_successful(),
+            )
+
+    def get(self, batch_id: int) -> Optional[Batch]:
+        with self.lock:
+            return self.batches.get(batch_id)
+
+    def list(self) -> list[Batch]:
+        with self.lock:
+            return list(self.batches.values())
+
+    def cancel(self, batch_id: int) -> Optional[Batch]:
+        batch = self.get(batch_id)
+        if batch is None or batch.state != "running":
+            return batch
+        batch.cancelled = True
+        batch.manager.killall()
+        self.events.publish("cancelled", batch=batch_id)
+        return batch
+
+    def _report_progress(self):
+        while not self.stopped.wait(self.progress_interval):
+            for batch in self.list():
+                if batch.state == "running":
+                    self.events.publish(
+                        "progress", **batch.to_dict(jobs=False)
+                    )
+
+    def shutdown(self):
+        self.stopped.set()
+        for batch in self.list():
+            if batch.state == "running":
+                batch.manager.killall()
+        if self.connectivity:
+            self.connectivity.stop()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    server_version = f"MediaDownloaderDeluxe/{__version__}"
+    # Sent to idle event streams, so dead connections get noticed
+    keepalive = 15.0
+
+    @property
+    def service(self) -> DownloadService:
+        return self.server.service
+
+    def log_message(self, format: str, *args):
+        LOGGER.debug(f"daemon: {format % args}")
+
+    def _authorized(self) -> bool:
+        expected = f"Bearer {self.server.token}"
+        given = self.headers.get("Authorization", "")
+        if secrets.compare_digest(given.encode(), expected.encode()):
+            return True
+        self._send_json(401, {"error": "Invalid or missing token"})
+        return False
+
+    def _send_json(self, status: int, body: Any):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _route(self) -> tuple[list[str], dict[str, list[str]]]:
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        return parts, urllib.parse.parse_qs(url.query)
+
+    def _batch(self, batch_id: str) -> Optional[Batch]:
+        batch = self.service.get(int(batch_id)) if batch_id.isdigit() else None
+        if batch is None:
+            self._send_json(404, {"error": f"No batch {batch_id}"})
+        return batch
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts, query = self._route()
+        if parts == ["health"]:
+            self._send_json(200, {
+                "version": __version__,
+                "ytdlp": ytdlp.installed_version(),
+                "connections": POOL.stats(),
+            })
+        elif parts == ["jobs"]:
+            self._send_json(200, [
+                batch.to_dict(jobs=False) for batch in self.service.list()
+            ])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            if batch := self._batch(parts[1]):
+                self._send_json(200, batch.to_dict())
+        elif parts == ["events"]:
+            batch_id = query.get("batch", [None])[0]
+            if batch_id is not None and not batch_id.isdigit():
+                self._send_json(400, {"error": f"Invalid batch: {batch_id}"})
+                return
+            self._stream_events(int(batch_id) if batch_id else None)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if parts != ["jobs"]:
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            body = self._read_json()
+            batch = self.service.submit(
+                body.get("urls"),
+                body.get("type", "video"),
+                body.get("quality"),
+                body.get("path"),
+                bool(body.get("sync", False)),
+            )
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(201, batch.to_dict())
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._send_json(404, {"error": "Not found"})
+            return
+        if batch := self._batch(parts[1]):
+            self.service.cancel(batch.id)
+            self._send_json(200, batch.to_dict(jobs=False))
+
+    def _stream_events(self, batch_id: Optional[int]):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        events = self.service.events.subscribe()
+        try:
+            while not self.service.stopped.is_set():
+                try:
+                    event = events.get(timeout=self.keepalive)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if batch_id is not None and event.get("batch") != batch_id:
+                    continue
+                self.wfile.write(
+                    f"event: {event['event']}\n"
+                    f"data: {json.dumps(event)}\n\n".encode("utf-8")
+                )
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.service.events.unsubscribe(events)
+
+
+class DaemonServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, service: DownloadService, token: str):
+        # Only reachable from this machine
+        super().__init__(("127.0.0.1", port), Handler)
+        self.service = service
+        self.token = token
+
+
+def write_info(port: int, token: str, path: Path = config.DAEMON_INFO_PATH):
+    """Tell clients where the daemon is, readable only by this user."""
+    data = json.dumps({"port": port, "token": token, "pid": os.getpid()})
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as fp:
+        fp.write(data)
+    os.replace(tmp, path)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve a shared download engine on localhost."
+    )
+    parser.add_argument(
+        "--port", type=int, help="daemon_port by default, 0 for any"
+    )
+    args = parser.parse_args(argv)
+    config.init_config()
+    configure_logger()
+    ytdlp.load()
+
+    service = DownloadService.from_config()
+    port = args.port
+    if port is None:
+        port = config.CONFIG.get_int("daemon_port")
+    token = secrets.token_urlsafe(32)
+    server = DaemonServer(port, service, token)
+    write_info(server.server_port, token)
+    LOGGER.info(f"Daemon listening on 127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+        server.server_close()
+        config.DAEMON_INFO_PATH.unlink(missing_ok=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+import concurrent.futures
+import functools
+
+import config
+import updater
+import utils
+import ytdlp
+from model import AUDIO_CODECS
+from PyQt6.QtWidgets import QDialog, QFileDialog
+from ui.about_ui import Ui_Dialog as Ui_About
+from ui.licenses_ui import Ui_Dialog as Ui_Licenses
+from ui.settings_ui import Ui_Dialog as Ui_Settings
+from version import __version__
+
+
+class LicensesDialog(QDialog, Ui_Licenses):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowIcon(parent.windowIcon())
+        self.setupUi(self)
+        self.setFixedSize(self.size())
+
+    def setupUi(self, *args, **kwargs):
+        super().setupUi(*args, **kwargs)
+        self.setWindowTitle(self.parent().lang["window_licenses"])
+        self.header.setText(self.parent().lang["licenses_header"])
+
+
+class AboutDialog(QDialog, Ui_About):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowIcon(parent.windowIcon())
+        self.setupUi(self)
+        self.setFixedSize(self.size())
+
+    def setupUi(self, *args, **kwargs):
+        super().setupUi(*args, **kwargs)
+        self.setWindowTitle(self.parent().lang["window_about"])
+        self.label.setText(self.parent().lang["about_author"])
+        self.version.setText(self.parent().lang["about_version"].format(
+            version=__version__,
+        ))
+
+
+class SettingsDialog(QDialog, Ui_Settings):
+    BACKENDS = ["thread", "process"]
+    AUDIO_CODECS = list(AUDIO_CODECS)
+    AUDIO_BITRATES = ["96k", "128k", "160k", "192k", "256k", "320k"]
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowIcon(parent.windowIcon())
+        self.setupUi(self)
+        self.setMinimumSize(self.minimumSize())
+        self.output_path_change_btn.clicked.connect(self.change_output_path)
+        self.update_ytdlp.clicked.connect(self.update_ytdlp_action)
+
+    def setupUi(self, *args, **kwargs):
+        super().setupUi(*args, **kwargs)
+        self.setWindowTitle(self.parent().lang["window_settings"])
+        self.spinBox.setValue(
+            config.get_config_value("max_parallel_downloads")
+        )
+        self.output_path_display.setText(
+            config.get_config_value("default_dir")
+        )
+        self.yt_dlp_version.setText(ytdlp.installed_version())
+        self.label.setText(self.parent().lang["settings_header"])
+        self.label_2.setText(
+            self.parent().lang["settings_max_parallel_downloads"]
+        )
+        self.backend_label.setText(self.parent().lang["settings_backend"])
+        self.backend_box.addItems([
+            self.parent().lang["settings_backend_thread"],
+            self.parent().lang["settings_backend_process"],
+        ])
+        self.backend_box.setCurrentIndex(
+            self.BACKENDS.index(config.get_config_value("download_backend"))
+        )
+        self.audio_codec_label.setText(
+            self.parent().lang["settings_audio_codec"]
+        )
+        self.audio_codec_box.addItems([
+            AUDIO_CODECS[codec][0][1:] for codec in self.AUDIO_CODECS
+        ])
+        self.audio_codec_box.setCurrentIndex(
+            self.AUDIO_CODECS.index(config.get_config_value("audio_codec"))
+        )
+        self.audio_bitrate_label.setText(
+            self.parent().lang["settings_audio_bitrate"]
+        )
+        self.audio_bitrate_box.addItems(self.AUDIO_BITRATES)
+        self.audio_bitrate_box.setCurrentText(
+            config.get_config_value("audio_bitrate")
+        )
+        self.connections_label.setText(
+            self.parent().lang["settings_connections"]
+        )
+        self.connections_box.setValue(
+            config.CONFIG.get_int("connections_per_download")
+        )
+        self.output_path_label.setText(
+            self.parent().lang["settings_default_output_path"]
+        )
+        self.output_path_change_btn.setText(
+            self.parent().lang["settings_change"]
+        )
+        self.label_3.setText(self.parent().lang["settings_ytdlp_version"])
+        self.update_ytdlp.setText(self.parent().lang["settings_update"])
+
+    def update_ytdlp_action(self):
+        self.update_ytdlp.setDisabled(True)
+        old_version = ytdlp.installed_version()
+        service = self.parent().updater
+        # Network and disk work stays off the GUI thread
+        self.parent().when_done(
+            service.submit(service.update_available, force=True),
+            functools.partial(self.update_checked, old_version),
+        )
+
+    def update_checked(
+        self, old_version: str, future: concurrent.futures.Future
+    ):
+        try:
+            latest = future.result()
+        except (ConnectionError, updater.UpdateError):
+            self.update_failed()
+            return
+        if not latest:
+            utils.show_info(
+                self,
+                self.parent().lang["settings_update_uptodate_title"],
+                self.parent().lang[
+                    "settings_update_uptodate_desc"
+                ].format(version=old_version),
+            )
+            self.update_ytdlp.setDisabled(False)
+            return
+        self.update_ytdlp.setText(self.parent().lang["settings_updating"])
+        service = self.parent().updater
+        self.parent().when_done(
+            service.submit(service.update, latest),
+            functools.partial(self.update_installed, old_version),
+        )
+
+    def update_installed(
+        self, old_version: str, future: concurrent.futures.Future
+    ):
+        self.update_ytdlp.setText(self.parent().lang["settings_update"])
+        try:
+            new_version = future.result()
+        except (ConnectionError, updater.UpdateError):
+            self.update_failed()
+            return
+        self.parent().reload_ytdlp()
+        self.yt_dlp_version.setText(new_version)
+        self.update_ytdlp.setDisabled(False)
+        utils.show_info(
+            self,
+            self.parent().lang["settings_update_updating_title"],
+            self.parent().lang["settings_update_updating_desc"].format(
+                old=old_version,
+                new=new_version,
+            ),
+        )
+
+    def update_failed(self):
+        utils.show_error(
+            self,
+            self.parent().lang["settings_update_noconn_title"],
+            self.parent().lang["settings_update_noconn_desc"],
+        )
+        self.update_ytdlp.setDisabled(False)
+
+    def change_output_path(self):
+        file_dialog = QFileDialog(self)
+        file_dialog.setFileMode(QFileDialog.FileMode.Directory)
+        file_dialog.setDirectory(config.get_config_value("default_dir"))
+        if file_dialog.exec():
+            dir = file_dialog.selectedFiles()[0]
+            config.set_config_value("default_dir", dir)
+            self.output_path_display.setText(dir)
@@ -0,0 +1,310 @@
+import contextlib
+import http.client
+import io
+import ssl
+import threading
+import time
+import urllib.parse
+from typing import Optional
+
+MAX_REDIRECTS = 10
+
+
+class HTTPError(OSError):
+    """A response with an error status, from `ConnectionPool.urlopen`."""
+
+    def __init__(self, url: str, status: int, reason: str):
+        super().__init__(f"HTTP Error {status}: {reason} ({url})")
+        self.url = url
+        self.status = status
+        self.reason = reason
+
+
+def _default_context() -> ssl.SSLContext:
+    context = ssl.create_default_context()
+    with contextlib.suppress(ImportError):
+        # Shipped with requests, more complete than some system stores
+        import certifi  # type: ignore
+
+        context.load_verify_locations(certifi.where())
+    return context
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """Resumes the last TLS session of its host, see `ConnectionPool`."""
+
+    def __init__(self, *args, pool: "ConnectionPool", **kwargs):
+        super().__init__(*args, context=pool.context, **kwargs)
+        self.pool = pool
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self.pool.context.wrap_socket(
+            self.sock,
+            server_hostname=self.host,
+            session=self.pool.sessions.get((self.host, self.port)),
+        )
+        with self.pool.lock:
+            if self.sock.session_reused:
+                self.pool.resumed += 1
+            else:
+                self.pool.handshakes += 1
+
+
+class PooledResponse(io.IOBase):
+    """
+    A response whose connection goes back to its pool once the body was
+    read completely. Closing it earlier closes the connection.
+    """
+
+    def __init__(
+        self,
+        pool: "ConnectionPool",
+        key: tuple[str, str, int],
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        url: str,
+    ):
+        self.pool = pool
+        self.key = key
+        self.connection: Optional[http.client.HTTPConnection] = connection
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        if response.length == 0:
+            # No body, like for HEAD requests, the connection is free
+            response.read()
+        self._check_done()
+
+    def _check_done(self):
+        if self.connection and self.response.isclosed():
+            connection, self.connection = self.connection, None
+            if self.response.will_close:
+                connection.close()
+            else:
+                self.pool._release(self.key, connection)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self.response.read(amt)
+        if not data and amt != 0 and self.response.length:
+            # http.client only notices this when reading everything at once
+            self.close()
+            raise http.client.IncompleteRead(data, self.response.length)
+        self._check_done()
+        return data
+
+    def info(self) -> http.client.HTTPMessage:
+        return self.headers
+
+    def geturl(self) -> str:
+        return self.url
+
+    def close(self):
+        if self.connection:
+            # The rest of the body would have to be read first
+            self.connection.close()
+            self.connection = None
+        self.response.close()
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP connections shared by all threads, per host.
+
+    Connections go back to the pool when a response was read completely
+    and are handed to the next request to the same host, up to `max_idle`
+    per host for `idle_timeout` seconds. TLS sessions are cached per host
+    as well, so new connections to a known host resume the last session
+    with an abbreviated handshake. A reused connection the server closed
+    in the meantime is replaced once, transparently. `stats()` counts
+    reused connections as hits and new ones as misses.
+    """
+
+    def __init__(
+        self,
+        max_idle: int = 16,
+        idle_timeout: float = 60.0,
+        context: Optional[ssl.SSLContext] = None,
+    ):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.context = context or _default_context()
+        # Guards everything below
+        self.lock = threading.Lock()
+        # (scheme, host, port) -> [(released at, connection)], newest last
+        self.idle: dict[
+            tuple[str, str, int],
+            list[tuple[float, http.client.HTTPConnection]],
+        ] = {}
+        # (host, port) -> last TLS session
+        self.sessions: dict[tuple[str, int], ssl.SSLSession] = {}
+        self.hits = 0
+        self.misses = 0
+        self.resumed = 0
+        self.handshakes = 0
+
+    @staticmethod
+    def _key(url: str) -> tuple[str, str, int]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported url scheme: {scheme}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        return scheme, parts.hostname or "", port
+
+    def _acquire(
+        self, key: tuple[str, str, int], timeout: Optional[float]
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        """Return an idle or a new connection and whether it's reused."""
+        expired = []
+        connection = None
+        with self.lock:
+            idle = self.idle.get(key, [])
+            now = time.monotonic()
+            while idle:
+                released, candidate = idle.pop()
+                if now - released < self.idle_timeout:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+            if connection:
+                self.hits += 1
+            else:
+                self.misses += 1
+        for candidate in expired:
+            candidate.close()
+        if connection:
+            connection.timeout = timeout
+            if connection.sock:
+                connection.sock.settimeout(timeout)
+            return connection, True
+        scheme, host, port = key
+        if scheme == "https":
+            connection = _HTTPSConnection(
+                host, port, timeout=timeout, pool=self
+            )
+        else:
+            connection = http.client.HTTPConnection(
+                host, port, timeout=timeout
+            )
+        return connection, False
+
+    def _release(
+        self, key: tuple[str, str, int], connection: http.client.HTTPConnection
+    ):
+        sock = connection.sock
+        if sock is None:
+            return
+        surplus = []
+        with self.lock:
+            if isinstance(sock, ssl.SSLSocket) and sock.session:
+                # TLS 1.3 sends session tickets after the handshake
+                self.sessions[key[1:]] = sock.session
+            idle = self.idle.setdefault(key, [])
+            idle.append((time.monotonic(), connection))
+            while len(idle) > self.max_idle:
+                surplus.append(idle.pop(0)[1])
+        for connection in surplus:
+            connection.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        body: Optional[bytes] = None,
+        timeout: Optional[float] = None,
+    ) -> PooledResponse:
+        """Send a single request, without following redirects."""
+        key = self._key(url)
+        parts = urllib.parse.urlsplit(url)
+        target = urllib.parse.urlunsplit(
+            ("", "", parts.path or "/", parts.query, "")
+        )
+        while True:
+            connection, reused = self._acquire(key, timeout)
+            try:
+                connection.request(method, target, body, headers or {})
+                response = connection.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                if reused and isinstance(e, (
+                    ConnectionError, http.client.BadStatusLine
+                )):
+                    # Closed by the server while it was idle
+                    continue
+                if isinstance(e, http.client.HTTPException):
+                    raise ConnectionError(f"{e!r} ({url})") from e
+                raise
+            return PooledResponse(self, key, connection, response, url)
+
+    def urlopen(
+        self,
+        url: str,
+        method: str = "GET",
+        headers: Optional[dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> PooledResponse:
+        """
+        Send a request like `urllib.request.urlopen`, following redirects
+        and raising `HTTPError` for error statuses.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.request(method, url, headers, timeout=timeout)
+            location = response.headers.get("Location")
+            if response.status not in (301, 302, 303, 307, 308) or (
+                not location
+            ):
+                break
+            # Redirects have small bodies, reading frees the connection
+            response.read()
+            url = urllib.parse.urljoin(url, location)
+            if response.status == 303 and method != "HEAD":
+                method = "GET"
+        else:
+            raise HTTPError(url, response.status, "Too many redirects")
+        if response.status >= 400:
+            response.close()
+            raise HTTPError(url, response.status, response.reason)
+        return response
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tls_resumed": self.resumed,
+                "tls_handshakes": self.handshakes,
+                "idle": sum(len(idle) for idle in self.idle.values()),
+            }
+
+    def describe(self) -> str:
+        stats = self.stats()
+        requests = stats["hits"] + stats["misses"]
+        rate = stats["hits"] / requests if requests else 0.0
+        return (
+            f"{requests} requests, {rate:.0%} on reused connections, "
+            f"{stats['tls_resumed']} resumed and "
+            f"{stats['tls_handshakes']} full TLS handshakes"
+        )
+
+    def close(self):
+        with self.lock:
+            connections = [
+                connection
+                for idle in self.idle.values()
+                for _, connection in idle
+            ]
+            self.idle.clear()
+        for connection in connections:
+            connection.close()
+
+
+# Shared by everything in the process, yt-dlp included, see pooledrh.py
+POOL = ConnectionPool()
@@ -0,0 +1,95 @@
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+# The parts can't overlap (the path starts with a slash, query pairs are
+# split by "="), so matching never backtracks and stays linear
+URL_PATTERN = re.compile(
+    r"(?P<scheme>https?)://"
+    r"(?P<host>[\w.-]+)"
+    r"(?P<port>:\d{4})?"
+    r"(?P<path>/[/\w.-]*)?"
+    r"(?P<query>(?:\?[\w-]+=[\w-]+)?(?:&[\w-]+=[\w-]+)*)",
+    re.IGNORECASE,
+)
+
+
+def canonical_url(url: str) -> Optional[str]:
+    """
+    Return the canonical spelling of an URL, or None if it's invalid.
+
+    Surrounding whitespace is stripped, scheme and host are lowercased and
+    a trailing slash is removed.
+    """
+    match = URL_PATTERN.fullmatch(url.strip())
+    if not match:
+        return None
+    host = match["host"].lower()
+    # Hosts need a dot somewhere in between, except localhost
+    if host != "localhost" and "." not in host[1:-1]:
+        return None
+    path = (match["path"] or "").rstrip("/")
+    return (
+        f"{match['scheme'].lower()}://{host}{match['port'] or ''}"
+        f"{path}{match['query']}"
+    )
+
+
+def is_valid_url(url: str) -> bool:
+    return canonical_url(url) is not None
+
+
+class IngestResult(NamedTuple):
+    # Canonical URLs in input order, without duplicates
+    urls: list[str]
+    # (line number, line) of every invalid line
+    errors: list[tuple[int, str]]
+    duplicates: int
+
+
+def iter_lines(
+    lines: Iterable[str],
+) -> Iterator[tuple[int, str, Optional[str]]]:
+    """
+    Yield (line number, line, canonical URL) of every non-blank line.
+
+    The URL is None for invalid lines. Works on streams, every line is
+    yielded as soon as it was read.
+    """
+    for idx, line in enumerate(lines, start=1):
+        line = line.strip()
+        if line:
+            yield idx, line, canonical_url(line)
+
+
+def ingest_lines(lines: Iterable[str]) -> IngestResult:
+    """
+    Validate, canonicalize and deduplicate URLs in a single pass.
+
+    Blank lines are ignored, everything else that isn't a valid URL ends up
+    in `errors` so they can be reported at once.
+    """
+    urls: list[str] = []
+    seen: set[str] = set()
+    errors: list[tuple[int, str]] = []
+    duplicates = 0
+    for idx, line, url in iter_lines(lines):
+        if url is None:
+            errors.append((idx, line))
+        elif url in seen:
+            duplicates += 1
+        else:
+            seen.add(url)
+            urls.append(url)
+    return IngestResult(urls, errors, duplicates)
+
+
+def ingest_file(path: Union[str, Path]) -> IngestResult:
+    """Like `ingest_lines`, reading the file line by line."""
+    with open(path, "r", encoding="utf-8") as fp:
+        return ingest_lines(fp)
+
+
+def format_errors(errors: list[tuple[int, str]], limit: int = 10) -> str:
+    """List the first `limit` errors, one per line."""
+    return "\n".join(f"{idx}: {line}" for idx, line in errors[:limit])
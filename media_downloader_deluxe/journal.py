@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Union
+
+from enums import Quality, Type
+
+
+class JournalBatch(NamedTuple):
+    id: int
+    type: Type
+    quality: Quality
+    path: str
+    max_parallel: int
+    # (job id, url) of every job that didn't finish yet
+    jobs: list[tuple[int, str]]
+
+
+class JobJournal:
+    """
+    Crash-safe journal of download batches and the state of their jobs.
+
+    The journal is a SQLite database in WAL mode, so every state change is
+    durable without rewriting the whole database. Batches are removed once
+    they completed or got cancelled, everything still in there after a
+    restart can be resumed.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    ERRORED = "errored"
+    SKIPPED = "skipped"
+
+    UNFINISHED_STATES = (QUEUED, RUNNING)
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS batches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type INTEGER NOT NULL,
+                    quality INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    max_parallel INTEGER NOT NULL,
+                    created REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    batch_id INTEGER NOT NULL
+                        REFERENCES batches (id) ON DELETE CASCADE,
+                    url TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_batch "
+                "ON jobs (batch_id, state)"
+            )
+
+    def add_batch(
+        self,
+        urls: list[str],
+        type_: Type,
+        quality: Quality,
+        path: Union[str, Path],
+        max_parallel: int,
+    ) -> tuple[int, list[int]]:
+        """Journal a new batch, returning its id and the ids of its jobs."""
+        now = time.time()
+        with self.lock, self.conn:
+            batch_id = self.conn.execute(
+                "INSERT INTO batches (type, quality, path, max_parallel, "
+                "created) VALUES (?, ?, ?, ?, ?)",
+                (int(type_), int(quality), str(path), max_parallel, now),
+            ).lastrowid
+            job_ids = self._insert_jobs(batch_id, urls, now)
+        return batch_id, job_ids
+
+    def add_jobs(self, batch_id: int, urls: list[str]) -> list[int]:
+        """Add jobs to a batch, like the entries of an expanded playlist."""
+        with self.lock, self.conn:
+            return self._insert_jobs(batch_id, urls, time.time())
+
+    def _insert_jobs(
+        self, batch_id: int, urls: list[str], now: float
+    ) -> list[int]:
+        return [
+            self.conn.execute(
+                "INSERT INTO jobs (batch_id, url, state, updated) "
+                "VALUES (?, ?, ?, ?)",
+                (batch_id, url, self.QUEUED, now),
+            ).lastrowid
+            for url in urls
+        ]
+
+    def set_state(self, job_id: int, state: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, updated = ? WHERE id = ?",
+                (state, time.time(), job_id),
+            )
+
+    def remove_batch(self, batch_id: int):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM batches WHERE id = ?", (batch_id,))
+
+    def unfinished_batches(self) -> list[JournalBatch]:
+        """Return every batch that has unfinished jobs, oldest first."""
+        placeholders = ", ".join("?" for _ in self.UNFINISHED_STATES)
+        with self.lock, self.conn:
+            batches = self.conn.execute(
+                "SELECT id, type, quality, path, max_parallel FROM batches "
+                "ORDER BY created"
+            ).fetchall()
+            result = []
+            for batch_id, type_, quality, path, max_parallel in batches:
+                jobs = self.conn.execute(
+                    "SELECT id, url FROM jobs WHERE batch_id = ? "
+                    f"AND state IN ({placeholders}) ORDER BY id",
+                    (batch_id, *self.UNFINISHED_STATES),
+                ).fetchall()
+                if not jobs:
+                    # Finished, but the app went down before removing it
+                    self.conn.execute(
+                        "DELETE FROM batches WHERE id = ?", (batch_id,)
+                    )
+                    continue
+                result.append(JournalBatch(
+                    batch_id,
+                    Type(type_),
+                    Quality(quality),
+                    path,
+                    max_parallel,
+                    jobs,
+                ))
+        return result
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,20 +1,99 @@
 from __future__ import annotations
 
-try:
-    import tomllib  # type: ignore
-except ImportError:
-    import tomli as tomllib
-
+import contextlib
+import hashlib
+import json
+import sys
+import threading
 from pathlib import Path
 
 
 FALLBACK_LANGUAGE = "en_US"
+# Bump when the layout of precompiled catalogs changes
+CATALOG_VERSION = 1
+
+
+def _loads_toml(toml_str: str) -> dict:
+    # Only needed while catalogs aren't precompiled
+    try:
+        import tomllib  # type: ignore
+    except ImportError:
+        import tomli as tomllib
+    return tomllib.loads(toml_str)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def load_catalog(langs_path: Path, langcode: str) -> dict:
+    """
+    Return the parsed catalog of a language as {"meta": ..., "strings": ...}.
+
+    A precompiled `<langcode>.json` next to the TOML file is used as long as
+    it was compiled from the current TOML content. Otherwise the TOML file is
+    parsed and the catalog compiled for the next start, if the directory is
+    writable.
+    """
+    toml_path = langs_path / f"{langcode}.toml"
+    compiled_path = langs_path / f"{langcode}.json"
+    try:
+        source = toml_path.read_bytes()
+    except FileNotFoundError:
+        # Shipped without sources
+        with open(compiled_path, "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    digest = _digest(source)
+    with contextlib.suppress(OSError, ValueError):
+        with open(compiled_path, "r", encoding="utf-8") as fp:
+            compiled = json.load(fp)
+        if (
+            compiled.get("version") == CATALOG_VERSION
+            and compiled.get("source") == digest
+        ):
+            return compiled
+    catalog = _loads_toml(source.decode("utf-8"))
+    with contextlib.suppress(OSError):
+        write_catalog(compiled_path, catalog, digest)
+    return catalog
+
+
+def write_catalog(path: Path, catalog: dict, digest: str) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(
+            {
+                "version": CATALOG_VERSION,
+                "source": digest,
+                "meta": catalog["meta"],
+                "strings": catalog["strings"],
+            },
+            fp,
+            ensure_ascii=False,
+        )
+    tmp.replace(path)
+
+
+def compile_catalogs(langs_path: str | Path) -> list[Path]:
+    """Precompile every TOML catalog of a directory, e.g. for builds."""
+    compiled = []
+    for toml_path in sorted(Path(langs_path).glob("*.toml")):
+        source = toml_path.read_bytes()
+        path = toml_path.with_suffix(".json")
+        catalog = _loads_toml(source.decode("utf-8"))
+        write_catalog(path, catalog, _digest(source))
+        compiled.append(path)
+    return compiled
 
 
 class LangDict(dict):
     langcode: str
     langs_path: Path
 
+    # (languages path, langcode) -> merged instance, shared process-wide
+    _cache: dict[tuple[Path, str], "LangDict"] = {}
+    _cache_lock = threading.Lock()
+
     def __getitem__(self, key: str) -> str:
         try:
             value = str(super().__getitem__(key))
@@ -32,14 +111,22 @@ class LangDict(dict):
         cls.langs_path = Path(path)
 
     @classmethod
-    def from_toml(cls, toml_str: str) -> "LangDict":
-        """Create a LangDict instance from a toml string."""
-        dict_ = tomllib.loads(toml_str)
-        obj = cls(tomllib.loads(toml_str)["strings"])
+    def clear_cache(cls) -> None:
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    @classmethod
+    def from_dict(cls, dict_: dict) -> "LangDict":
+        obj = cls(dict_["strings"])
         for key, value in dict_["meta"].items():
             setattr(obj, key, value)
         return obj
 
+    @classmethod
+    def from_toml(cls, toml_str: str) -> "LangDict":
+        """Create a LangDict instance from a toml string."""
+        return cls.from_dict(_loads_toml(toml_str))
+
     @classmethod
     def from_file(cls, file: Path | str) -> "LangDict":
         """Create a LangDict instance from a toml file."""
@@ -48,11 +135,36 @@ class LangDict(dict):
 
     @classmethod
     def from_langcode(cls, langcode: str) -> "LangDict":
-        """Create a LangDict instance from a langcode."""
+        """
+        Return the LangDict of a langcode.
+
+        Strings missing in a language are merged in from the fallback
+        language once, so lookups never have to load another catalog.
+        Instances are cached and shared, don't modify them.
+        """
         try:
-            return cls.from_file(cls.langs_path / f"{langcode}.toml")
+            langs_path = cls.langs_path
         except AttributeError:
             raise RuntimeError(
                 "Must call `set_languages_path()` before instantiating "
                 "from Language code."
             )
+        key = (langs_path, langcode)
+        with cls._cache_lock:
+            cached = cls._cache.get(key)
+        if cached is not None:
+            return cached
+        obj = cls.from_dict(load_catalog(langs_path, langcode))
+        if langcode != FALLBACK_LANGUAGE:
+            fallback = cls.from_langcode(FALLBACK_LANGUAGE)
+            for string_key, value in dict.items(fallback):
+                obj.setdefault(string_key, value)
+        with cls._cache_lock:
+            return cls._cache.setdefault(key, obj)
+
+
+if __name__ == "__main__":
+    for path in compile_catalogs(
+        sys.argv[1] if len(sys.argv) > 1 else Path(__file__).parent / "langs"
+    ):
+        print(f"Compiled {path}")
@@ -1,18 +1,36 @@
+import atexit
 import contextlib
 import ctypes
 import datetime
+import functools
 import inspect
-import math
-import re
+import json
+import queue
+import sys
 import threading
+import time
 from pathlib import Path
 from subprocess import getstatusoutput
-from typing import Callable, Optional, Union
+from typing import (TYPE_CHECKING, Callable, Iterator, NamedTuple,
+                    Optional, Union)
 
-from config import FFMPEG_PATH, LOGGER_PATH, create_app_dir
+import config
+import ingest
+from archive import DownloadArchive
+from cache import InfoCache
+from config import FFMPEG_PATH, LOGGER_PATH
+from conversion import ConversionPipeline
 from enums import Quality, Type
-from yt_dlp import YoutubeDL  # type: ignore
-from yt_dlp.utils import DownloadError  # type: ignore
+from httppool import POOL
+from journal import JobJournal, JournalBatch
+from progress import ProgressStore
+from scheduler import (ConcurrencyTuner, HostLimiter, HostQueue,
+                       RetryPolicy, host_key, is_local, is_network_error,
+                       is_permanent)
+from sync import SyncIndex
+
+if TYPE_CHECKING:
+    from yt_dlp import YoutubeDL  # type: ignore
 
 
 def is_writable(path: Union[str, Path]):
@@ -59,48 +77,216 @@ def can_write(file: Union[str, Path]):
 
 
 class Logger:
-    def __init__(self):
+    """
+    Logger of the app and yt-dlp that writes from a background thread.
+
+    Messages are queued and written in batches, so logging from many
+    parallel downloads doesn't cost a file open per line. The log is
+    rotated on the first message of a session and whenever it grows
+    beyond `max_bytes`, keeping `backups` older files. Lines are plain
+    text or, with `json_lines`, one JSON object each.
+    """
+
+    LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+    def __init__(
+        self,
+        path: Union[str, Path] = LOGGER_PATH,
+        level: str = "DEBUG",
+        json_lines: bool = False,
+        max_bytes: int = 5 * 1024 * 1024,
+        backups: int = 3,
+    ):
+        self.path = Path(path)
+        self.level = level
+        self.json_lines = json_lines
+        self.max_bytes = max_bytes
+        self.backups = backups
+        # Only the process that starts the log rotates it
         self.first_log = True
+        self.rotates = False
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+        self.thread_lock = threading.Lock()
+
+    def configure(
+        self,
+        level: Optional[str] = None,
+        json_lines: Optional[bool] = None,
+        max_bytes: Optional[int] = None,
+        backups: Optional[int] = None,
+    ):
+        if level is not None:
+            if level not in self.LEVELS:
+                raise ValueError(f"Invalid log level: {level}")
+            self.level = level
+        if json_lines is not None:
+            self.json_lines = json_lines
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if backups is not None:
+            self.backups = backups
+
+    def log(self, text: str, level: str = "INFO"):
+        if self.LEVELS[level] < self.LEVELS[self.level]:
+            return
+        if self.thread is None:
+            with self.thread_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(
+                        target=self._run, name="logger", daemon=True
+                    )
+                    self.thread.start()
+        self.queue.put((time.time(), level, text))
 
-    def log(self, text: str):
-        create_app_dir()
-        if not LOGGER_PATH.exists():
-            with open(LOGGER_PATH, "x"):
-                pass
+    def flush(self, timeout: float = 5):
+        """Block until everything logged so far is written."""
+        if self.thread is None:
+            return
+        written = threading.Event()
+        self.queue.put(written)
+        written.wait(timeout)
+
+    def _format(self, timestamp: float, level: str, text: str) -> str:
+        iso_string = datetime.datetime.fromtimestamp(timestamp).replace(
+            microsecond=0
+        ).isoformat()
+        if self.json_lines:
+            return json.dumps(
+                {"time": iso_string, "level": level, "message": text}
+            ) + "\n"
+        return f"[{iso_string}][{level}] {text}\n"
+
+    def _rotate(self):
+        if self.backups < 1:
+            self.path.unlink(missing_ok=True)
+            return
+        for idx in range(self.backups - 1, 0, -1):
+            with contextlib.suppress(FileNotFoundError):
+                self.path.with_name(f"{self.path.name}.{idx}").replace(
+                    self.path.with_name(f"{self.path.name}.{idx + 1}")
+                )
+        with contextlib.suppress(FileNotFoundError):
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
         if self.first_log:
-            mode = "w"
-        else:
-            mode = "a"
-        self.first_log = False
-        with open(LOGGER_PATH, mode=mode, encoding="utf-8") as fp:
-            iso_string = datetime.datetime.now().replace(
-                microsecond=0
-            ).isoformat()
-            fp.write(f"[{iso_string}]{text}\n")
+            self.first_log = False
+            self.rotates = True
+            self._rotate()
+        return open(self.path, mode="a", encoding="utf-8")
+
+    def _run(self):
+        fp = None
+        while True:
+            batch = [self.queue.get()]
+            with contextlib.suppress(queue.Empty):
+                while len(batch) < 1000:
+                    batch.append(self.queue.get_nowait())
+            waiting = []
+            lines = []
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    waiting.append(item)
+                else:
+                    lines.append(self._format(*item))
+            try:
+                if lines:
+                    if fp is None:
+                        fp = self._open()
+                    fp.write("".join(lines))
+                    fp.flush()
+                    if (
+                        self.rotates
+                        and self.max_bytes
+                        and fp.tell() >= self.max_bytes
+                    ):
+                        fp.close()
+                        self._rotate()
+                        fp = self._open()
+            except OSError as e:
+                print(f"Failed to write log: {e}", file=sys.stderr)
+                fp = None
+            for written in waiting:
+                written.set()
 
     def debug(self, msg: str):
-        self.log(f"[DEBUG] {msg}")
+        self.log(msg, "DEBUG")
+
+    def info(self, msg: str):
+        self.log(msg, "INFO")
 
     def warning(self, msg: str):
-        self.log(f"[WARNING] {msg}")
-        print(msg)
+        self.log(msg, "WARNING")
+        # stdout may be machine-readable, see cli.py
+        print(msg, file=sys.stderr)
 
     def error(self, msg: str):
-        self.log(f"[ERROR] {msg}")
-        print(msg)
+        self.log(msg, "ERROR")
+        print(msg, file=sys.stderr)
 
 
 LOGGER = Logger()
+atexit.register(LOGGER.flush)
+
+LOGGER_KEYS = ("log_level", "log_json", "log_max_bytes", "log_backups")
+
+
+def configure_logger(subscribe: bool = False):
+    """Apply the log settings, and changes to them with `subscribe`."""
+    LOGGER.configure(
+        level=config.CONFIG.get_str("log_level"),
+        json_lines=config.CONFIG.get_bool("log_json"),
+        max_bytes=config.CONFIG.get_int("log_max_bytes"),
+        backups=config.CONFIG.get_int("log_backups"),
+    )
+    if subscribe:
+        for key in LOGGER_KEYS:
+            config.CONFIG.subscribe(lambda *_: configure_logger(), key)
+
+
+# codec: (extension, FFmpeg encoder, prefixes of fitting yt-dlp acodecs)
+AUDIO_CODECS = {
+    "mp3": (".mp3", "libmp3lame", ("mp3",)),
+    "aac": (".m4a", "aac", ("mp4a", "aac")),
+    "opus": (".opus", "libopus", ("opus",)),
+    "vorbis": (".ogg", "libvorbis", ("vorbis",)),
+    "flac": (".flac", "flac", ("flac",)),
+}
 
 
 class Downloader:
+    # Known playlist entries in a row that end reading a playlist, so
+    # pinned or reordered entries don't
+    KNOWN_STREAK = 3
+
     @staticmethod
     def dl(
         urls: list[str],
         path: Union[str, Path],
         options: dict,
         progress_hooks: Optional[list[Callable]] = None,
+        pool: Optional["YoutubeDLPool"] = None,
+        info_cache: Optional[InfoCache] = None,
+        info_filter: Optional[Callable[[dict], bool]] = None,
+        info_hook: Optional[Callable[[dict], None]] = None,
+        playlist_hook: Optional[
+            Callable[[dict, list[tuple[str, Optional[str]]]], bool]
+        ] = None,
+        known_entry: Optional[Callable[[dict], bool]] = None,
     ) -> int:
+        """
+        Download `urls` with the given yt-dlp `options`.
+
+        `info_filter` gets the extracted info dict of every video before
+        it's processed and may return False to skip it. `info_hook` gets
+        the processed info dict of every downloaded video.
+        `playlist_hook` gets the flat extracted info dict and the (url, id)
+        of the entries of every playlist and may return True to not download
+        it. Playlists stop being read once `known_entry` returned True for
+        `KNOWN_STREAK` entries in a row, those are left out.
+        """
         if progress_hooks is None:
             progress_hooks = []
         ydl_opts = {
@@ -108,11 +294,160 @@ class Downloader:
             "ffmpeg_location": str(FFMPEG_PATH),
             "progress_hooks": progress_hooks,
             "outtmpl": f"{path}/%(title)s.%(ext)s",
-            "retries": math.inf,
+            "retries": 10,
+            "fragment_retries": 10,
+            # Resumed batches pick up the .part files of interrupted jobs
+            "continuedl": True,
             **options,
         }
-        with YoutubeDL(ydl_opts) as ydl:
+        args = (
+            urls, info_cache, info_filter, info_hook, playlist_hook,
+            known_entry,
+        )
+        if pool is None:
+            # Imported on first use, see ytdlp.Loader. pooledrh registers
+            # itself with yt-dlp
+            import pooledrh  # noqa: F401
+            import segmented
+            from yt_dlp import YoutubeDL  # type: ignore
+
+            segmented.install()
+            with YoutubeDL(ydl_opts) as ydl:
+                return Downloader._download(ydl, *args)
+        pool.progress_hooks = ydl_opts.pop("progress_hooks")
+        ydl = pool.get(ydl_opts)
+        try:
+            return Downloader._download(ydl, *args)
+        finally:
+            pool.progress_hooks = []
+
+    @staticmethod
+    def _download(
+        ydl: "YoutubeDL",
+        urls: list[str],
+        info_cache: Optional[InfoCache] = None,
+        info_filter: Optional[Callable[[dict], bool]] = None,
+        info_hook: Optional[Callable[[dict], None]] = None,
+        playlist_hook: Optional[
+            Callable[[dict, list[tuple[str, Optional[str]]]], bool]
+        ] = None,
+        known_entry: Optional[Callable[[dict], bool]] = None,
+    ) -> int:
+        if (
+            info_cache is None
+            and info_filter is None
+            and info_hook is None
+            and playlist_hook is None
+        ):
             return ydl.download(urls)
+        from yt_dlp.utils import DownloadError, YoutubeDLError  # type: ignore
+
+        for url in urls:
+            info = info_cache.get(url) if info_cache else None
+            if info is None:
+                info = ydl.extract_info(url, download=False, process=False)
+                # Playlists hold lazy entries and redirects aren't final
+                if info_cache and info.get("_type", "video") == "video":
+                    info_cache.put(url, {
+                        key: value
+                        for key, value in ydl.sanitize_info(info).items()
+                        # Private keys hold callables that can't be stored
+                        if not key.startswith("__")
+                    })
+            if playlist_hook and info.get("_type") == "url":
+                # Redirects, like short links, may lead to a playlist
+                info = ydl.extract_info(
+                    info["url"],
+                    download=False,
+                    process=False,
+                    ie_key=info.get("ie_key"),
+                )
+            if playlist_hook and info.get("_type") == "playlist":
+                entries = Downloader.playlist_entries(
+                    ydl, info, known_entry=known_entry
+                )
+                if playlist_hook(info, entries):
+                    continue
+            is_video = info.get("_type", "video") == "video"
+            if is_video and info_filter and not info_filter(info):
+                continue
+            try:
+                info = ydl.process_ie_result(info, download=True)
+            except DownloadError:
+                raise
+            except YoutubeDLError as e:
+                # extract_info reports these as DownloadError, but this
+                # isn't wrapped, like "Requested format is not available"
+                ydl.report_error(str(e))
+                continue
+            if is_video and info_hook and info:
+                info_hook(info)
+        return ydl._download_retcode
+
+    @staticmethod
+    def _iter_entries(entries) -> Iterator[dict]:
+        """Iterate lazily over entries, fetching pages only when needed."""
+        if not hasattr(entries, "getslice"):
+            yield from entries
+            return
+        # Paged lists aren't iterable
+        start = 0
+        while page := entries.getslice(start, start + 50):
+            yield from page
+            start += len(page)
+
+    @staticmethod
+    def playlist_entries(
+        ydl: "YoutubeDL",
+        playlist: dict,
+        depth: int = 2,
+        known_entry: Optional[Callable[[dict], bool]] = None,
+    ) -> list[tuple[str, Optional[str]]]:
+        """
+        Return the (url, id) of the entries of a flat extracted playlist.
+
+        Nested playlists and entries handled by the playlist's own
+        extractor, like the tabs of a channel, are flattened up to `depth`
+        levels deep. See `dl` for `known_entry`.
+        """
+        result = []
+        streak = 0
+        for entry in Downloader._iter_entries(playlist.get("entries") or []):
+            if not entry:
+                continue
+            type_ = entry.get("_type", "video")
+            if (
+                depth
+                and type_ in ("url", "url_transparent")
+                and entry.get("ie_key") == playlist.get("extractor_key")
+            ):
+                entry = ydl.extract_info(
+                    entry["url"],
+                    download=False,
+                    process=False,
+                    ie_key=entry.get("ie_key"),
+                )
+                type_ = entry.get("_type", "video")
+            if type_ == "playlist":
+                if depth:
+                    result.extend(Downloader.playlist_entries(
+                        ydl, entry, depth - 1, known_entry
+                    ))
+                continue
+            if known_entry and known_entry(entry):
+                streak += 1
+                if streak >= Downloader.KNOWN_STREAK:
+                    break
+                continue
+            streak = 0
+            if type_ in ("url", "url_transparent"):
+                url = entry.get("url")
+            else:
+                # The url of a video is the one of its media
+                url = entry.get("webpage_url")
+            if url:
+                result.append((url, entry.get("id")))
+        return result
 
     @staticmethod
     def video(
@@ -120,6 +455,7 @@ class Downloader:
         quality: Quality,
         path: Union[str, Path],
         options: dict = None,
+        **kwargs,
     ):
         if options is None:
             options = {}
@@ -139,7 +475,9 @@ class Downloader:
         else:
             raise ValueError(f"Invalid value for quality: {quality}")
 
-        return Downloader.dl(urls, path, {"format": format, **options})
+        return Downloader.dl(
+            urls, path, {"format": format, **options}, **kwargs
+        )
 
     @staticmethod
     def audio(
@@ -147,6 +485,7 @@ class Downloader:
         quality: Quality,
         path: Union[str, Path],
         options: dict = None,
+        **kwargs,
     ):
         if options is None:
             options = {}
@@ -163,7 +502,8 @@ class Downloader:
         return Downloader.dl(
             urls,
             path,
-            {"format": format, "final_ext": ".mp3", **options},
+            {"format": format, **options},
+            **kwargs,
         )
 
     @staticmethod
@@ -171,7 +511,8 @@ class Downloader:
         urls: list[str],
         quality: Quality,
         path: Union[str, Path],
-        options: dict = None
+        options: dict = None,
+        **kwargs,
     ):
         if options is None:
             options = {}
@@ -191,7 +532,9 @@ class Downloader:
         else:
             raise ValueError(f"Invalid value for quality: {quality}")
 
-        return Downloader.dl(urls, path, {"format": format, **options})
+        return Downloader.dl(
+            urls, path, {"format": format, **options}, **kwargs
+        )
 
     @staticmethod
     def convert(
@@ -220,12 +563,169 @@ class Downloader:
         LOGGER.debug(output)
         path.unlink()
 
+    @staticmethod
+    def convert_audio(
+        path: Union[str, Path],
+        codec: str = "mp3",
+        bitrate: Optional[str] = None,
+        acodec: Optional[str] = None,
+    ) -> Path:
+        """
+        Bring a downloaded audio file into `codec` in a single FFmpeg pass,
+        returning the path of the result.
+
+        If `acodec`, the codec yt-dlp reported for the download, already
+        fits, the stream is only copied into the target container.
+        Otherwise it's re-encoded, with `bitrate` if given.
+        """
+        ext, encoder, fitting = AUDIO_CODECS[codec]
+        path = Path(path)
+        fits = bool(acodec) and acodec.lower().startswith(fitting)
+        if fits and path.suffix == ext:
+            return path
+        if fits:
+            options = "-y -vn -c:a copy"
+        else:
+            options = f"-y -vn -c:a {encoder}"
+            if bitrate:
+                options += f" -b:a {bitrate}"
+        if path.suffix == ext:
+            # FFmpeg can't write to its input
+            path = path.rename(path.with_suffix(".source"))
+        Downloader.convert(path, ext, options)
+        return path.with_suffix(ext)
+
 
 class PathNotWritableError(Exception):
     pass
 
 
+class YoutubeDLPool:
+    """
+    Long-lived YoutubeDL instances of a single worker, keyed by their
+    options (type, quality and path end up in there).
+
+    Building a YoutubeDL initializes extractors, postprocessors, the HTTP
+    opener and the cookie jar, so every worker keeps one instance per
+    option set around for all of its jobs. The pool isn't thread safe and
+    must only be used by the worker that owns it.
+    """
+
+    def __init__(self):
+        self.instances: dict[str, "YoutubeDL"] = {}
+        # Swapped for every job, instances always call `_dispatch`
+        self.progress_hooks: list[Callable] = []
+
+    @staticmethod
+    def _key(options: dict) -> str:
+        return repr(sorted(options.items()))
+
+    def _dispatch(self, d: dict):
+        for hook in self.progress_hooks:
+            hook(d)
+
+    def get(self, options: dict) -> "YoutubeDL":
+        key = self._key(options)
+        ydl = self.instances.get(key)
+        if ydl is None:
+            # Registers itself with yt-dlp
+            import pooledrh  # noqa: F401
+            import segmented
+            from yt_dlp import YoutubeDL  # type: ignore
+
+            segmented.install()
+            ydl = YoutubeDL({**options, "progress_hooks": [self._dispatch]})
+            ydl.__enter__()
+            self.instances[key] = ydl
+        # The return code of `download()` sticks once a download failed
+        ydl._download_retcode = 0
+        return ydl
+
+    def close(self):
+        for ydl in self.instances.values():
+            try:
+                ydl.__exit__(None, None, None)
+            except Exception as e:
+                LOGGER.warning(f"Failed to close YoutubeDL instance: {e}")
+        self.instances.clear()
+
+
+class Job:
+    """State of a single URL inside a `DownloadManager` batch."""
+
+    def __init__(self, url: str, slot: int = 0):
+        self.url = url
+        # Index in the batch and slot in its `ProgressStore`
+        self.slot = slot
+        self.done = False
+        self.started = False
+        self.errored = False
+        self.killed = False
+        # Already in the download archive
+        self.skipped = False
+        self.journal_id: Optional[int] = None
+        # Downloaded files, reassigned so process workers can stream them
+        self.files: list[str] = []
+        # (extractor, id) to archive once the conversion finished
+        self.archive_key: Optional[tuple[str, str]] = None
+        # Audio codec of the download as reported by yt-dlp
+        self.acodec: Optional[str] = None
+        # Failed in a way that's worth another attempt, queued again
+        self.retry = False
+        # Seconds the next attempt waits
+        self.retry_delay = 0.0
+        self.attempts = 0
+        # The last attempt failed because of the host, not the URL
+        self.host_failed = False
+        # A playlist that got replaced by jobs for its entries
+        self.expanded = False
+        # URL of the playlist and id of the entry if added by a sync
+        self.source: Optional[str] = None
+        self.entry_id: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.expanded:
+            return "expanded"
+        if self.errored:
+            return "failed"
+        if self.skipped:
+            return "skipped"
+        if self.done:
+            return "done"
+        if self.killed:
+            return "cancelled"
+        if self.started:
+            return "running"
+        return "queued"
+
+
+class DeadLetter(NamedTuple):
+    """A job that was given up on."""
+
+    url: str
+    attempts: int
+    error: Optional[str]
+
+
 class DownloadManager:
+    """
+    Downloads a batch of URLs using a fixed amount of worker threads.
+
+    Every URL becomes a `Job` that is put into a queue. `max_parallel`
+    workers pull jobs from that queue until it's empty, so the amount of
+    threads doesn't depend on the size of the batch. The queue hands jobs
+    out host by host within the limits of `hosts`, so jobs of other hosts
+    run while a busy one is at its limits. Failed jobs are attempted again
+    after a backoff as the `retry` policy says, jobs that still fail end
+    up in `dead_letters` while the rest of the batch goes on. With a
+    `tuner` the amount of workers adapts to the measured throughput, up
+    to the tuner's maximum instead of `max_parallel`. Playlists and
+    channels are flat extracted and their entries added to the batch as
+    jobs of their own, unless `expand_playlists` is False. With a `sync`
+    index only the entries that weren't downloaded before are added.
+    """
+
     def __init__(
         self,
         urls: list[str],
@@ -233,6 +733,17 @@ class DownloadManager:
         quality: Quality,
         path: Union[str, Path],
         error_callback: Callable[[str, Optional[Exception]], None],
+        max_parallel: int = 1,
+        info_cache: Optional[InfoCache] = None,
+        archive: Optional[DownloadArchive] = None,
+        journal: Optional[JobJournal] = None,
+        sync: Optional[SyncIndex] = None,
+        backend: str = "thread",
+        connectivity=None,
+        slots: Optional[threading.Semaphore] = None,
+        hosts: Optional[HostLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        tuner: Optional[ConcurrencyTuner] = None,
         **kwargs,
     ):
         self.urls = urls
@@ -241,110 +752,699 @@ class DownloadManager:
         self.error_callback = error_callback
         self.data = kwargs
         self.path = path
+        self.max_parallel = max(1, max_parallel)
+        self.tuner = tuner
+        if tuner:
+            self.max_parallel = tuner.maximum
+        self.info_cache = info_cache
+        self.archive = archive
+        self.journal = journal
+        self.sync = sync
+        # A `connectivity.ConnectivityMonitor` to pause on network loss
+        self.connectivity = connectivity
+        # Limits the downloads running at once across managers
+        self.slots = slots
+        self.retry = retry or RetryPolicy()
+        # Jobs that failed every attempt, reported once the batch is done
+        self.dead_letters: list[DeadLetter] = []
+        self.batch_id: Optional[int] = None
+        # "thread" or "process"
+        self.backend = backend
+        self.process_backend = None
+        self.pipeline: Optional[ConversionPipeline] = None
 
-        # Only if not parallel
-        self.current_thread: Optional[DLThread] = None
-        self.current_thread_idx = 0
-        self.thread_done_callback: Optional[Callable[[str], None]] = None
-
-        self.threads: list[DLThread] = []
-        self.url_to_threads: dict[str, DLThread] = {}
-
-        def dl(url: str):
-            with contextlib.suppress(ThreadKilled):
-
-                def hook(d: dict):
-                    if self.url_to_threads[url].killed:
-                        # Kill only works after the actual download started
-                        self.url_to_threads[url].kill()
-
-                    if d["status"] == "downloading":
-                        percent = int(float(
-                            re.search(
-                                r"([\d\.]+)%", d['_percent_str']
-                            ).group(1)
-                        ))
-                        self.url_to_threads[url].percent = percent
-                    elif d["status"] == "finished":
-                        self.url_to_threads[url].done = True
-                        if type_ == Type.Music:
-                            Downloader.convert(
-                                Path(path) / d["filename"], ".mp3"
-                            )
-                    elif d["status"] == "error":
-                        self.url_to_threads[url].done = True
-                        self.url_to_threads[url].errored = True
-                        if self.error_callback:
-                            self.error_callback(url)
-                        # XXX if self.thread_done_callback:
-                        # XXX     self.thread_done_callback(url, False)
-
-                options = {"progress_hooks": [hook]}
+        self.job_done_callback: Optional[
+            Callable[[str, Optional[bool]], None]
+        ] = None
 
-                try:
-                    if type_ == Type.Video:
-                        Downloader.video(
-                            [url], quality.to_standard(), path, options
-                        )
-                    elif type_ == Type.Music:
-                        Downloader.audio(
-                            [url], quality.to_standard(), path, options
-                        )
-                    elif type_ == Type.VideoOnly:
-                        Downloader.video_only(
-                            [url], quality.to_standard(), path, options
-                        )
-                except DownloadError as e:
-                    self.url_to_threads[url].done = True
-                    self.url_to_threads[url].errored = True
-                    self.error_callback(url, e)
-
-                if self.thread_done_callback:
-                    self.thread_done_callback(url, self.was_successful())
+        self.jobs: list[Job] = [
+            Job(url, slot) for slot, url in enumerate(urls)
+        ]
+        # So playlist entries don't get added twice
+        self.jobs_by_url = {job.url: job for job in self.jobs}
+        # Guards adding jobs and starting workers
+        self.jobs_lock = threading.Lock()
+        self.progress = ProgressStore(len(self.jobs))
+        self.queue = HostQueue(hosts)
+        self.workers: list[DLThread] = []
+        # Workers that didn't find the queue empty yet
+        self.running_workers = 0
+        # More jobs are going to be added, see `start_all`
+        self.accepting_jobs = False
+        # The batch completed and got cleaned up
+        self.finalized = False
+        # Ends the tuner's thread
+        self.stopped = threading.Event()
+        # Guards `active`, `pending_reload` and `paused`
+        self.reload_cond = threading.Condition()
+        self.active = 0
+        self.pending_reload: Optional[Callable[[], None]] = None
+        # Workers don't start jobs while the network is down, until
+        # `pause_deadline` at most
+        self.paused = False
+        self.pause_deadline = 0.0
+        # The network stayed down longer than `retry.offline_wait`, jobs
+        # fail like on other errors until it's back
+        self.offline_expired = False
+        # Incremented by reloads so workers rebuild their YoutubeDL pools
+        self.generation = 0
 
-        for url in urls:
-            thread = DLThread(target=dl, args=(url,), daemon=True)
-            self.threads.append(thread)
-            self.url_to_threads[url] = thread
+    @classmethod
+    def resume(
+        cls,
+        batch: JournalBatch,
+        error_callback: Callable[[str, Optional[Exception]], None],
+        journal: JobJournal,
+        **kwargs,
+    ) -> "DownloadManager":
+        """Create a manager for the unfinished jobs of a journaled batch."""
+        manager = cls(
+            [url for _, url in batch.jobs],
+            batch.type,
+            batch.quality,
+            batch.path,
+            error_callback,
+            max_parallel=batch.max_parallel,
+            journal=journal,
+            **kwargs,
+        )
+        manager.batch_id = batch.id
+        for job, (job_id, _) in zip(manager.jobs, batch.jobs):
+            job.journal_id = job_id
+        return manager
 
-    def register_thread_done_callback(
+    def register_job_done_callback(
         self, callback: Optional[Callable[[str, Optional[bool]], None]]
     ):
-        self.thread_done_callback = callback
+        self.job_done_callback = callback
+
+    def find_job(self, url: str) -> Optional[Job]:
+        return self.jobs_by_url.get(url)
+
+    def concurrency(self) -> int:
+        """The amount of jobs that may run at once right now."""
+        return self.tuner.limit if self.tuner else self.max_parallel
 
     def is_completed(self) -> bool:
-        for thread in self.threads:
-            if not thread.done:
+        if self.accepting_jobs:
+            return False
+        for job in self.jobs:
+            if not job.done:
                 return False
         return True
 
     def was_successful(self) -> bool:
         """
-        This will return True if all Threads ended without errors.
-        Otherwise, or if not every thread ended yet, it will return False.
+        This will return True if all Jobs ended without errors.
+        Otherwise, or if not every job ended yet, it will return False.
         """
-        for thread in self.threads:
-            if not thread.done or thread.errored:
+        for job in self.jobs:
+            if not job.done or job.errored:
                 return False
         return True
 
-    def start_all(self):
-        for thread in self.threads:
-            if not thread.is_alive() and not thread.killed:
-                thread.start()
+    def start_all(self, keep_open: bool = False):
+        """
+        Start downloading the batch.
+
+        With `keep_open` the batch doesn't complete before `close` was
+        called, so jobs can be added while it runs, like URLs read from a
+        stream.
+        """
+        self.accepting_jobs = keep_open
+        if self.workers or self.process_backend:
+            raise RuntimeError("Downloads were started already")
+        if self.type == Type.Music:
+            self.pipeline = ConversionPipeline(
+                self.data.get("conversion_workers")
+            )
+        if self.backend == "process":
+            from procpool import ProcessBackend
+
+            self.process_backend = ProcessBackend(
+                self, self.data.get("process_initializer")
+            )
+        if self.journal and self.batch_id is None:
+            self.batch_id, job_ids = self.journal.add_batch(
+                self.urls,
+                self.type,
+                self.quality.to_standard(),
+                self.path,
+                self.max_parallel,
+            )
+            for job, job_id in zip(self.jobs, job_ids):
+                job.journal_id = job_id
+        if self.connectivity:
+            self.connectivity.subscribe(self._connectivity_changed)
+        # Workers add the entries of playlists while this runs
+        queued = sum(self._enqueue(job) for job in list(self.jobs))
+        if self.process_backend:
+            self.process_backend.start()
+        if self.tuner:
+            threading.Thread(
+                target=self._tune, name="tuner", daemon=True
+            ).start()
+        if not queued:
+            self._check_completed()
+
+    def close(self):
+        """Stop accepting jobs, the batch completes once they're done."""
+        self.accepting_jobs = False
+        self._check_completed()
+
+    def _check_completed(self):
+        """Clean up once all jobs are done, exactly once."""
+        with self.jobs_lock:
+            if self.finalized or not self.is_completed():
+                return
+            self.finalized = True
+        self.stopped.set()
+        if self.connectivity:
+            self.connectivity.unsubscribe(self._connectivity_changed)
+        if self.journal:
+            self.journal.remove_batch(self.batch_id)
+        if self.pipeline:
+            self.pipeline.shutdown()
+        LOGGER.info(f"HTTP connections: {POOL.describe()}")
+
+    def _enqueue(self, job: Job) -> bool:
+        """Queue a job unless it's archived, returning whether it was."""
+        if self._is_archived(job):
+            job.skipped = True
+            job.done = True
+            self.progress.finish(job.slot)
+            self._journal(job, JobJournal.SKIPPED)
+            if self.job_done_callback:
+                self.job_done_callback(job.url, self.was_successful())
+            return False
+        if self.process_backend:
+            self.process_backend.enqueue(job)
+            return True
+        self.queue.put(job)
+        with self.jobs_lock:
+            if self.running_workers < self.concurrency():
+                self._start_worker()
+        return True
+
+    def _start_worker(self):
+        # Called with `jobs_lock` held
+        self.running_workers += 1
+        worker = DLThread(target=self._work, daemon=True)
+        self.workers.append(worker)
+        worker.start()
+
+    def _tune(self):
+        """Adapt the concurrency to the throughput, see `tuner`."""
+        downloaded = self.progress.downloaded_bytes()
+        started = time.monotonic()
+        while not self.stopped.wait(self.tuner.interval):
+            now = time.monotonic()
+            total = self.progress.downloaded_bytes()
+            # Slots of retried jobs count from zero again
+            throughput = max(0.0, total - downloaded) / (now - started)
+            downloaded, started = total, now
+            busy = (
+                self.process_backend.running if self.process_backend
+                else self.active
+            )
+            limit = self.concurrency()
+            saturated = busy >= limit and not self.queue.empty()
+            if self.tuner.update(throughput, saturated) == limit:
+                continue
+            LOGGER.debug(
+                f"{throughput / 1024:.0f} KB/s with {limit} parallel "
+                f"downloads, changing to {self.tuner.limit}"
+            )
+            with self.jobs_lock:
+                while (
+                    self.running_workers < self.concurrency()
+                    and not self.process_backend
+                    and not self.queue.empty()
+                ):
+                    self._start_worker()
+
+    def add_jobs(
+        self,
+        urls: list[str],
+        parent: Optional[Job] = None,
+        entry_ids: Optional[list[Optional[str]]] = None,
+    ) -> list[Job]:
+        """
+        Add jobs to the running batch and queue them.
+
+        URLs that are part of the batch already are left out. `parent` is
+        the playlist job they were found by, if any, with the `entry_ids`
+        of the URLs for the sync index.
+        """
+        if entry_ids is None:
+            entry_ids = [None] * len(urls)
+        with self.jobs_lock:
+            if parent and parent.killed:
+                return []
+            new = []
+            for url, entry_id in zip(urls, entry_ids):
+                url = ingest.canonical_url(url) or url
+                if url not in self.jobs_by_url:
+                    self.jobs_by_url[url] = None
+                    new.append((url, entry_id))
+            start = len(self.jobs)
+            jobs = []
+            for url, entry_id in new:
+                job = Job(url, start + len(jobs))
+                if self.sync and parent and entry_id is not None:
+                    job.source = parent.url
+                    job.entry_id = entry_id
+                self.jobs_by_url[url] = job
+                jobs.append(job)
+            # Slots have to exist before the jobs can be seen
+            self.progress.grow(len(jobs))
+            if self.journal and self.batch_id is not None:
+                job_ids = self.journal.add_jobs(
+                    self.batch_id, [job.url for job in jobs]
+                )
+                for job, job_id in zip(jobs, job_ids):
+                    job.journal_id = job_id
+            self.jobs.extend(jobs)
+        for job in jobs:
+            self._enqueue(job)
+        return jobs
+
+    def _expand(
+        self,
+        job: Job,
+        info: dict,
+        entries: list[tuple[str, Optional[str]]],
+    ) -> bool:
+        """Replace a playlist job by jobs for its entries."""
+        if self.sync:
+            self.sync.mark_synced(job.url)
+        elif not entries:
+            return False
+        LOGGER.info(
+            f"Adding {len(entries)} entries of {info.get('title') or job.url}"
+        )
+        if entries:
+            urls, entry_ids = zip(*entries)
+            self.add_jobs(list(urls), job, list(entry_ids))
+        job.expanded = True
+        return True
+
+    def pause(self):
+        """
+        Let running jobs end, but don't start new ones until `unpause`, for
+        `retry.offline_wait` seconds at most.
+        """
+        with self.reload_cond:
+            if self.paused or self.offline_expired:
+                return
+            LOGGER.warning("Network lost, pausing downloads")
+            self.paused = True
+            self.pause_deadline = time.monotonic() + self.retry.offline_wait
+
+    def unpause(self):
+        with self.reload_cond:
+            if self.paused:
+                LOGGER.info("Network is back, resuming downloads")
+            self.paused = False
+            self.offline_expired = False
+            self.reload_cond.notify_all()
+
+    def _ready(self) -> bool:
+        """Whether jobs may start, with `reload_cond` held."""
+        if self.paused and time.monotonic() >= self.pause_deadline:
+            LOGGER.warning(
+                f"Network still down after {self.retry.offline_wait:.0f}s, "
+                "resuming downloads anyway"
+            )
+            self.paused = False
+            self.offline_expired = True
+            self.reload_cond.notify_all()
+        return self.pending_reload is None and not self.paused
+
+    def may_start(self) -> bool:
+        """Whether jobs may start now, not while paused or reloading."""
+        with self.reload_cond:
+            return self._ready()
+
+    def _needs_network(self) -> bool:
+        """Whether a job that isn't done yet downloads from the internet."""
+        return any(
+            not job.done and not is_local(job.url) for job in list(self.jobs)
+        )
+
+    def _connectivity_changed(self, online: bool):
+        if online:
+            self.unpause()
+        elif self._needs_network():
+            # Local hosts stay reachable without the internet
+            self.pause()
+
+    def _network_lost(self, job: Job, err: Optional[Exception]) -> bool:
+        """Probe the network after a failure, pausing if it's down."""
+        if (
+            not self.connectivity
+            or self.process_backend
+            or self.offline_expired
+            # A site that's down or gone doesn't mean the network is
+            or not is_network_error(err)
+            or is_local(job.url)
+        ):
+            return False
+        if self.connectivity.check(max_age=0):
+            return False
+        self.pause()
+        return True
+
+    def _job_failed(self, job: Job, err: Optional[Exception] = None):
+        if self._network_lost(job, err):
+            # Not the job's fault, try again once the network is back
+            job.attempts -= 1
+            job.retry = True
+            return
+        permanent = is_permanent(err)
+        job.host_failed = not permanent
+        if permanent or job.attempts >= self.retry.max_attempts:
+            self._give_up(job, err)
+            return
+        job.retry_delay = self.retry.delay(job.attempts)
+        job.retry = True
+        LOGGER.warning(
+            f"Attempt {job.attempts} of {job.url} failed, trying again in "
+            f"{job.retry_delay:.0f}s: {err}"
+        )
+
+    def _give_up(self, job: Job, err: Optional[Exception] = None):
+        job.errored = True
+        self.dead_letters.append(
+            DeadLetter(job.url, job.attempts, str(err) if err else None)
+        )
+        if self.error_callback:
+            self.error_callback(job.url, err)
+
+    def request_reload(self, reload: Callable[[], None]):
+        """
+        Run `reload` between jobs, once no worker thread is downloading.
+
+        Workers don't start new jobs until it ran and build new YoutubeDL
+        instances afterwards, so nothing in the queue gets lost. Process
+        workers keep the version they started with, so it runs right away
+        with the process backend.
+        """
+        with self.reload_cond:
+            if self.active and not self.process_backend:
+                self.pending_reload = reload
+                return
+            self._reload(reload)
+
+    def _reload(self, reload: Callable[[], None]):
+        try:
+            reload()
+        except Exception as e:
+            LOGGER.error(f"Reload between jobs failed: {e!r}")
+        self.generation += 1
+        self.pending_reload = None
+        self.reload_cond.notify_all()
+
+    def _work(self):
+        pool = YoutubeDLPool()
+        generation = self.generation
+        try:
+            while True:
+                with self.jobs_lock:
+                    # The tuner lowered the concurrency
+                    if self.running_workers > self.concurrency():
+                        self.running_workers -= 1
+                        return
+                job = self.queue.get()
+                if job is None:
+                    with self.jobs_lock:
+                        # Jobs may have been added in the meantime
+                        if self.queue.empty():
+                            self.running_workers -= 1
+                            return
+                    continue
+                try:
+                    if not job.killed:
+                        generation = self._run_job(job, pool, generation)
+                finally:
+                    # Frees the job's host for the next one
+                    self._job_ended(job)
+        finally:
+            pool.close()
+
+    def _run_job(
+        self, job: Job, pool: YoutubeDLPool, generation: int
+    ) -> int:
+        """Download a job on a worker, returning the pool's generation."""
+        # Shared with other managers, like the ones of a daemon
+        with self.slots or contextlib.nullcontext():
+            with self.reload_cond:
+                # Wakes up now and then, pauses end on their own
+                while not self.reload_cond.wait_for(self._ready, timeout=1):
+                    pass
+                if job.killed:
+                    return generation
+                self.active += 1
+            if generation != self.generation:
+                pool.close()
+                generation = self.generation
+            try:
+                self._start_job(job)
+                with contextlib.suppress(ThreadKilled):
+                    try:
+                        self._download(job, pool)
+                    except ThreadKilled:
+                        raise
+                    except Exception as e:
+                        # Would end the worker and the batch would never
+                        # complete
+                        LOGGER.error(f"Download of {job.url} failed: {e!r}")
+                        self._job_failed(job, e)
+                    if job.retry:
+                        self._requeue(job)
+                    else:
+                        self._job_downloaded(job)
+            finally:
+                with self.reload_cond:
+                    self.active -= 1
+                    if self.pending_reload and not self.active:
+                        self._reload(self.pending_reload)
+        return generation
+
+    def _job_ended(self, job: Job):
+        if self.queue.done(job, job.host_failed):
+            LOGGER.warning(
+                f"{host_key(job.url)} keeps failing, not starting its jobs "
+                f"for {self.queue.limiter.breaker_cooldown:.0f}s"
+            )
+
+    def _requeue(self, job: Job):
+        delay = job.retry_delay
+        job.retry = False
+        job.retry_delay = 0.0
+        job.started = False
+        job.files = []
+        job.archive_key = None
+        self._journal(job, JobJournal.QUEUED)
+        self.queue.put(job, delay)
+
+    def _start_job(self, job: Job):
+        job.started = True
+        job.attempts += 1
+        job.host_failed = False
+        self._journal(job, JobJournal.RUNNING)
+
+    def _job_downloaded(self, job: Job):
+        """Hand a job whose download ended over to the conversion stage."""
+        if job.killed:
+            return
+        if job.expanded:
+            self.progress.drop(job.slot)
+        else:
+            self.progress.finish(job.slot)
+        if self.pipeline and job.files and not (job.errored or job.skipped):
+            self.pipeline.submit(self._convert, job)
+            return
+        job.done = True
+        self._finish_job(job)
+
+    def _convert(self, job: Job):
+        if job.killed:
+            return
+        try:
+            for file in job.files:
+                converted = Downloader.convert_audio(
+                    file,
+                    self.data.get("audio_codec", "mp3"),
+                    self.data.get("audio_bitrate"),
+                    job.acodec,
+                )
+        except Exception as e:
+            self._give_up(job, e)
+        else:
+            if self.archive and job.archive_key:
+                self.archive.add(
+                    *job.archive_key,
+                    job.url,
+                    self.type,
+                    self.quality.to_standard(),
+                    converted,
+                )
+        job.done = True
+        self._finish_job(job)
+
+    def _finish_job(self, job: Job):
+        if job.killed:
+            return
+        if job.errored:
+            self._journal(job, JobJournal.ERRORED)
+        elif job.skipped:
+            self._journal(job, JobJournal.SKIPPED)
+        else:
+            self._journal(job, JobJournal.DONE)
+        if self.sync and job.source and not job.errored:
+            self.sync.add(job.source, [job.entry_id])
+        self._check_completed()
+        if self.job_done_callback:
+            self.job_done_callback(job.url, self.was_successful())
+
+    def _journal(self, job: Job, state: str):
+        if self.journal and job.journal_id is not None:
+            self.journal.set_state(job.journal_id, state)
+
+    def _download(self, job: Job, pool: YoutubeDLPool):
+        failed = False
+
+        def hook(d: dict):
+            nonlocal failed
+            if job.killed:
+                raise ThreadKilled
+
+            if d["status"] == "downloading":
+                self.progress.update(
+                    job.slot,
+                    d.get("downloaded_bytes") or 0,
+                    d.get("total_bytes") or d.get("total_bytes_estimate"),
+                    d.get("speed"),
+                )
+            elif d["status"] == "finished":
+                self.progress.file_finished(
+                    job.slot,
+                    d.get("total_bytes") or d.get("downloaded_bytes"),
+                )
+                job.acodec = d.get("info_dict", {}).get("acodec")
+                job.files = [*job.files, str(Path(self.path) / d["filename"])]
+            elif d["status"] == "error":
+                failed = True
+
+        from yt_dlp.utils import DownloadError  # type: ignore
+
+        # Connections of a single download, for fragments of DASH and
+        # HLS formats as well as for segments of plain files
+        connections = max(1, self.data.get("connections", 1))
+        options = {
+            "progress_hooks": [hook],
+            "retries": self.retry.request_retries,
+            "fragment_retries": self.retry.request_retries,
+            "concurrent_fragment_downloads": connections,
+            "http_segments": connections,
+        }
+        quality = self.quality.to_standard()
+        kwargs = {"pool": pool, "info_cache": self.info_cache}
+        if self.data.get("expand_playlists", True) or self.sync:
+            kwargs["playlist_hook"] = functools.partial(self._expand, job)
+        if self.sync and job.source is None:
+            known = self.sync.known(job.url)
+            kwargs["known_entry"] = lambda entry: entry.get("id") in known
+        if self.archive:
+            kwargs["info_filter"] = functools.partial(self._not_archived, job)
+            kwargs["info_hook"] = functools.partial(self._add_to_archive, job)
 
-    def start_next(self):
         try:
-            thread_to_start = self.threads[self.current_thread_idx]
-            self.current_thread_idx += 1
-        except IndexError:
-            raise RuntimeError("All threads were started already")
-        if not thread_to_start.is_alive() and not thread_to_start.killed:
-            thread_to_start.start()
+            if self.type == Type.Video:
+                Downloader.video(
+                    [job.url], quality, self.path, options, **kwargs
+                )
+            elif self.type == Type.Music:
+                Downloader.audio(
+                    [job.url], quality, self.path, options, **kwargs
+                )
+            elif self.type == Type.VideoOnly:
+                Downloader.video_only(
+                    [job.url], quality, self.path, options, **kwargs
+                )
+        except DownloadError as e:
+            self._job_failed(job, e)
+        else:
+            if failed:
+                # Reported by a progress hook only, without the error
+                self._job_failed(job)
+
+    def _is_archived(self, job: Job) -> bool:
+        if not self.archive:
+            return False
+        return self.archive.find_url(
+            job.url, self.type, self.quality.to_standard(), self.path
+        ) is not None
+
+    def _not_archived(self, job: Job, info: dict) -> bool:
+        # Catches other spellings of an URL that was downloaded before
+        file = self.archive.find(
+            info["extractor_key"],
+            info["id"],
+            self.type,
+            self.quality.to_standard(),
+            self.path,
+        )
+        if file is None:
+            return True
+        LOGGER.debug(f"{job.url} is already downloaded to {file}")
+        job.skipped = True
+        return False
+
+    def _add_to_archive(self, job: Job, info: dict):
+        downloads = info.get("requested_downloads") or [info]
+        file = downloads[-1].get("filepath")
+        if not file:
+            return
+        if self.type == Type.Music:
+            # Archived once the conversion stage is done with it
+            job.archive_key = (info["extractor_key"], info["id"])
+            return
+        file = Path(file)
+        if not file.exists():
+            return
+        self.archive.add(
+            info["extractor_key"],
+            info["id"],
+            job.url,
+            self.type,
+            self.quality.to_standard(),
+            file,
+        )
 
     def killall(self):
-        for thread in self.threads:
-            thread.kill()
+        if self.journal and self.batch_id is not None:
+            # Cancelled batches aren't resumed
+            self.journal.remove_batch(self.batch_id)
+        with self.jobs_lock:
+            for job in self.jobs:
+                job.killed = True
+        self.stopped.set()
+        # Workers waiting for a free host exit
+        self.queue.clear()
+        if self.connectivity:
+            self.connectivity.unsubscribe(self._connectivity_changed)
+        # Workers waiting for the network exit on their next job
+        self.unpause()
+        if self.process_backend:
+            self.process_backend.kill()
+        if self.pipeline:
+            self.pipeline.shutdown(cancel=True)
+        for worker in self.workers:
+            # The worker may finish between the check and the kill
+            with contextlib.suppress(threading.ThreadError, ValueError):
+                worker.kill()
 
 
 def _async_raise(tid, exc):
@@ -368,10 +1468,7 @@ class ThreadKilled(Exception):
 class DLThread(threading.Thread):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.percent = 0
-        self.done = False
         self.started = False
-        self.errored = False
         self.killed = False
 
     def start(self) -> None:
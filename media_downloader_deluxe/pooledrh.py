@@ -0,0 +1,158 @@
+import http.client
+import io
+import ssl
+import urllib.parse
+import urllib.request
+import zlib
+
+from httppool import MAX_REDIRECTS, POOL, PooledResponse
+from yt_dlp.networking.common import (RequestHandler,  # type: ignore
+                                      Response, register_preference,
+                                      register_rh)
+from yt_dlp.networking import exceptions  # type: ignore
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def _map_error(e: Exception) -> exceptions.RequestError:
+    if isinstance(e, http.client.IncompleteRead):
+        return exceptions.IncompleteRead(
+            partial=len(e.partial), expected=e.expected, cause=e
+        )
+    if isinstance(e, ssl.SSLCertVerificationError):
+        return exceptions.CertificateVerifyError(cause=e)
+    if isinstance(e, ssl.SSLError):
+        return exceptions.SSLError(cause=e)
+    return exceptions.TransportError(cause=e)
+
+
+def _decompress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return zlib.decompress(body, zlib.MAX_WBITS | 16)
+    try:
+        return zlib.decompress(body)
+    except zlib.error:
+        # Some servers send raw deflate streams
+        return zlib.decompress(body, -zlib.MAX_WBITS)
+
+
+class PooledResponseAdapter(Response):
+    def __init__(self, response: PooledResponse, fp: io.IOBase):
+        super().__init__(
+            fp=fp,
+            url=response.url,
+            headers=response.headers,
+            status=response.status,
+            reason=response.reason,
+        )
+
+    def read(self, amt=None):
+        try:
+            return self.fp.read(amt)
+        except (OSError, http.client.HTTPException) as e:
+            raise _map_error(e) from e
+
+
+@register_rh
+class PooledRH(RequestHandler):
+    """
+    Sends the requests of yt-dlp through the process-wide `POOL`.
+
+    Every YoutubeDL builds handlers of its own, but they all share the
+    pool's keep-alive connections and TLS sessions, so jobs don't pay the
+    handshakes to the same hosts again. Requests that need proxies, client
+    certificates, a source address, legacy SSL or impersonation go to
+    yt-dlp's own handlers instead.
+    """
+
+    _SUPPORTED_URL_SCHEMES = ("http", "https")
+    _SUPPORTED_PROXY_SCHEMES = ()
+    _SUPPORTED_FEATURES = ()
+
+    def _check_extensions(self, extensions):
+        super()._check_extensions(extensions)
+        extensions.pop("cookiejar", None)
+        extensions.pop("timeout", None)
+        extensions.pop("keep_header_casing", None)
+        if not extensions.get("legacy_ssl"):
+            extensions.pop("legacy_ssl", None)
+
+    def _validate(self, request):
+        # The pool's connections are the same for every YoutubeDL
+        if (
+            self.source_address
+            or any(self._client_cert.values())
+            or self.legacy_ssl_support
+            or not self.verify
+        ):
+            raise exceptions.UnsupportedRequest("Needs connections of its own")
+        if request.data is not None and not isinstance(request.data, bytes):
+            raise exceptions.UnsupportedRequest(
+                "Only bytes bodies are supported"
+            )
+        super()._validate(request)
+
+    def _send(self, request):
+        headers = self._get_headers(request)
+        if headers.get("Accept-Encoding", "").lower() != "identity":
+            headers["Accept-Encoding"] = "gzip, deflate"
+        cookiejar = self._get_cookiejar(request)
+        timeout = self._calculate_timeout(request)
+        url, method, data = request.url, request.method, request.data
+        for _ in range(MAX_REDIRECTS + 1):
+            urllib_request = urllib.request.Request(
+                url, headers=headers, method=method
+            )
+            cookiejar.add_cookie_header(urllib_request)
+            try:
+                response = POOL.request(
+                    method,
+                    url,
+                    dict(urllib_request.header_items()),
+                    data,
+                    timeout,
+                )
+            except (OSError, http.client.HTTPException) as e:
+                raise _map_error(e) from e
+            except ValueError as e:
+                raise exceptions.RequestError(cause=e) from e
+            cookiejar.extract_cookies(response, urllib_request)
+            location = response.headers.get("Location")
+            if response.status not in REDIRECT_STATUSES or not location:
+                break
+            try:
+                # Frees the connection for the next hop
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                raise _map_error(e) from e
+            url = urllib.parse.urljoin(url, location)
+            if (response.status == 303 and method != "HEAD") or (
+                response.status in (301, 302) and method == "POST"
+            ):
+                method, data = "GET", None
+                headers.pop("Content-Type", None)
+                headers.pop("Content-Length", None)
+        else:
+            raise exceptions.HTTPError(
+                PooledResponseAdapter(response, response),
+                redirect_loop=True,
+            )
+
+        fp = response
+        encoding = response.headers.get("Content-Encoding", "").lower()
+        if encoding in ("gzip", "deflate"):
+            # Compressed responses are pages and API calls, never media
+            try:
+                fp = io.BytesIO(_decompress(response.read(), encoding))
+            except (OSError, http.client.HTTPException, zlib.error) as e:
+                raise _map_error(e) from e
+        adapter = PooledResponseAdapter(response, fp)
+        if not 200 <= response.status < 300:
+            raise exceptions.HTTPError(adapter)
+        return adapter
+
+
+@register_preference(PooledRH)
+def pooled_preference(rh, request):
+    # Ahead of yt-dlp's handlers, which don't share connections
+    return 200
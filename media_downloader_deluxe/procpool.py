@@ -0,0 +1,379 @@
+import multiprocessing
+import multiprocessing.connection
+import threading
+from typing import Callable, Optional
+
+from archive import DownloadArchive
+from cache import InfoCache
+from enums import Quality, Type
+from model import LOGGER, DownloadManager, Job, YoutubeDLPool
+from progress import RemoteProgress
+from scheduler import RetryPolicy
+from sync import SyncIndex
+from yt_dlp.utils import DownloadError  # type: ignore
+
+# Processes must not inherit the GUI's threads, so never fork
+CONTEXT = multiprocessing.get_context("spawn")
+
+
+class EventSender:
+    """
+    The sending end of a process's event pipe, shared by its threads.
+
+    Unlike a `multiprocessing.Queue` nothing is buffered in a thread, so
+    what got sent arrives even if the process dies right after.
+    """
+
+    def __init__(self, connection: multiprocessing.connection.Connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+
+    def put(self, event: tuple):
+        with self.lock:
+            self.connection.send(event)
+
+
+class ProcessJob(Job):
+    """A `Job` inside a worker process that streams its state changes."""
+
+    def __init__(self, slot: int, url: str, events):
+        super().__init__(url, slot)
+        self.__dict__["_events"] = events
+
+    def __setattr__(self, name: str, value):
+        super().__setattr__(name, value)
+        if "_events" in self.__dict__:
+            self._events.put((self.slot, name, value))
+
+
+class RemoteManager(DownloadManager):
+    """A `DownloadManager` inside a worker process."""
+
+    def __init__(self, *args, events, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events = events
+        self.progress = RemoteProgress(events)
+
+    def add_jobs(
+        self,
+        urls: list[str],
+        parent: Optional[Job] = None,
+        entry_ids: Optional[list[Optional[str]]] = None,
+    ) -> list[Job]:
+        # The parent's manager owns the batch
+        self.events.put((parent.slot, "_expanded", (urls, entry_ids)))
+        return []
+
+    def _job_failed(self, job: Job, err: Optional[Exception] = None):
+        # Whether to attempt it again is up to the parent's manager
+        self.events.put((job.slot, "_failed", str(err) if err else None))
+
+
+def work(
+    jobs,
+    events,
+    type_: Type,
+    quality: Quality,
+    path: str,
+    info_cache_args: Optional[tuple],
+    archive_path: Optional[str],
+    sync_path: Optional[str],
+    log_options: dict,
+    expand_playlists: bool,
+    connections: int,
+    retry: RetryPolicy,
+    initializer: Optional[Callable[[], None]] = None,
+):
+    """Entry point of a worker process."""
+    events = EventSender(events)
+    if initializer:
+        initializer()
+    # The manager's process already started the log file
+    LOGGER.first_log = False
+    LOGGER.configure(**log_options)
+    manager = RemoteManager(
+        [],
+        type_,
+        quality,
+        path,
+        None,
+        info_cache=InfoCache(*info_cache_args) if info_cache_args else None,
+        archive=DownloadArchive(archive_path) if archive_path else None,
+        sync=SyncIndex(sync_path) if sync_path else None,
+        expand_playlists=expand_playlists,
+        connections=connections,
+        retry=retry,
+        events=events,
+    )
+    pool = YoutubeDLPool()
+    try:
+        while (item := jobs.recv()) is not None:
+            current, url = item
+            job = ProcessJob(current, url, events)
+            events.put((current, "_started", None))
+            try:
+                manager._download(job, pool)
+            except Exception as e:
+                LOGGER.error(f"Download of {url} failed: {e!r}")
+                manager._job_failed(job, e)
+            events.put((current, "_finished", None))
+    finally:
+        pool.close()
+        # Processes of multiprocessing skip atexit
+        if manager.info_cache:
+            manager.info_cache.flush()
+        if manager.archive:
+            manager.archive.close()
+        if manager.sync:
+            manager.sync.close()
+        LOGGER.flush()
+
+
+class Worker:
+    """
+    A worker process with pipes of its own for the jobs it gets and the
+    events it sends. A process that dies only takes its own pipes with it.
+    """
+
+    def __init__(self, args: tuple):
+        jobs, self.jobs = CONTEXT.Pipe(duplex=False)
+        self.events, events = CONTEXT.Pipe(duplex=False)
+        self.process = CONTEXT.Process(
+            target=work, args=(jobs, events, *args), daemon=True
+        )
+        self.process.start()
+        # Reading the events ends once the process closed its end
+        jobs.close()
+        events.close()
+        # Slot of the job it's running, None while idle
+        self.slot: Optional[int] = None
+
+
+class ProcessBackend:
+    """
+    Runs the jobs of a `DownloadManager` in a pool of worker processes.
+
+    Extraction doesn't compete with the GUI for the GIL this way and
+    cancelling terminates the workers, no matter what they are doing.
+    Job state changes are streamed back over a pipe per process and
+    applied to the manager's jobs by a listener thread. A feeder thread
+    hands the jobs in the manager's `HostQueue` to an idle process whenever
+    there is one, so the host limits and the manager's concurrency apply
+    like with threads. Processes are started as jobs get handed out, up to
+    `max_parallel`, and stopped once no job is pending and the manager
+    doesn't accept new ones. When a process dies, the job it was running
+    fails and is attempted again like after any other error. After
+    `CRASH_LIMIT` deaths in a row, the remaining jobs fail.
+    """
+
+    CRASH_LIMIT = 5
+
+    def __init__(
+        self,
+        manager: DownloadManager,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        self.manager = manager
+        self.initializer = initializer
+        self.workers: list[Worker] = []
+        self.listener: Optional[threading.Thread] = None
+        self.feeder: Optional[threading.Thread] = None
+        self.killed = False
+        # No more jobs are handed out
+        self.stopped = False
+        # Guards `pending`, `running`, `workers` and `crashes`
+        self.lock = threading.Lock()
+        # Queued jobs that didn't finish yet
+        self.pending = 0
+        # Jobs handed to the processes that didn't finish yet
+        self.running = 0
+        # Notified whenever a job handed to a process finished
+        self.job_finished = threading.Condition(self.lock)
+        # Processes that died since a job finished the last time
+        self.crashes = 0
+
+    def _args(self) -> tuple:
+        """Arguments of `work` besides the pipes, for a new process."""
+        manager = self.manager
+        # Replaced when yt-dlp gets reloaded
+        cache = manager.info_cache
+        return (
+            manager.type,
+            manager.quality.to_standard(),
+            str(manager.path),
+            (
+                (cache.directory, cache.ttl, cache.max_entries, cache.version)
+                if cache else None
+            ),
+            str(manager.archive.path) if manager.archive else None,
+            str(manager.sync.path) if manager.sync else None,
+            {"level": LOGGER.level, "json_lines": LOGGER.json_lines},
+            manager.data.get("expand_playlists", True),
+            manager.data.get("connections", 1),
+            manager.retry,
+            self.initializer,
+        )
+
+    def enqueue(self, job: Job):
+        with self.lock:
+            self.pending += 1
+        self.manager.queue.put(job)
+
+    def start(self):
+        self.listener = threading.Thread(target=self._listen, daemon=True)
+        self.listener.start()
+        self.feeder = threading.Thread(target=self._feed, daemon=True)
+        self.feeder.start()
+
+    def _feed(self):
+        concurrency = self.manager.concurrency
+        while not self.killed and not self.stopped:
+            with self.lock:
+                # Times out now and then, the concurrency might have grown
+                # or a pause because of a network loss ended
+                if not self.job_finished.wait_for(
+                    lambda: (
+                        self.running < concurrency()
+                        and self.manager.may_start()
+                    ),
+                    timeout=0.5,
+                ):
+                    continue
+            job = self.manager.queue.get(wait=True, timeout=0.5)
+            if job is None:
+                continue
+            with self.lock:
+                self.running += 1
+                worker = next(
+                    (worker for worker in self.workers if worker.slot is None),
+                    None,
+                )
+                if worker is None:
+                    worker = Worker(self._args())
+                    self.workers.append(worker)
+                worker.slot = job.slot
+            try:
+                worker.jobs.send((job.slot, job.url))
+            except OSError:
+                # It died while idle, the listener fails the job
+                pass
+
+    def _listen(self):
+        manager = self.manager
+        while not self.killed:
+            with self.lock:
+                if not self.pending and not manager.accepting_jobs:
+                    self._stop_processes()
+                    return
+                # Times out now and then, processes might have been added
+                connections = {
+                    worker.events: worker for worker in self.workers
+                }
+            ready = multiprocessing.connection.wait(connections, timeout=0.5)
+            dead = []
+            for connection in ready:
+                try:
+                    event = connection.recv()  # type: ignore
+                except (EOFError, OSError):
+                    # Everything it sent was received before
+                    dead.append(connections[connection])
+                    continue
+                self._handle(*event)
+            if dead and self._processes_died(dead):
+                return
+
+    def _handle(self, idx: int, name: str, value):
+        """Apply an event of a process to the manager's job."""
+        manager = self.manager
+        job = manager.jobs[idx]
+        if name == "_started":
+            manager._start_job(job)
+        elif name == "_finished":
+            with self.lock:
+                for worker in self.workers:
+                    if worker.slot == idx:
+                        worker.slot = None
+                self.crashes = 0
+            self._job_finished(job)
+        elif name == "_expanded":
+            urls, entry_ids = value
+            manager.add_jobs(urls, job, entry_ids)
+        elif name == "_progress":
+            manager.progress.update(job.slot, *value)
+        elif name == "_file_finished":
+            manager.progress.file_finished(job.slot, value)
+        elif name == "_progress_finish":
+            manager.progress.finish(job.slot)
+        elif name == "_failed":
+            manager._job_failed(
+                job, DownloadError(value) if value else None
+            )
+        elif name != "killed":
+            setattr(job, name, value)
+
+    def _job_finished(self, job: Job):
+        manager = self.manager
+        with self.lock:
+            self.running -= 1
+            if not job.retry:
+                self.pending -= 1
+            self.job_finished.notify()
+        manager._job_ended(job)
+        if job.retry:
+            manager._requeue(job)
+        else:
+            manager._job_downloaded(job)
+
+    def _processes_died(self, dead: list[Worker]) -> bool:
+        """
+        Fail the jobs of processes that died, returning True if they keep
+        dying and all remaining jobs were failed.
+        """
+        with self.lock:
+            for worker in dead:
+                worker.events.close()
+                self.workers.remove(worker)
+            crashed = [
+                worker.slot for worker in dead if worker.slot is not None
+            ]
+            self.crashes += len(dead)
+            failed = self.crashes >= self.CRASH_LIMIT
+        if failed:
+            self._fail_remaining()
+            return True
+        for slot in crashed:
+            job = self.manager.jobs[slot]
+            LOGGER.error(f"The download process of {job.url} exited")
+            if not job.started:
+                # It died before it got to the job
+                self.manager._start_job(job)
+            self.manager._job_failed(
+                job, DownloadError("Download process exited unexpectedly")
+            )
+            self._job_finished(job)
+        return False
+
+    def _stop_processes(self):
+        self.stopped = True
+        for worker in self.workers:
+            try:
+                worker.jobs.send(None)
+            except OSError:
+                pass
+
+    def _fail_remaining(self):
+        LOGGER.error("Download processes keep exiting unexpectedly")
+        self.stopped = True
+        for job in self.manager.jobs:
+            if job.done or job.killed:
+                continue
+            job.done = True
+            job.errored = True
+            self.manager.progress.finish(job.slot)
+            self.manager._finish_job(job)
+
+    def kill(self):
+        self.killed = True
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
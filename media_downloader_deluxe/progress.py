@@ -0,0 +1,154 @@
+import time
+from array import array
+from typing import Optional
+
+
+def format_bytes(amount: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if amount < 1024:
+            return f"{amount:.1f} {unit}"
+        amount /= 1024
+    return f"{amount:.1f} TB"
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes}:{seconds:02}"
+
+
+class ProgressStore:
+    """
+    Byte counts of every job of a batch in preallocated arrays, one slot
+    per job.
+
+    A slot is only ever written by the worker running its job and single
+    array items are replaced atomically, so neither the progress hooks
+    nor the readers need a lock. Aggregates are computed with C-level
+    `sum()`/`count()` over the arrays.
+
+    Jobs whose size isn't known yet count with the average size of the
+    known ones, so the percentage is weighted by size.
+
+    Batches can grow when playlists get expanded, `grow` appends slots
+    and `drop` excludes a slot (the playlist itself) from the totals.
+    """
+
+    def __init__(self, size: int):
+        self.size = 0
+        # Bytes of files of a slot that already finished (merged formats)
+        self.base = array("d")
+        self.downloaded = array("d")
+        self.total = array("d")
+        self.speed = array("d")
+        # 1 for slots that finished without ever knowing their size
+        self.unknown_done = array("b")
+        # 1 for slots that don't count at all
+        self.dropped = array("b")
+        self.grow(size)
+
+    def grow(self, amount: int):
+        """Append `amount` slots, readers see them once all exist."""
+        for values in (self.base, self.downloaded, self.total, self.speed):
+            values.frombytes(bytes(8 * amount))
+        self.unknown_done.frombytes(bytes(amount))
+        self.dropped.frombytes(bytes(amount))
+        self.size += amount
+
+    def drop(self, slot: int):
+        self.dropped[slot] = 1
+        self.base[slot] = self.downloaded[slot] = 0.0
+        self.total[slot] = self.speed[slot] = 0.0
+        self.unknown_done[slot] = 0
+
+    def update(
+        self,
+        slot: int,
+        downloaded: float,
+        total: Optional[float],
+        speed: Optional[float],
+    ):
+        base = self.base[slot]
+        self.downloaded[slot] = base + downloaded
+        if total:
+            self.total[slot] = base + total
+        self.speed[slot] = speed or 0.0
+
+    def file_finished(self, slot: int, size: Optional[float]):
+        """A file of a slot is complete, following ones add up to it."""
+        size = size or (self.downloaded[slot] - self.base[slot])
+        self.base[slot] += size
+        self.downloaded[slot] = self.total[slot] = self.base[slot]
+        self.speed[slot] = 0.0
+
+    def finish(self, slot: int):
+        """The job of a slot ended, successful or not."""
+        self.speed[slot] = 0.0
+        if self.total[slot]:
+            self.downloaded[slot] = self.total[slot]
+        else:
+            self.unknown_done[slot] = 1
+
+    def bytes_per_second(self) -> float:
+        return sum(self.speed)
+
+    def downloaded_bytes(self) -> float:
+        return sum(self.downloaded)
+
+    def _counted(self) -> int:
+        return self.size - self.dropped.count(1)
+
+    def _estimate(self) -> tuple[float, float]:
+        """Return estimated (done, total) bytes of the whole batch."""
+        without_total = self.total.count(0.0)
+        known = self.size - without_total
+        unknown = without_total - self.dropped.count(1)
+        known_total = sum(self.total)
+        average = known_total / known if known else 0.0
+        total = known_total + unknown * average
+        done = sum(self.downloaded) + self.unknown_done.count(1) * average
+        return done, total
+
+    def percent(self) -> float:
+        counted = self._counted()
+        if not counted:
+            return 100.0
+        done, total = self._estimate()
+        if not total:
+            return 100.0 * self.unknown_done.count(1) / counted
+        return min(100.0, 100.0 * done / total)
+
+    def eta(self) -> Optional[float]:
+        """Seconds until the batch is done at the current speed."""
+        speed = self.bytes_per_second()
+        if not speed:
+            return None
+        done, total = self._estimate()
+        return max(0.0, total - done) / speed
+
+
+class RemoteProgress:
+    """
+    Drop-in for `ProgressStore` inside worker processes that sends updates
+    over the event pipe, at most every `interval` seconds per slot.
+    """
+
+    def __init__(self, events, interval: float = 0.1):
+        self.events = events
+        self.interval = interval
+        self.last_sent: dict[int, float] = {}
+
+    def update(self, slot, downloaded, total, speed):
+        now = time.monotonic()
+        if now - self.last_sent.get(slot, 0.0) < self.interval:
+            return
+        self.last_sent[slot] = now
+        self.events.put((slot, "_progress", (downloaded, total, speed)))
+
+    def file_finished(self, slot, size):
+        self.events.put((slot, "_file_finished", size))
+
+    def finish(self, slot):
+        self.events.put((slot, "_progress_finish", None))
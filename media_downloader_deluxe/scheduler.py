@@ -0,0 +1,486 @@
+import heapq
+import ipaddress
+import itertools
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import deque
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+import config
+
+if TYPE_CHECKING:
+    from model import Job
+
+# Hosts that are another name of the same site
+HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+    "x.com": "twitter.com",
+    "redd.it": "reddit.com",
+}
+# Second level labels of country code domains, like in co.uk
+SECOND_LEVEL = {"ac", "co", "com", "edu", "gov", "ne", "net", "or", "org"}
+# Errors that attempting again won't fix
+PERMANENT_ERRORS = re.compile(
+    "|".join([
+        r"Unsupported URL",
+        r"is not a valid URL",
+        r"Video unavailable",
+        r"Private video",
+        r"members[- ]only",
+        r"confirm your age",
+        r"not available in your country",
+        r"geo[- ]?restrict",
+        r"has been removed",
+        r"HTTP Error (?:404|410)",
+        r"Requested format is not available",
+    ]),
+    re.IGNORECASE,
+)
+
+
+# Errors of a network that's down, as opposed to a failing site
+NETWORK_ERRORS = re.compile(
+    "|".join([
+        r"Connection refused",
+        r"Connection reset",
+        r"Connection aborted",
+        r"Network is unreachable",
+        r"No route to host",
+        r"Name or service not known",
+        r"Temporary failure in name resolution",
+        r"nodename nor servname",
+        r"getaddrinfo failed",
+        r"No address associated with hostname",
+        r"Failed to resolve",
+        r"Failed to establish a new connection",
+        r"timed out",
+    ]),
+    re.IGNORECASE,
+)
+# Names that never leave the local network
+LOCAL_SUFFIXES = (".local", ".localhost", ".lan", ".home.arpa", ".internal")
+
+
+def is_permanent(err: Optional[Exception]) -> bool:
+    return err is not None and bool(PERMANENT_ERRORS.search(str(err)))
+
+
+def is_network_error(err: Optional[Exception]) -> bool:
+    return err is not None and bool(NETWORK_ERRORS.search(str(err)))
+
+
+def is_local(url: str) -> bool:
+    """Whether an URL points to this machine or the local network."""
+    host = (urllib.parse.urlsplit(url).hostname or "").rstrip(".").lower()
+    if not host:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return "." not in host or host.endswith(LOCAL_SUFFIXES)
+    return (
+        address.is_private or address.is_loopback or address.is_link_local
+    )
+
+
+def host_key(url: str) -> str:
+    """Return the site of an URL, the same for all of its subdomains."""
+    host = (urllib.parse.urlsplit(url).hostname or "").rstrip(".")
+    if not host or ":" in host or host.replace(".", "").isdigit():
+        return host
+    labels = host.split(".")
+    keep = 2
+    if (
+        len(labels) > 2
+        and len(labels[-1]) == 2
+        and labels[-2] in SECOND_LEVEL
+    ):
+        keep = 3
+    site = ".".join(labels[-keep:])
+    return HOST_ALIASES.get(site, site)
+
+
+class HostLimit(NamedTuple):
+    # Jobs of the host running at once, 0 for no limit
+    max_parallel: int = 0
+    # Jobs of the host started per second on average, 0 for no limit
+    rate: float = 0.0
+    # Jobs that may start at once after the host was idle
+    burst: float = 1.0
+
+
+class RetryPolicy(NamedTuple):
+    """How often a failed job is attempted and how long it waits."""
+
+    # Attempts of a job before it's given up on
+    max_attempts: int = 3
+    # Seconds before the second attempt, doubled for every further one
+    base_delay: float = 5.0
+    max_delay: float = 300.0
+    # Retries of single HTTP requests and fragments inside yt-dlp
+    request_retries: int = 10
+    # Seconds jobs wait for the network to come back at most, then they
+    # fail like on any other error
+    offline_wait: float = 300.0
+
+    @classmethod
+    def from_config(cls) -> "RetryPolicy":
+        return cls(
+            max(1, config.CONFIG.get_int("max_attempts")),
+            config.CONFIG.get_float("retry_base_delay"),
+            config.CONFIG.get_float("retry_max_delay"),
+            config.CONFIG.get_int("request_retries"),
+            config.CONFIG.get_float("max_offline_wait"),
+        )
+
+    def delay(self, attempts: int) -> float:
+        """
+        Seconds to wait after the `attempts`th failed attempt. Half of it
+        is random, so jobs that failed together don't retry together.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """
+    Stops starting jobs of a host after `threshold` failures in a row.
+
+    Once open, no job starts for `cooldown` seconds. Then a single trial
+    job may start, the breaker closes if it succeeds and opens again if
+    it fails. A threshold of 0 never opens. Not thread safe, guarded by
+    the `HostLimiter`.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened: Optional[float] = None
+        self.trial = False
+
+    def wait_time(self, now: float) -> Optional[float]:
+        """Like `HostLimiter._wait_time`."""
+        if self.opened is None:
+            return 0.0
+        if self.trial:
+            return None
+        return max(0.0, self.opened + self.cooldown - now)
+
+    def started(self):
+        if self.opened is not None:
+            self.trial = True
+
+    def ended(self, failed: bool, now: float) -> bool:
+        """Record the result of a job, returning whether it just opened."""
+        self.trial = False
+        if not failed:
+            self.failures = 0
+            self.opened = None
+            return False
+        self.failures += 1
+        if not self.threshold or (
+            self.opened is None and self.failures < self.threshold
+        ):
+            return False
+        closed = self.opened is None
+        self.opened = now
+        return closed
+
+
+class ConcurrencyTuner:
+    """
+    Finds the amount of parallel downloads that gets the most bytes per
+    second, AIMD style.
+
+    The throughput of every window of `interval` seconds is compared to
+    the one before. While all downloads are busy, the limit is raised by
+    one per window. If the raise didn't gain at least `gain`, it's taken
+    back. If throughput fell by more than `drop` without a raise, the
+    link is congested and the limit is multiplied by `decrease`. After
+    taking something back, the limit holds for `hold` windows before it
+    probes again. It always stays between `minimum` and `maximum`.
+
+    The defaults are on the careful side: one download more per window
+    takes a while to reach the optimum, so short batches finish faster
+    with a fixed limit that is known to suit the server.
+    """
+
+    def __init__(
+        self,
+        minimum: int,
+        maximum: int,
+        interval: float = 3.0,
+        gain: float = 0.05,
+        drop: float = 0.25,
+        decrease: float = 0.5,
+        hold: int = 3,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.interval = interval
+        self.gain = gain
+        self.drop = drop
+        self.decrease = decrease
+        self.hold = hold
+        self.limit = self.minimum
+        self.previous: Optional[float] = None
+        self.raised = False
+        self.holding = 0
+
+    @classmethod
+    def from_config(cls) -> "ConcurrencyTuner":
+        return cls(
+            config.CONFIG.get_int("adaptive_min_parallel"),
+            config.CONFIG.get_int("adaptive_max_parallel"),
+            config.CONFIG.get_float("adaptive_interval"),
+        )
+
+    def update(self, throughput: float, saturated: bool) -> int:
+        """
+        Feed the bytes per second of the last window and whether every
+        allowed download was busy, returning the new limit.
+        """
+        previous, self.previous = self.previous, throughput
+        raised, self.raised = self.raised, False
+        self.holding = max(0, self.holding - 1)
+        if previous is None:
+            pass
+        elif raised and throughput < previous * (1 + self.gain):
+            # The extra download didn't pay off
+            self.limit -= 1
+            self.holding = self.hold
+        elif not raised and saturated and (
+            throughput < previous * (1 - self.drop)
+        ):
+            self.limit = int(self.limit * self.decrease)
+            self.holding = self.hold
+        if saturated and not self.holding and self.limit < self.maximum:
+            self.limit += 1
+            self.raised = True
+        self.limit = min(self.maximum, max(self.minimum, self.limit))
+        return self.limit
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average and bursts of up to
+    `burst` requests. Not thread safe, guarded by the `HostLimiter`.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available, 0 if one is."""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate > 0:
+            self.tokens -= 1
+
+
+class HostLimiter:
+    """
+    Limits the jobs running at once and the jobs started per second, for
+    every host on its own.
+
+    Hosts use the `default` limit unless `overrides` has one for them.
+    Every host also gets a `CircuitBreaker`, so a host that keeps failing
+    is left alone for a while instead of burning the attempts of all of
+    its jobs. Share a limiter between managers whose jobs should respect
+    the limits together, like the batches of a daemon.
+    """
+
+    def __init__(
+        self,
+        default: HostLimit = HostLimit(),
+        overrides: Optional[dict[str, HostLimit]] = None,
+        breaker_threshold: int = 0,
+        breaker_cooldown: float = 60.0,
+    ):
+        self.default = default
+        self.overrides = {
+            host_key(f"//{host}"): limit
+            for host, limit in (overrides or {}).items()
+        }
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        # Notified whenever a host might have become free
+        self.cond = threading.Condition()
+        self.running: dict[str, int] = {}
+        self.buckets: dict[str, TokenBucket] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_config(cls) -> "HostLimiter":
+        default = HostLimit(
+            config.CONFIG.get_int("host_max_parallel"),
+            config.CONFIG.get_float("host_rate"),
+            config.CONFIG.get_float("host_burst"),
+        )
+        overrides = {}
+        for host, values in config.get_config_value("host_limits").items():
+            overrides[host] = HostLimit(*(
+                type(value)(values.get(field, value))
+                for field, value in zip(HostLimit._fields, default)
+            ))
+        return cls(
+            default,
+            overrides,
+            config.CONFIG.get_int("breaker_threshold"),
+            config.CONFIG.get_float("breaker_cooldown"),
+        )
+
+    def limit(self, host: str) -> HostLimit:
+        return self.overrides.get(host, self.default)
+
+    def _wait_time(self, host: str, now: float) -> Optional[float]:
+        """
+        Seconds until a job of `host` may start, 0 if it may right away
+        and None if it has to wait for a running one to end.
+        """
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_cooldown
+            )
+        wait_time = breaker.wait_time(now)
+        if wait_time != 0:
+            return wait_time
+        limit = self.limit(host)
+        if limit.max_parallel and (
+            self.running.get(host, 0) >= limit.max_parallel
+        ):
+            return None
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(limit.rate, limit.burst)
+        return bucket.wait_time(now)
+
+    def _acquire(self, host: str):
+        self.running[host] = self.running.get(host, 0) + 1
+        self.buckets[host].take()
+        self.breakers[host].started()
+
+    def release(self, host: str, failed: bool = False) -> bool:
+        """
+        End a job of `host`, `failed` if the host is to blame. Returns
+        whether that opened the host's circuit breaker.
+        """
+        with self.cond:
+            self.running[host] -= 1
+            if not self.running[host]:
+                del self.running[host]
+            opened = self.breakers[host].ended(failed, time.monotonic())
+            self.cond.notify_all()
+        return opened
+
+
+class HostQueue:
+    """
+    Queue of the jobs of a batch that hands them out host by host.
+
+    Jobs wait while their host is at its `HostLimiter` limits, without
+    holding up the jobs of other hosts. The hosts take turns, so a host
+    with many jobs doesn't starve the others. Jobs taken by `get` have to
+    be handed back to `done` once they ended. Jobs put with a `delay`,
+    like retries, count as queued but only get in line once it passed.
+    """
+
+    def __init__(self, limiter: Optional[HostLimiter] = None):
+        self.limiter = limiter or HostLimiter()
+        self.cond = self.limiter.cond
+        # host -> jobs, hosts in the order of their turns
+        self.hosts: dict[str, deque["Job"]] = {}
+        # Heap of (time, counter, job) of jobs put with a delay
+        self.delayed: list[tuple[float, int, "Job"]] = []
+        self.counter = itertools.count()
+        self.size = 0
+
+    def put(self, job: "Job", delay: float = 0.0):
+        with self.cond:
+            if delay > 0:
+                heapq.heappush(self.delayed, (
+                    time.monotonic() + delay, next(self.counter), job
+                ))
+            else:
+                self._append(job)
+            self.size += 1
+            self.cond.notify_all()
+
+    def _append(self, job: "Job"):
+        self.hosts.setdefault(host_key(job.url), deque()).append(job)
+
+    def empty(self) -> bool:
+        with self.cond:
+            return not self.size
+
+    def get(
+        self, wait: bool = False, timeout: Optional[float] = None
+    ) -> Optional["Job"]:
+        """
+        Take the next job whose host is free, waiting for one if needed.
+
+        Returns None once no job is left. With `wait` it also waits for
+        jobs to be added, returning None after `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                while self.delayed and self.delayed[0][0] <= now:
+                    self._append(heapq.heappop(self.delayed)[2])
+                delay = self.delayed[0][0] - now if self.delayed else None
+                for host, jobs in self.hosts.items():
+                    wait_time = self.limiter._wait_time(host, now)
+                    if wait_time == 0:
+                        job = jobs.popleft()
+                        self.size -= 1
+                        # Back in line behind the other hosts
+                        del self.hosts[host]
+                        if jobs:
+                            self.hosts[host] = jobs
+                        self.limiter._acquire(host)
+                        return job
+                    if wait_time is not None:
+                        delay = wait_time if delay is None else min(
+                            delay, wait_time
+                        )
+                if not self.size and not wait:
+                    return None
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    delay = remaining if delay is None else min(
+                        delay, remaining
+                    )
+                self.cond.wait(delay)
+
+    def done(self, job: "Job", failed: bool = False) -> bool:
+        """See `HostLimiter.release`."""
+        return self.limiter.release(host_key(job.url), failed)
+
+    def clear(self):
+        """Drop all queued jobs, waking up everyone waiting for one."""
+        with self.cond:
+            self.hosts.clear()
+            self.delayed.clear()
+            self.size = 0
+            self.cond.notify_all()
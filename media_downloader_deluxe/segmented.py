@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from yt_dlp.downloader import PROTOCOL_MAP  # type: ignore
+from yt_dlp.downloader.http import HttpFD  # type: ignore
+from yt_dlp.networking import Request  # type: ignore
+from yt_dlp.networking.exceptions import (HTTPError,  # type: ignore
+                                          RequestError, TransportError)
+from yt_dlp.utils import parse_http_range  # type: ignore
+from yt_dlp.utils.networking import HTTPHeaderDict  # type: ignore
+
+# Files smaller than this aren't worth extra connections
+MIN_SIZE = 8 * 1024 * 1024
+BLOCK_SIZE = 64 * 1024
+# Seconds between progress reports and saves of the segment state
+REPORT_INTERVAL = 0.5
+
+
+class SegmentedHttpFD(HttpFD):
+    """
+    Downloads plain HTTP formats over `http_segments` connections at once.
+
+    The file is preallocated and split into as many ranges, each one is
+    fetched by a thread of its own with range requests and written in
+    place. How far every segment got is kept next to the .part file, so
+    interrupted downloads resume every segment where it stopped. Servers
+    without range support, small files and everything `HttpFD` handles
+    specially (rate limits, request data, test downloads) fall back to
+    the single connection download.
+    """
+
+    def real_download(self, filename, info_dict):
+        segments = self.params.get("http_segments") or 1
+        tmpfilename = self.temp_name(filename)
+        state_path = Path(f"{tmpfilename}.segments")
+        headers = HTTPHeaderDict(
+            {"Accept-Encoding": "identity"}, info_dict.get("http_headers")
+        )
+        size = None
+        if (
+            segments > 1
+            and tmpfilename != filename
+            and not self.params.get("test")
+            and not self.params.get("ratelimit")
+            and not info_dict.get("request_data")
+            and not info_dict.get("impersonate")
+            and "Range" not in headers
+        ):
+            size = self._probe(info_dict["url"], headers)
+        min_size = self.params.get("http_segment_min_size", MIN_SIZE)
+        if size is None or size < min_size:
+            if state_path.exists():
+                # HttpFD would take the preallocated file as progress
+                self.try_remove(tmpfilename)
+                state_path.unlink()
+            return super().real_download(filename, info_dict)
+
+        self.report_destination(filename)
+        ranges = self._load_state(state_path, tmpfilename, size)
+        if ranges is None:
+            step = -(-size // segments)
+            ranges = [
+                [start, min(size, start + step) - 1, 0]
+                for start in range(0, size, step)
+            ]
+            with open(tmpfilename, "wb") as fp:
+                fp.truncate(size)
+        else:
+            done = sum(part[2] for part in ranges)
+            self.report_resuming_byte(done)
+
+        stop = threading.Event()
+        errors: list[Exception] = []
+        threads = [
+            threading.Thread(
+                target=self._fetch_segment,
+                args=(
+                    info_dict, headers, tmpfilename, part, stop, errors
+                ),
+                daemon=True,
+            )
+            for part in ranges
+            if part[2] < part[1] - part[0] + 1
+        ]
+        for thread in threads:
+            thread.start()
+        start = time.time()
+        resumed = sum(part[2] for part in ranges)
+        try:
+            while any(thread.is_alive() for thread in threads):
+                stop.wait(REPORT_INTERVAL)
+                downloaded = sum(part[2] for part in ranges)
+                self._save_state(state_path, size, ranges)
+                speed = self.calc_speed(
+                    start, time.time(), downloaded - resumed
+                )
+                self._hook_progress({
+                    "status": "downloading",
+                    "downloaded_bytes": downloaded,
+                    "total_bytes": size,
+                    "filename": filename,
+                    "tmpfilename": tmpfilename,
+                    "eta": self.calc_eta(speed, size - downloaded),
+                    "speed": speed,
+                    "elapsed": time.time() - start,
+                }, info_dict)
+        finally:
+            # Killed jobs and failed segments end the other ones too
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self._save_state(state_path, size, ranges)
+        if errors:
+            raise errors[0]
+
+        state_path.unlink()
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "status": "finished",
+            "downloaded_bytes": size,
+            "total_bytes": size,
+            "filename": filename,
+            "elapsed": time.time() - start,
+        }, info_dict)
+        return True
+
+    def _probe(self, url: str, headers: HTTPHeaderDict) -> Optional[int]:
+        """Return the size of the file if the server serves ranges."""
+        request = Request(url, headers={**headers, "Range": "bytes=0-0"})
+        try:
+            with self.ydl.urlopen(request) as response:
+                if response.status != 206:
+                    return None
+                return parse_http_range(
+                    response.headers.get("Content-Range")
+                )[2]
+        except RequestError:
+            # Left to HttpFD, which reports it properly
+            return None
+
+    def _load_state(
+        self, path: Path, tmpfilename: str, size: int
+    ) -> Optional[list[list[int]]]:
+        if not self.params.get("continuedl", True):
+            return None
+        try:
+            with open(path, encoding="utf-8") as fp:
+                state = json.load(fp)
+            if (
+                state["size"] != size
+                or os.path.getsize(tmpfilename) != size
+            ):
+                return None
+            return state["segments"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def _save_state(path: Path, size: int, ranges: list[list[int]]):
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump({"size": size, "segments": ranges}, fp)
+        tmp.replace(path)
+
+    def _fetch_segment(
+        self,
+        info_dict: dict,
+        headers: HTTPHeaderDict,
+        tmpfilename: str,
+        part: list[int],
+        stop: threading.Event,
+        errors: list[Exception],
+    ):
+        """Download the rest of a [start, end, done] segment in place."""
+        retries = self.params.get("retries", 10)
+        # Sites like YouTube throttle requests above this size
+        chunk_size = (
+            self.params.get("http_chunk_size")
+            or info_dict.get("downloader_options", {}).get("http_chunk_size")
+        )
+        count = 0
+        # Unbuffered, the saved progress must be on disk already
+        with open(tmpfilename, "r+b", buffering=0) as fp:
+            while not stop.is_set() and part[0] + part[2] <= part[1]:
+                begin = part[0] + part[2]
+                end = part[1]
+                if chunk_size:
+                    end = min(end, begin + chunk_size - 1)
+                request = Request(
+                    info_dict["url"],
+                    headers={**headers, "Range": f"bytes={begin}-{end}"},
+                )
+                try:
+                    with self.ydl.urlopen(request) as response:
+                        if response.status != 206:
+                            raise TransportError(
+                                "Server stopped serving ranges"
+                            )
+                        fp.seek(begin)
+                        while not stop.is_set() and begin <= end:
+                            block = response.read(
+                                min(BLOCK_SIZE, end - begin + 1)
+                            )
+                            if not block:
+                                raise TransportError(
+                                    f"Segment ended at byte {begin}"
+                                )
+                            fp.write(block)
+                            begin += len(block)
+                            part[2] += len(block)
+                    count = 0
+                except (TransportError, HTTPError) as e:
+                    retryable = not isinstance(e, HTTPError) or (
+                        e.status == 429 or e.status >= 500
+                    )
+                    count += 1
+                    if not retryable or count > retries:
+                        errors.append(e)
+                        stop.set()
+                        return
+                    self.report_retry(e, count, retries)
+                    stop.wait(min(count, 5))
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+                    return
+
+
+def install():
+    """Let yt-dlp download plain HTTP formats with `SegmentedHttpFD`."""
+    for protocol in ("http", "https"):
+        PROTOCOL_MAP[protocol] = SegmentedHttpFD
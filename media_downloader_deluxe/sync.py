@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from cache import normalize_url
+
+
+class SyncIndex:
+    """
+    SQLite index of the entries of synced playlists and channels.
+
+    Every source URL records the ids of the entries that were downloaded
+    from it and when it was synced last. Playlists list their newest
+    entries first, so reading one can stop once it reaches entries that
+    are known already and only the new ones get downloaded.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sources (
+                    url TEXT PRIMARY KEY,
+                    synced REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    source TEXT NOT NULL,
+                    entry_id TEXT NOT NULL,
+                    added REAL NOT NULL,
+                    PRIMARY KEY (source, entry_id)
+                )
+                """
+            )
+
+    def known(self, source: str) -> set[str]:
+        """Return the ids of all entries downloaded from a source."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT entry_id FROM entries WHERE source = ?",
+                (normalize_url(source),),
+            ).fetchall()
+        return {entry_id for entry_id, in rows}
+
+    def last_synced(self, source: str) -> Optional[float]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT synced FROM sources WHERE url = ?",
+                (normalize_url(source),),
+            ).fetchone()
+        return row[0] if row else None
+
+    def add(self, source: str, entry_ids: Iterable[str]):
+        now = time.time()
+        source = normalize_url(source)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO entries VALUES (?, ?, ?)",
+                [(source, entry_id, now) for entry_id in entry_ids],
+            )
+
+    def mark_synced(self, source: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?)",
+                (normalize_url(source), time.time()),
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,161 @@
+import concurrent.futures
+import hashlib
+import http.client
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Optional
+
+import config
+import ytdlp
+from httppool import POOL
+from model import LOGGER
+
+RELEASES_URL = "https://github.com/yt-dlp/yt-dlp-nightly-builds/releases"
+BINARY_NAME = "yt-dlp"
+CHECKSUMS_NAME = "SHA2-256SUMS"
+
+
+class UpdateError(Exception):
+    """A downloaded yt-dlp didn't pass verification."""
+
+
+class UpdateService:
+    """
+    Checks for and installs yt-dlp updates, meant to run in the background.
+
+    The latest version is cached in the config for `ytdlp_update_check_ttl`
+    seconds. Updates are downloaded next to the installed zip, checked
+    against the release's checksums and version, and only then replace the
+    installed zip with an atomic rename. The old one keeps working if any
+    of that fails.
+    """
+
+    def __init__(
+        self,
+        releases_url: str = RELEASES_URL,
+        path: Path = config.YT_DLP_PATH,
+        timeout: float = 10,
+    ):
+        self.releases_url = releases_url.rstrip("/")
+        self.path = Path(path)
+        self.timeout = timeout
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="updater"
+        )
+
+    def submit(
+        self, func: Callable, *args, **kwargs
+    ) -> concurrent.futures.Future:
+        return self.executor.submit(func, *args, **kwargs)
+
+    def _fetch_latest_version(self) -> str:
+        try:
+            with POOL.urlopen(
+                f"{self.releases_url}/latest", timeout=self.timeout
+            ) as response:
+                # Above url redirects to url containing the version
+                return response.url.split("/")[-1]
+        except OSError:
+            raise ConnectionError("Could not fetch latest yt-dlp version")
+
+    def latest_version(self, force: bool = False) -> str:
+        cached = config.CONFIG.get("ytdlp_latest_version")
+        age = time.time() - config.CONFIG.get_float("ytdlp_latest_checked")
+        if (
+            not force
+            and cached
+            and 0 <= age < config.CONFIG.get_int("ytdlp_update_check_ttl")
+        ):
+            return cached
+        latest = self._fetch_latest_version()
+        config.set_config_value("ytdlp_latest_version", latest)
+        config.set_config_value("ytdlp_latest_checked", time.time())
+        return latest
+
+    def update_available(self, force: bool = False) -> Optional[str]:
+        """Return the latest version if it's not the installed one."""
+        latest = self.latest_version(force)
+        try:
+            installed = ytdlp.installed_version(self.path)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return latest
+        return None if latest == installed else latest
+
+    def _checksum(self, version: str) -> str:
+        try:
+            with POOL.urlopen(
+                f"{self.releases_url}/download/{version}/{CHECKSUMS_NAME}",
+                timeout=self.timeout,
+            ) as response:
+                lines = response.read().decode("utf-8").splitlines()
+        except (OSError, http.client.HTTPException):
+            raise ConnectionError(f"Could not fetch checksums of {version}")
+        for line in lines:
+            checksum, _, name = line.strip().partition(" ")
+            if name.strip().lstrip("*") == BINARY_NAME:
+                return checksum.lower()
+        raise UpdateError(f"No checksum of {BINARY_NAME} in {version}")
+
+    def download(self, version: str) -> Path:
+        """Download and verify a version, returning the temporary file."""
+        expected = self._checksum(version)
+        tmp = self.path.with_name(
+            f"{self.path.name}.{os.getpid()}.download"
+        )
+        digest = hashlib.sha256()
+        try:
+            try:
+                with POOL.urlopen(
+                    f"{self.releases_url}/download/{version}/{BINARY_NAME}",
+                    timeout=self.timeout,
+                ) as response, open(tmp, "wb") as fp:
+                    while chunk := response.read(256 * 1024):
+                        digest.update(chunk)
+                        fp.write(chunk)
+            except (OSError, http.client.HTTPException):
+                # Like a connection closed before the end of the file
+                raise ConnectionError(
+                    "Could not install latest yt-dlp zipimport binary"
+                )
+            if digest.hexdigest() != expected:
+                raise UpdateError(f"Checksum mismatch of yt-dlp {version}")
+            try:
+                with zipfile.ZipFile(tmp) as zf:
+                    if zf.testzip() is not None:
+                        raise UpdateError(f"Corrupt yt-dlp {version}")
+                found = ytdlp.installed_version(tmp)
+            except (zipfile.BadZipFile, KeyError, ValueError):
+                raise UpdateError(f"Invalid yt-dlp {version}")
+            if found != version:
+                raise UpdateError(
+                    f"Downloaded yt-dlp is {found} instead of {version}"
+                )
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return tmp
+
+    def install(self, file: Path):
+        os.replace(file, self.path)
+
+    def update(self, version: Optional[str] = None) -> str:
+        """Install a version, the latest by default, and return it."""
+        version = version or self.latest_version(force=True)
+        file = self.download(version)
+        try:
+            self.install(file)
+        except OSError as e:
+            # The installed zip is only ever replaced as a whole
+            file.unlink(missing_ok=True)
+            raise UpdateError(f"Could not install yt-dlp {version}: {e}")
+        try:
+            # Keeps the extraction out of `ytdlp.reload()`
+            ytdlp.extract(self.path)
+        except OSError as e:
+            LOGGER.warning(f"Failed to extract yt-dlp {version}: {e}")
+        return version
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
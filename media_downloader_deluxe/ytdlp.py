@@ -0,0 +1,154 @@
+import compileall
+import importlib
+import re
+import shutil
+import sys
+import threading
+import time
+import zipfile
+import zipimport
+from pathlib import Path
+from typing import Optional
+
+import config
+
+BUNDLED_PATH = Path(__file__).parent / "lib" / "yt-dlp"
+VERSION_PATTERN = re.compile(r"""__version__\s*=\s*['"]([^'"]+)['"]""")
+
+
+def ensure_installed():
+    """Install the bundled yt-dlp zip on first start."""
+    if not config.YT_DLP_PATH.exists():
+        shutil.copyfile(BUNDLED_PATH, config.YT_DLP_PATH)
+
+
+def installed_version(path: Path = config.YT_DLP_PATH) -> str:
+    """Read the version of a yt-dlp zip without importing it."""
+    with zipfile.ZipFile(path) as zf:
+        source = zf.read("yt_dlp/version.py").decode("utf-8")
+    match = VERSION_PATTERN.search(source)
+    if not match:
+        raise ValueError(f"No yt-dlp version found in {path}")
+    return match.group(1)
+
+
+def extract(path: Path = config.YT_DLP_PATH) -> Path:
+    """
+    Return a directory with the extracted content of a yt-dlp zip.
+
+    Every version is extracted and byte-compiled once, later imports load
+    the cached bytecode instead of decompressing and compiling every module
+    through zipimport. The directory is built under a temporary name and
+    renamed when it's complete, so an interrupted extraction is never used.
+    Directories of other versions are removed.
+    """
+    version = installed_version(path)
+    target = config.YT_DLP_EXTRACT_DIR / version
+    if not target.exists():
+        tmp = config.YT_DLP_EXTRACT_DIR / f".{version}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        with zipfile.ZipFile(path) as zf:
+            zf.extractall(tmp)
+        # No worker processes, they would start the frozen app again
+        compileall.compile_dir(tmp, ddir=str(target), quiet=2)
+        try:
+            tmp.rename(target)
+        except OSError:
+            # Another process finished first
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not target.exists():
+                raise
+    for other in config.YT_DLP_EXTRACT_DIR.iterdir():
+        if (
+            other != target
+            and not other.name.startswith(".")
+            and str(other) not in sys.path
+        ):
+            # Might still be in use by a running instance on Windows
+            shutil.rmtree(other, ignore_errors=True)
+    return target
+
+
+def _deactivate():
+    sys.path[:] = [
+        entry for entry in sys.path
+        if entry != str(config.YT_DLP_PATH)
+        and Path(entry).parent != config.YT_DLP_EXTRACT_DIR
+    ]
+
+
+def activate(directory: Path):
+    """Import yt-dlp from `directory` instead of the zip."""
+    _deactivate()
+    sys.path.insert(0, str(directory))
+    importlib.invalidate_caches()
+
+
+def load():
+    """Make yt-dlp importable and import it."""
+    ensure_installed()
+    try:
+        activate(extract())
+    except (OSError, ValueError, zipfile.BadZipFile):
+        # Importing from the zip is slower, but works
+        _deactivate()
+        sys.path.insert(0, str(config.YT_DLP_PATH))
+        zipimport._zip_directory_cache.clear()
+        importlib.invalidate_caches()
+    import yt_dlp  # type: ignore  # noqa: F401
+    import yt_dlp.version  # type: ignore  # noqa: F401
+
+
+def reload():
+    """
+    Import the installed yt-dlp again, e.g. after an update.
+
+    Must only run while no download is going on. Instances of the old
+    version keep working, but new ones should be created afterwards.
+    """
+    for name in list(sys.modules):
+        # These build on classes of the old version
+        if (
+            name in ("yt_dlp", "segmented", "pooledrh")
+            or name.startswith("yt_dlp.")
+        ):
+            del sys.modules[name]
+    load()
+
+
+class Loader:
+    """
+    Runs `load()` once, in a background thread or right away.
+
+    `ready` gets set once loading finished, successful or not. A failure
+    is kept in `error`.
+    """
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error: Optional[Exception] = None
+        self.thread: Optional[threading.Thread] = None
+        # Seconds `load()` took
+        self.duration: Optional[float] = None
+
+    def start(self, background: bool = True):
+        if background:
+            self.thread = threading.Thread(
+                target=self._run, name="ytdlp-loader", daemon=True
+            )
+            self.thread.start()
+        else:
+            self._run()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            load()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.duration = time.perf_counter() - start
+            self.ready.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.ready.wait(timeout)
@@ -0,0 +1,158 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_DIR = Path(__file__).parent.parent / "media_downloader_deluxe"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import config  # noqa: E402
+import model  # noqa: E402
+
+
+@pytest.fixture
+def app_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A temporary app directory, the real one is not touched."""
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config, "YT_DLP_PATH", tmp_path / "yt-dlp")
+    monkeypatch.setattr(
+        config, "YT_DLP_EXTRACT_DIR", tmp_path / "yt-dlp-extracted"
+    )
+    monkeypatch.setattr(config, "DAEMON_INFO_PATH", tmp_path / "daemon.json")
+    monkeypatch.setattr(
+        config,
+        "CONFIG",
+        config.Config(tmp_path / ".config", config._default_config),
+    )
+    monkeypatch.setattr(model.LOGGER, "path", tmp_path / "latest.log")
+    return tmp_path
+
+
+STAND_IN = '''
+import os
+import threading
+import time
+
+running = 0
+peak = 0
+lock = threading.Lock()
+
+
+class YoutubeDL:
+    def __init__(self, params=None):
+        self.params = params or {}
+        self._download_retcode = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def extract_info(self, url, download=True, process=True, ie_key=None):
+        name = url.rstrip("/").rsplit("/", 1)[-1]
+        info = {"id": name, "title": name, "ext": "mp4",
+                "extractor_key": "StandIn", "webpage_url": url}
+        return self.process_ie_result(info, download) if process else info
+
+    def process_ie_result(self, info, download=True):
+        global running, peak
+        if info["id"].startswith("fail"):
+            from yt_dlp.utils import DownloadError
+            raise DownloadError(f"Stand-in failure of {info['id']}")
+        filename = self.params["outtmpl"] % info
+        if info["id"].startswith("abort") or (
+            info["id"].startswith("crash")
+            and not os.path.exists(filename + ".crashed")
+        ):
+            open(filename + ".crashed", "w").close()
+            os._exit(1)
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        try:
+            for done in range(1, 5):
+                time.sleep(DELAY / 4)
+                for hook in self.params["progress_hooks"]:
+                    hook({"status": "downloading", "filename": filename,
+                          "downloaded_bytes": done * 256,
+                          "total_bytes": 1024, "speed": 1024 / DELAY})
+            with open(filename, "wb") as fp:
+                fp.write(bytes(1024))
+            for hook in self.params["progress_hooks"]:
+                hook({"status": "finished", "filename": filename,
+                      "total_bytes": 1024, "info_dict": info})
+        finally:
+            with lock:
+                running -= 1
+        return {**info, "requested_downloads": [{"filepath": filename}]}
+
+    def download(self, urls):
+        for url in urls:
+            self.extract_info(url)
+        return 0
+
+    def sanitize_info(self, info):
+        return info
+
+
+DELAY = 0.2
+'''
+
+# What the app imports from yt-dlp besides YoutubeDL, see segmented.py
+# and pooledrh.py
+STAND_IN_MODULES = {
+    "utils/__init__.py": (
+        "class YoutubeDLError(Exception):\n    pass\n\n\n"
+        "class DownloadError(YoutubeDLError):\n    pass\n\n\n"
+        "def parse_http_range(range):\n    return None, None, None\n"
+    ),
+    "utils/networking.py": "class HTTPHeaderDict(dict):\n    pass\n",
+    "downloader/__init__.py": "PROTOCOL_MAP = {}\n",
+    "downloader/http.py": "class HttpFD:\n    pass\n",
+    "networking/__init__.py": "class Request:\n    pass\n",
+    "networking/common.py": (
+        "class RequestHandler:\n    pass\n\n\n"
+        "class Response:\n    pass\n\n\n"
+        "def register_rh(handler):\n    return handler\n\n\n"
+        "def register_preference(*handlers):\n"
+        "    return lambda preference: preference\n"
+    ),
+    "networking/exceptions.py": (
+        "class RequestError(Exception):\n    pass\n\n\n"
+        "class TransportError(RequestError):\n    pass\n\n\n"
+        "class HTTPError(RequestError):\n    pass\n"
+    ),
+}
+
+
+def unload_yt_dlp():
+    for name in list(sys.modules):
+        if name.split(".")[0] in (
+            "yt_dlp", "segmented", "pooledrh", "procpool"
+        ):
+            del sys.modules[name]
+
+
+@pytest.fixture(scope="module")
+def yt_dlp(tmp_path_factory: pytest.TempPathFactory):
+    """
+    A stand-in `yt_dlp` package that "downloads" by writing a small file
+    after a short delay, counting the downloads running at once. IDs
+    starting with "fail" raise a DownloadError, "abort" ends the process
+    and "crash" ends it on the first attempt only.
+    """
+    directory = tmp_path_factory.mktemp("stand-in")
+    package = directory / "yt_dlp"
+    package.mkdir()
+    (package / "__init__.py").write_text(STAND_IN)
+    for name, source in STAND_IN_MODULES.items():
+        (package / name).parent.mkdir(exist_ok=True)
+        (package / name).write_text(source)
+    unload_yt_dlp()
+    sys.path.insert(0, str(directory))
+    import yt_dlp  # type: ignore
+
+    yield yt_dlp
+    sys.path.remove(str(directory))
+    unload_yt_dlp()
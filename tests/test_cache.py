@@ -0,0 +1,135 @@
+import json
+import multiprocessing
+import time
+from pathlib import Path
+
+from cache import InfoCache, normalize_url
+
+
+def open_cache(directory: Path, **kwargs) -> InfoCache:
+    return InfoCache(
+        directory,
+        kwargs.pop("ttl", 60),
+        kwargs.pop("max_entries", 100),
+        kwargs.pop("version", "1"),
+        **kwargs,
+    )
+
+
+def fill(directory: str, prefix: str, count: int):
+    """Entry point of the processes in `test_processes_share_the_index`."""
+    cache = open_cache(Path(directory), max_entries=1000, delay=0.01)
+    for i in range(count):
+        cache.put(f"https://x.com/{prefix}{i}", {"id": f"{prefix}{i}"})
+        time.sleep(0.002)
+    cache.flush()
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://X.com/a/?b=2&a=1#t") == (
+        "https://x.com/a?a=1&b=2"
+    )
+
+
+def test_put_and_get(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("https://x.com/a", {"id": "a"})
+    assert cache.get("https://X.com/a/") == {"id": "a"}
+    assert cache.get("https://x.com/b") is None
+
+
+def test_index_is_written_after_the_last_change(tmp_path):
+    cache = open_cache(tmp_path, delay=0.2)
+    cache.put("https://x.com/a", {"id": "a"})
+    assert open_cache(tmp_path).get("https://x.com/a") is None
+    time.sleep(0.5)
+    assert open_cache(tmp_path).get("https://x.com/a") == {"id": "a"}
+
+
+def test_order_of_use_is_saved(tmp_path):
+    cache = open_cache(tmp_path, max_entries=2)
+    cache.put("https://x.com/a", {"id": "a"})
+    cache.put("https://x.com/b", {"id": "b"})
+    cache.get("https://x.com/a")
+    cache.flush()
+
+    cache = open_cache(tmp_path, max_entries=2)
+    cache.put("https://x.com/c", {"id": "c"})
+    # b was used least recently
+    assert cache.get("https://x.com/b") is None
+    assert cache.get("https://x.com/a") == {"id": "a"}
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = open_cache(tmp_path, ttl=0.1)
+    cache.put("https://x.com/a", {"id": "a"})
+    time.sleep(0.2)
+    assert cache.get("https://x.com/a") is None
+    cache.flush()
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_other_version_clears(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("https://x.com/a", {"id": "a"})
+    cache.flush()
+    cache = open_cache(tmp_path, version="2")
+    assert cache.get("https://x.com/a") is None
+    assert list(tmp_path.glob("*.json")) == [tmp_path / "index.json"]
+
+
+def test_old_version_does_not_overwrite_new_one(tmp_path):
+    old = open_cache(tmp_path)
+    old.put("https://x.com/a", {"id": "a"})
+    old.flush()
+    new = open_cache(tmp_path, version="2")
+    new.put("https://x.com/b", {"id": "b"})
+    new.flush()
+    old.put("https://x.com/c", {"id": "c"})
+    old.flush()
+    with open(tmp_path / "index.json", encoding="utf-8") as fp:
+        assert json.load(fp)["version"] == "2"
+    cache = open_cache(tmp_path, version="2")
+    assert cache.get("https://x.com/b") == {"id": "b"}
+    assert cache.get("https://x.com/a") is None
+
+
+def test_damaged_index_keeps_entries(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("https://x.com/a", {"id": "a"})
+    cache.flush()
+    (tmp_path / "index.json").write_text('{"version": "1", "entr')
+    assert open_cache(tmp_path).get("https://x.com/a") == {"id": "a"}
+
+
+def test_instances_merge_their_entries(tmp_path):
+    first = open_cache(tmp_path)
+    second = open_cache(tmp_path)
+    first.put("https://x.com/a", {"id": "a"})
+    second.put("https://x.com/b", {"id": "b"})
+    first.flush()
+    second.flush()
+    cache = open_cache(tmp_path)
+    assert cache.get("https://x.com/a") == {"id": "a"}
+    assert cache.get("https://x.com/b") == {"id": "b"}
+
+
+def test_processes_share_the_index(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=fill, args=(str(tmp_path), prefix, 30))
+        for prefix in "abcd"
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    with open(tmp_path / "index.json", encoding="utf-8") as fp:
+        assert len(json.load(fp)["entries"]) == 120
+    assert not list(tmp_path.glob("*.tmp"))
+    cache = open_cache(tmp_path, max_entries=1000)
+    for prefix in "abcd":
+        for i in range(30):
+            url = f"https://x.com/{prefix}{i}"
+            assert cache.get(url) == {"id": f"{prefix}{i}"}
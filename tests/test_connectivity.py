@@ -0,0 +1,64 @@
+import http.server
+import threading
+
+import pytest
+
+from connectivity import ConnectivityMonitor
+from httppool import POOL
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.send_response(200)
+        # Of the body a GET would get
+        self.send_header("Content-Length", "5")
+        self.end_headers()
+
+    def do_GET(self):
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_probes_reuse_the_connection(url):
+    monitor = ConnectivityMonitor([url])
+    before = POOL.stats()
+    for _ in range(3):
+        assert monitor.probe()
+    after = POOL.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+    monitor.stop()
+
+
+def test_empty_response_frees_the_connection(url):
+    before = POOL.stats()
+    with POOL.urlopen(url) as response:
+        assert response.status == 204
+    with POOL.urlopen(url) as response:
+        assert response.read() == b""
+    assert POOL.stats()["hits"] - before["hits"] == 1
+
+
+def test_unreachable_endpoint_is_offline():
+    monitor = ConnectivityMonitor(["http://127.0.0.1:9/"], timeout=1)
+    states = []
+    monitor.subscribe(states.append)
+    assert not monitor.probe()
+    assert not monitor.check()
+    assert states == [False]
+    monitor.stop()
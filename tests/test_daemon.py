@@ -0,0 +1,197 @@
+import functools
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import config
+import daemon
+import ytdlp
+from archive import DownloadArchive
+from client import DaemonClient, DaemonError
+from scheduler import RetryPolicy
+
+MAX_PARALLEL = 3
+PER_BATCH = 6
+
+
+@pytest.fixture
+def service(yt_dlp, app_dir: Path, monkeypatch: pytest.MonkeyPatch):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("yt_dlp/version.py", "__version__ = 'stand-in'\n")
+    (app_dir / "yt-dlp").write_bytes(buffer.getvalue())
+    monkeypatch.setattr(
+        ytdlp,
+        "installed_version",
+        functools.partial(ytdlp.installed_version, app_dir / "yt-dlp"),
+    )
+    yt_dlp.peak = 0
+    service = daemon.DownloadService(
+        MAX_PARALLEL,
+        archive=DownloadArchive(app_dir / "archive.sqlite3"),
+        progress_interval=0.1,
+        retry=RetryPolicy(max_attempts=2, base_delay=0.1),
+    )
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture
+def client(service, app_dir: Path):
+    server = daemon.DaemonServer(0, service, "secret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    daemon.write_info(server.server_port, "secret", config.DAEMON_INFO_PATH)
+    client = DaemonClient.from_info_file(config.DAEMON_INFO_PATH)
+    assert client is not None
+    yield client
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def output(app_dir: Path) -> Path:
+    output = app_dir / "downloads"
+    output.mkdir()
+    return output
+
+
+def wait(client: DaemonClient, batch_id: int, timeout: float = 20) -> dict:
+    deadline = time.monotonic() + timeout
+    while (status := client.status(batch_id))["state"] == "running":
+        assert time.monotonic() < deadline, f"batch {batch_id} hangs"
+        time.sleep(0.05)
+    return status
+
+
+def test_health(client):
+    health = client.health()
+    assert health["ytdlp"] == "stand-in"
+    assert "hits" in health["connections"]
+
+
+def test_info_file_without_daemon(app_dir):
+    daemon.write_info(9, "secret", config.DAEMON_INFO_PATH)
+    assert DaemonClient.from_info_file(config.DAEMON_INFO_PATH) is None
+
+
+@pytest.mark.parametrize("token", [None, "wrong"])
+def test_request_without_token_is_rejected(client, token):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    request = urllib.request.Request(f"{client.url}/jobs", headers=headers)
+    with pytest.raises(urllib.error.HTTPError) as info:
+        urllib.request.urlopen(request)
+    assert info.value.code == 401
+
+
+@pytest.mark.parametrize("urls, kwargs, message", [
+    (["not an url"], {}, "Invalid URLs"),
+    ([], {}, "No URLs"),
+    (["https://example.com/a"], {"type_": "podcast"}, "Invalid type"),
+    (
+        ["https://example.com/a"],
+        {"type_": "music", "quality": "good"},
+        "Invalid quality",
+    ),
+])
+def test_invalid_batch_is_rejected(client, output, urls, kwargs, message):
+    with pytest.raises(DaemonError, match=message):
+        client.submit(urls, path=output, **kwargs)
+    assert client.list() == []
+
+
+def test_unwritable_path_is_rejected(client, app_dir):
+    with pytest.raises(DaemonError, match="writable"):
+        client.submit(["https://example.com/a"], path=app_dir / "missing")
+
+
+def test_unknown_batch(client):
+    with pytest.raises(DaemonError, match="No batch 42"):
+        client.status(42)
+
+
+def test_invalid_event_filter_is_rejected(client):
+    request = urllib.request.Request(
+        f"{client.url}/events?batch=abc",
+        headers={"Authorization": f"Bearer {client.token}"},
+    )
+    with pytest.raises(urllib.error.HTTPError) as info:
+        urllib.request.urlopen(request, timeout=5)
+    assert info.value.code == 400
+    assert json.load(info.value) == {"error": "Invalid batch: abc"}
+
+
+def test_clients_share_the_slots(client, output, yt_dlp):
+    clients = [client, DaemonClient(client.url, client.token)]
+    batches = []
+
+    def submit(client: DaemonClient, prefix: str):
+        urls = [f"https://example.com/{prefix}{i}" for i in range(PER_BATCH)]
+        batches.append(client.submit(urls, path=output)["id"])
+
+    submitters = [
+        threading.Thread(target=submit, args=(client, prefix))
+        for client, prefix in zip(clients, "ab")
+    ]
+    for thread in submitters:
+        thread.start()
+    for thread in submitters:
+        thread.join()
+    for batch_id in batches:
+        status = wait(client, batch_id)
+        assert status["state"] == "completed"
+        assert status["finished"] == PER_BATCH
+    assert 1 < yt_dlp.peak <= MAX_PARALLEL
+    assert len(list(output.iterdir())) == 2 * PER_BATCH
+    assert sorted(batch["id"] for batch in client.list()) == sorted(batches)
+
+
+def test_cancel_running_batch(client, output):
+    urls = [f"https://example.com/c{i}" for i in range(PER_BATCH)]
+    batch_id = client.submit(urls, path=output)["id"]
+    time.sleep(0.3)
+    assert client.cancel(batch_id)["state"] == "cancelled"
+    assert wait(client, batch_id)["state"] == "cancelled"
+
+
+def test_failure_is_reported_after_retries(client, output):
+    batch_id = client.submit(["https://example.com/fail0"], path=output)["id"]
+    job = wait(client, batch_id)["jobs"][0]
+    assert job["status"] == "failed"
+    assert "Stand-in failure" in job["message"]
+    assert job["attempts"] == 2
+
+
+def test_events_are_streamed(client, output):
+    events = []
+    listening = threading.Event()
+
+    def listen():
+        listening.set()
+        for event in client.events():
+            events.append(event)
+
+    threading.Thread(target=listen, daemon=True).start()
+    listening.wait()
+    time.sleep(0.2)
+    urls = [f"https://example.com/e{i}" for i in range(PER_BATCH)]
+    batch_id = client.submit(urls, path=output)["id"]
+    wait(client, batch_id)
+    time.sleep(0.3)
+
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "submitted"
+    assert kinds.count("job") == PER_BATCH
+    assert "progress" in kinds
+    assert events[-1]["event"] == "finished"
+    assert events[-1]["successful"]
+    # Progress events carry the batch status, with its id
+    assert all(
+        event.get("batch", event.get("id")) == batch_id for event in events
+    )
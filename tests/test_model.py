@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+
+import pytest
+
+import model
+from connectivity import ConnectivityMonitor
+from enums import Quality, Type
+
+
+@pytest.fixture
+def offline():
+    monitor = ConnectivityMonitor(["http://127.0.0.1:9/"], timeout=1)
+    yield monitor
+    monitor.stop()
+
+
+def start(urls: list[str], path: Path, **kwargs) -> model.DownloadManager:
+    manager = model.DownloadManager(
+        urls,
+        Type.Video,
+        Quality.Best,
+        path,
+        lambda url, err=None: None,
+        **kwargs,
+    )
+    manager.start_all()
+    return manager
+
+
+def wait(manager: model.DownloadManager, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not manager.is_completed():
+        assert time.monotonic() < deadline, "batch hangs"
+        time.sleep(0.05)
+
+
+def test_offline_does_not_pause_local_downloads(yt_dlp, app_dir, offline):
+    urls = [f"http://127.0.0.1:8080/clip{i}" for i in range(4)]
+    manager = start(urls, app_dir, connectivity=offline)
+    assert not offline.probe()
+    assert not manager.paused
+    wait(manager)
+    assert manager.was_successful()
+
+
+def test_offline_pauses_internet_downloads(yt_dlp, app_dir, offline):
+    urls = [f"https://example.com/clip{i}" for i in range(4)]
+    manager = start(urls, app_dir, connectivity=offline)
+    assert not offline.probe()
+    assert manager.paused
+    manager.killall()
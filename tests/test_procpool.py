@@ -0,0 +1,84 @@
+import functools
+import time
+from pathlib import Path
+
+import pytest
+
+import model
+from enums import Quality, Type
+from scheduler import RetryPolicy
+
+
+def log_to(path: str):
+    """Initializer of the processes, they log to the app dir otherwise."""
+    model.LOGGER.path = Path(path)
+
+
+@pytest.fixture
+def procpool(yt_dlp):
+    import procpool
+
+    return procpool
+
+
+def manager(urls: list[str], path: Path) -> model.DownloadManager:
+    return model.DownloadManager(
+        urls,
+        Type.Video,
+        Quality.Best,
+        path,
+        lambda url, err=None: None,
+        max_parallel=2,
+        backend="process",
+        retry=RetryPolicy(max_attempts=2, base_delay=0.1),
+        process_initializer=functools.partial(
+            log_to, str(path / "latest.log")
+        ),
+    )
+
+
+def run(manager: model.DownloadManager, timeout: float = 60):
+    manager.start_all()
+    deadline = time.monotonic() + timeout
+    while not manager.is_completed():
+        assert time.monotonic() < deadline, "batch hangs"
+        time.sleep(0.1)
+
+
+def test_crashed_job_is_attempted_again(procpool, app_dir):
+    urls = [f"https://example.com/a{i}" for i in range(3)]
+    urls.append("https://example.com/crash0")
+    batch = manager(urls, app_dir)
+    run(batch)
+    assert batch.was_successful()
+    assert batch.find_job(urls[-1]).attempts == 2
+    assert (app_dir / "crash0.mp4").exists()
+
+
+def test_crashing_job_fails_alone(procpool, app_dir):
+    urls = ["https://example.com/abort0"]
+    urls += [f"https://example.com/b{i}" for i in range(4)]
+    batch = manager(urls, app_dir)
+    run(batch)
+    assert [letter.url for letter in batch.dead_letters] == urls[:1]
+    assert "exited unexpectedly" in batch.dead_letters[0].error
+    for url in urls[1:]:
+        job = batch.find_job(url)
+        assert job.done and not job.errored
+
+
+def test_progress_finish_event(procpool, app_dir):
+    batch = manager(["https://example.com/a"], app_dir)
+    backend = procpool.ProcessBackend(batch)
+    receiver, sender = procpool.CONTEXT.Pipe(duplex=False)
+    procpool.RemoteProgress(procpool.EventSender(sender)).finish(0)
+    backend._handle(*receiver.recv())
+    assert batch.progress.unknown_done[0] == 1
+    assert not hasattr(batch.jobs[0], "_progress_finish")
+
+
+def test_remaining_jobs_fail_if_processes_keep_dying(procpool, app_dir):
+    urls = [f"https://example.com/abort{i}" for i in range(4)]
+    batch = manager(urls, app_dir)
+    run(batch)
+    assert all(job.errored for job in batch.jobs)
@@ -0,0 +1,75 @@
+import config
+from scheduler import ConcurrencyTuner
+
+OPTIMUM = 8
+
+
+def link(limit: int) -> float:
+    """
+    Bytes per second of `limit` downloads from a server that gets slower
+    past `OPTIMUM` connections, like the one in benchmarks/adaptive.py.
+    """
+    return 128 * min(limit, OPTIMUM) * (1 - 0.06 * max(0, limit - OPTIMUM))
+
+
+def test_raises_while_saturated():
+    tuner = ConcurrencyTuner(2, 32)
+    assert tuner.update(100, saturated=True) == 3
+    assert tuner.update(150, saturated=True) == 4
+
+
+def test_holds_while_not_saturated():
+    tuner = ConcurrencyTuner(2, 32)
+    assert tuner.update(100, saturated=False) == 2
+    # Idle downloads, not congestion
+    assert tuner.update(10, saturated=False) == 2
+
+
+def test_raise_without_gain_is_taken_back():
+    tuner = ConcurrencyTuner(2, 32, hold=2)
+    tuner.update(100, saturated=True)
+    assert tuner.update(104, saturated=True) == 2
+    assert tuner.update(100, saturated=True) == 2
+    assert tuner.update(100, saturated=True) == 3
+
+
+def test_drop_decreases_multiplicatively():
+    tuner = ConcurrencyTuner(2, 32, hold=1)
+    tuner.limit = 10
+    assert tuner.update(1000, saturated=False) == 10
+    assert tuner.update(700, saturated=True) == 5
+    assert tuner.update(700, saturated=True) == 6
+
+
+def test_drop_without_saturation_is_ignored():
+    tuner = ConcurrencyTuner(2, 32)
+    tuner.limit = 10
+    tuner.update(1000, saturated=False)
+    assert tuner.update(100, saturated=False) == 10
+
+
+def test_stays_within_bounds():
+    tuner = ConcurrencyTuner(2, 4, hold=1, decrease=0.1)
+    for throughput in (100, 200, 400, 800):
+        tuner.update(throughput, saturated=True)
+    assert tuner.limit == 4
+    assert tuner.update(10, saturated=True) == 2
+
+
+def test_settles_at_the_optimum():
+    tuner = ConcurrencyTuner(2, 32)
+    limits = []
+    for _ in range(40):
+        limits.append(tuner.update(link(tuner.limit), saturated=True))
+    assert limits[:OPTIMUM - 1] == list(range(3, OPTIMUM + 2))
+    # Probes one more download now and then, but keeps the optimum
+    assert set(limits[OPTIMUM:]) == {OPTIMUM, OPTIMUM + 1}
+    assert limits[OPTIMUM:].count(OPTIMUM) > 2 * limits.count(OPTIMUM + 1)
+
+
+def test_from_config(app_dir):
+    config.CONFIG.set("adaptive_min_parallel", 3)
+    config.CONFIG.set("adaptive_max_parallel", 6)
+    tuner = ConcurrencyTuner.from_config()
+    assert (tuner.minimum, tuner.maximum, tuner.limit) == (3, 6, 3)
+    assert tuner.interval == config.CONFIG.get_float("adaptive_interval")
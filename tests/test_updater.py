@@ -0,0 +1,187 @@
+import hashlib
+import http.server
+import io
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import updater
+import ytdlp
+
+OLD, NEW = "2000.01.01", "2000.02.02"
+
+
+def make_zip(version: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("yt_dlp/__init__.py", "")
+        zf.writestr("yt_dlp/version.py", f"__version__ = '{version}'\n")
+    return buffer.getvalue()
+
+
+class Releases(http.server.BaseHTTPRequestHandler):
+    """Stand-in of the GitHub releases of yt-dlp, see `releases`."""
+
+    protocol_version = "HTTP/1.1"
+    binary = b""
+    checksums = b""
+    # Bytes of the binary sent before the connection is closed
+    truncate_at: int = 0
+
+    def do_GET(self):
+        if self.path == "/releases/latest":
+            self.send_response(302)
+            self.send_header("Location", f"/releases/tag/{NEW}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.startswith("/releases/tag/"):
+            self.respond(b"release page")
+        elif self.path == f"/releases/download/{NEW}/SHA2-256SUMS":
+            self.respond(self.checksums)
+        elif self.path == f"/releases/download/{NEW}/yt-dlp":
+            if self.truncate_at:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(self.binary)))
+                self.end_headers()
+                self.wfile.write(self.binary[:self.truncate_at])
+                self.close_connection = True
+            else:
+                self.respond(self.binary)
+        else:
+            self.send_error(404)
+
+    def respond(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def releases(app_dir: Path):
+    """Serve `NEW` and install `OLD`, yielding the handler class."""
+    handler = type("Handler", (Releases,), {
+        "binary": make_zip(NEW),
+        "checksums": (
+            f"{hashlib.sha256(make_zip(NEW)).hexdigest()}  yt-dlp\n"
+        ).encode(),
+    })
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    (app_dir / "yt-dlp").write_bytes(make_zip(OLD))
+    handler.url = f"http://127.0.0.1:{server.server_port}/releases"
+    yield handler
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(releases, app_dir: Path):
+    service = updater.UpdateService(
+        releases.url, path=app_dir / "yt-dlp", timeout=5
+    )
+    yield service
+    service.shutdown()
+
+
+def leftovers(app_dir: Path) -> list[Path]:
+    return list(app_dir.glob("*.download"))
+
+
+def test_update_installs_verified_version(service, app_dir):
+    assert service.update_available(force=True) == NEW
+    assert service.update() == NEW
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == NEW
+    assert (app_dir / "yt-dlp-extracted" / NEW).is_dir()
+    assert service.update_available() is None
+    assert not leftovers(app_dir)
+
+
+def test_update_in_background(service, app_dir):
+    assert service.submit(service.update, NEW).result(10) == NEW
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == NEW
+
+
+def test_checksum_mismatch_keeps_installed_version(
+    releases, service, app_dir
+):
+    releases.binary = releases.binary[:-10] + bytes(10)
+    with pytest.raises(updater.UpdateError, match="Checksum mismatch"):
+        service.update(NEW)
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == OLD
+    assert not leftovers(app_dir)
+
+
+def test_missing_checksum_is_rejected(releases, service, app_dir):
+    releases.checksums = b"0123  yt-dlp.exe\n"
+    with pytest.raises(updater.UpdateError, match="No checksum"):
+        service.update(NEW)
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == OLD
+
+
+def test_other_version_is_rejected(releases, service, app_dir):
+    releases.binary = make_zip("1999.12.31")
+    releases.checksums = (
+        f"{hashlib.sha256(releases.binary).hexdigest()} *yt-dlp\n"
+    ).encode()
+    with pytest.raises(updater.UpdateError, match="instead of"):
+        service.update(NEW)
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == OLD
+    assert not leftovers(app_dir)
+
+
+def test_invalid_zip_is_rejected(releases, service, app_dir):
+    releases.binary = b"not a zip"
+    releases.checksums = (
+        f"{hashlib.sha256(releases.binary).hexdigest()}  yt-dlp\n"
+    ).encode()
+    with pytest.raises(updater.UpdateError, match="Invalid"):
+        service.update(NEW)
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == OLD
+    assert not leftovers(app_dir)
+
+
+def test_interrupted_download_keeps_installed_version(
+    releases, service, app_dir
+):
+    releases.truncate_at = len(releases.binary) // 2
+    with pytest.raises(ConnectionError):
+        service.update(NEW)
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == OLD
+    assert not leftovers(app_dir)
+
+
+def test_failed_install_rolls_back(service, app_dir, monkeypatch):
+    def replace(src, dst):
+        raise PermissionError("in use")
+
+    monkeypatch.setattr(updater.os, "replace", replace)
+    with pytest.raises(updater.UpdateError, match="Could not install"):
+        service.update(NEW)
+    assert ytdlp.installed_version(app_dir / "yt-dlp") == OLD
+    assert not leftovers(app_dir)
+
+
+def test_unreachable_releases(app_dir):
+    service = updater.UpdateService(
+        "http://127.0.0.1:9/releases", path=app_dir / "yt-dlp", timeout=1
+    )
+    with pytest.raises(ConnectionError):
+        service.update_available(force=True)
+    service.shutdown()
+
+
+def test_latest_version_is_cached(releases, service, monkeypatch):
+    assert service.latest_version(force=True) == NEW
+
+    def fetch():
+        raise AssertionError("cached check hit the network")
+
+    monkeypatch.setattr(service, "_fetch_latest_version", fetch)
+    assert service.latest_version() == NEW